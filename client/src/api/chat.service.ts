@@ -1,6 +1,11 @@
 import { http } from "./http-common"
 import { SERVER_PATHS } from "./server-paths"
-import type { Chat, ApiResponse } from "types"
+import type {
+	Chat,
+	ApiResponse,
+	SessionMessagesPage,
+	SessionMessagesQuery,
+} from "types"
 
 const { CHAT: PATHS } = SERVER_PATHS
 
@@ -36,8 +41,12 @@ class ChatService {
 		return http.put(PATHS.NEW_MESSAGE(session_id), message)
 	}
 
-	sessionMessages(session_id: string) {
-		return http.get(PATHS.SESSION_MESSAGES(session_id))
+	// One page of history; pass the page's `next_cursor` back for the next one
+	sessionMessages(
+		session_id: string,
+		query: SessionMessagesQuery = {}
+	): ApiResponse<SessionMessagesPage> {
+		return http.get(PATHS.SESSION_MESSAGES(session_id), { params: query })
 	}
 
 	deleteSession(session_id: string) {
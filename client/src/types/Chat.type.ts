@@ -9,3 +9,18 @@ export type Chat = {
 	has_image?: boolean
 	image_url?: string
 }
+
+export type SessionMessagesQuery = {
+	limit?: number
+	cursor?: string | null
+	since?: string
+	fields?: string
+	preview?: number
+	order?: "asc" | "desc"
+}
+
+export type SessionMessagesPage = {
+	messages: Array<Chat & { truncated?: boolean }>
+	next_cursor: string | null
+	has_more: boolean
+}
@@ -22,6 +22,8 @@ API Routes:
     - /api/chat/* - Chat and code generation endpoints
     - /api/populate/* - Data population and management endpoints
     - /api/health - Server health check
+    - /api/health/http - Outbound connection reuse per upstream
+    - /api/metrics - Stage latencies and counters (Prometheus text format)
     - /api/ - Basic hello world endpoint
 
 Dependencies:
@@ -39,6 +41,24 @@ Configuration:
     - MONGODB_URI: Database connection string
     - CLOUDINARY_*: Image service credentials
     - CLIENT_URI: Frontend application URL
+    - MONGODB_MAX_POOL_SIZE, MONGODB_WRITE_CONCERN, SESSION_TTL_DAYS, ...:
+      MongoDB pool, write concern and index options (see utils.connect_db)
+    - SERVICES_WARM: When clients are created (see utils.services)
+    - METRICS_ENABLED, METRICS_PREFIX, METRICS_WINDOW: Stage timings exported
+      on /api/metrics (see utils.metrics)
+    - MODEL_ROUTING_ENABLED, MODEL_ROUTE_FAST, MODEL_ROUTE_COMPLEX, ...: Which
+      model answers which request (see utils.model_router)
+
+Startup:
+    OpenAI, Pinecone, MongoDB, Cloudinary and LangSmith clients are created on
+    first use in each process (utils.services), so they are never shared across
+    forked workers. With SERVICES_WARM=imports (default) their modules are
+    imported at startup, and a report of the import and init cost per
+    dependency is printed. The one client built at import time is MongoDB's:
+    with MONGODB_BOOTSTRAP_INDEXES, `bootstrap_database()` creates the indexes
+    from a background thread, so under `gunicorn --preload` the master holds
+    its own MongoClient. Workers do not inherit it; they build theirs after
+    the fork.
 
 CORS Configuration:
     Configured to allow cross-origin requests from the frontend application
@@ -47,6 +67,8 @@ CORS Configuration:
 Usage:
     Run directly: python app.py
     Or with gunicorn: gunicorn app:app
+    Or with gunicorn, sharing imported modules across workers:
+        gunicorn --preload app:app   (gunicorn.conf.py resets clients per worker)
 
 Example:
     # Start the development server
@@ -61,17 +83,27 @@ Note:
 """
 
 import os
-from flask import Flask
+import time
+from flask import Flask, Response, g, request
 from flask_cors import CORS
-import openai
 from langsmith import Client
 from routes.chat import chat_bp
 from routes.populate_from_hf import populate_bp
-from utils.connect_db import BASE_API_URL
+from utils.connect_db import BASE_API_URL, MONGODB_BOOTSTRAP_INDEXES, bootstrap_database
+from utils.services import services
+from utils.http_client import http_clients
+from utils.metrics import metrics
+from utils.semantic_cache import semantic_cache
+from utils.vision_cache import vision_cache
+from utils.context_packer import context_packer
+from utils.message_writer import message_writer
+from utils.langchain_service import react_assistant
+from utils.model_router import model_router
 from utils.consts import (
     OPENAI_API_KEY,
     TOKEN_SECRET,
     CLIENT_URI,
+    SERVICES_WARM,
 )
 
 app = Flask(__name__)
@@ -85,9 +117,86 @@ CORS(app, resources={r"/chat/*": {"origins": CLIENT_URI}})
 CORS(app, resources={r"/populate/*": {"origins": CLIENT_URI}})
 CORS(app, resources={r"/api/*": {"origins": [CLIENT_URI, "http://localhost:5173"]}})
 
-openai.api_key = OPENAI_API_KEY
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
-langsmith_client = Client()
+
+def _create_openai_client():
+    import openai  # pylint: disable=import-outside-toplevel
+
+    openai.api_key = OPENAI_API_KEY
+    return openai.OpenAI(
+        api_key=OPENAI_API_KEY, http_client=http_clients.httpx_client("openai")
+    )
+
+
+# Clients are built on first use in each process (see utils.services)
+client = services.register("openai", _create_openai_client, imports=("openai",))
+langsmith_client = services.register("langsmith", Client, imports=("langsmith",))
+
+# Import the clients' modules now: with --preload, once for all workers
+if SERVICES_WARM != "none":
+    services.preload()
+
+# Create the MongoDB indexes (idempotent) and log their usage
+if MONGODB_BOOTSTRAP_INDEXES:
+    bootstrap_database()
+
+services.log_report()
+
+# Components that keep their own counters are read when /api/metrics is scraped
+metrics.register_stats(
+    "semantic_cache", semantic_cache.stats, counters=("hits", "misses", "evictions")
+)
+metrics.register_stats(
+    "vision_cache",
+    vision_cache.stats,
+    counters=("exact_hits", "perceptual_hits", "url_hits", "misses", "errors"),
+)
+# Only once built: a scrape must not create the assistant and its clients
+metrics.register_stats(
+    "embedding_cache",
+    lambda: (
+        react_assistant.embeddings.stats() if services.ready("react_assistant") else {}
+    ),
+    counters=("memory_hits", "disk_hits", "misses", "disk_evictions"),
+)
+metrics.register_stats(
+    "context", context_packer.stats, counters=("requests", "tokens_used")
+)
+metrics.register_stats(
+    "message_writer",
+    message_writer.stats,
+    counters=("written", "batches", "retries", "failed", "sync_writes"),
+)
+metrics.register_stats(
+    "model_route", model_router.stats, counters=("requests",), label="route"
+)
+metrics.register_stats(
+    "http",
+    lambda: http_clients.stats() if services.ready("http") else {},
+    counters=("requests", "connections", "reused"),
+    label="upstream",
+)
+
+
+@app.before_request
+def start_timer():
+    """Start timing the request"""
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    """Time the request as the `request:<endpoint>` stage and count it by status"""
+    start = g.pop("request_start", None)
+    endpoint = request.endpoint or "unmatched"
+    if start is not None:
+        metrics.observe(f"request:{endpoint}", time.perf_counter() - start)
+    metrics.inc(
+        "http_requests_total",
+        endpoint=endpoint,
+        method=request.method,
+        status=response.status_code,
+    )
+    return response
 
 
 @app.route(f"{BASE_API_URL}/", methods=["GET"])
@@ -110,11 +219,33 @@ def health_check():
     return {"status": "healthy", "message": "Server is running"}, 200
 
 
+@app.route(f"{BASE_API_URL}/health/http", methods=["GET"])
+def http_stats():
+    """Outbound connection reuse of this worker, per upstream
+
+    Returns:
+        { upstream: { "requests", "connections", "reused", "reuse_ratio", "pool_size" } }
+    """
+    return http_clients.stats(), 200
+
+
+@app.route(f"{BASE_API_URL}/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Stage latencies (p50/p95/p99) and counters of this worker
+
+    Returns:
+        Prometheus text exposition format
+    """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 # Routes
 app.register_blueprint(chat_bp)
 app.register_blueprint(populate_bp)
 
 # Run the app on port 8000
 if __name__ == "__main__":
+    if SERVICES_WARM == "all":
+        services.warm()
     port = int(os.environ.get("PORT", 8000))
     app.run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,4 @@
+"""Offline benchmarks with local stand-ins for every external service.
+
+Run `python -m benchmarks --help` from server/ (see benchmarks.__main__).
+"""
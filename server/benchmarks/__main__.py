@@ -0,0 +1,305 @@
+"""Offline benchmarks of the chat and ingestion endpoints.
+
+Runs the real Flask app in-process, with every external service replaced by a
+deterministic local fake (see benchmarks.fakes): no OpenAI, Pinecone, MongoDB or
+Cloudinary account is needed, and two runs with the same options do the same
+work. Each scenario sends `--requests` requests (`--jobs` for populate) from
+`--concurrency` threads and reports throughput, latency percentiles, memory and
+the server's own stage timings (utils.metrics).
+
+Usage (from server/):
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks                                   # every scenario
+    python -m benchmarks new-chat --concurrency 16 --requests 400
+    python -m benchmarks new-chat --stream --image-ratio 0.5
+    python -m benchmarks --no-latency                      # server overhead only
+
+    # Regression check: save a baseline, compare a later run against it
+    python -m benchmarks --output baseline.json
+    python -m benchmarks --baseline baseline.json --tolerance 0.15
+
+Server settings are read from the environment as usual, so configurations can
+be compared (e.g. MESSAGE_WRITE_MODE=sync or RETRIEVER_MODE=hybrid). The
+benchmark forces the settings that would reach a real service or the local
+caches on disk.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+SCENARIOS = ("new-chat", "messages", "add-snippet", "populate")
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description=__doc__.split("\n", 1)[0]
+    )
+    parser.add_argument(
+        "scenarios", nargs="*", metavar="scenario", help=f"One of {', '.join(SCENARIOS)} (default: all)"
+    )
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client threads")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests first")
+
+    chat = parser.add_argument_group("new-chat and messages")
+    chat.add_argument("--sessions", type=int, default=10)
+    chat.add_argument("--stream", action="store_true", help="Use /new-chat/stream")
+    chat.add_argument("--image-ratio", type=float, default=0.0, help="Share of chats with an image")
+    chat.add_argument("--repeat", type=float, default=0.0, help="Share of repeated prompts")
+    chat.add_argument("--history", type=int, default=200, help="Messages per seeded session")
+    chat.add_argument("--page-size", type=int, default=50)
+    chat.add_argument("--snippets", type=int, default=200, help="Knowledge base size for new-chat")
+
+    populate = parser.add_argument_group("populate")
+    populate.add_argument("--jobs", type=int, default=4, help="Ingestion jobs (requests)")
+    populate.add_argument("--records", type=int, default=200, help="Records per dataset")
+    populate.add_argument("--batch-size", type=int, default=50)
+
+    latency = parser.add_argument_group("fake upstream latency (seconds)")
+    latency.add_argument("--first-token", type=float, default=0.1)
+    latency.add_argument("--tokens-per-second", type=float, default=1000.0)
+    latency.add_argument("--reply-tokens", type=int, default=300)
+    latency.add_argument("--vision", type=float, default=0.2)
+    latency.add_argument("--embedding", type=float, default=0.02)
+    latency.add_argument("--image-host", type=float, default=0.02)
+    latency.add_argument(
+        "--fast-factor", type=float, default=0.5, help="Latency of the fast model vs gpt-4o"
+    )
+    latency.add_argument("--no-latency", action="store_true", help="Set every latency to 0")
+
+    report = parser.add_argument_group("report")
+    report.add_argument("--trace-memory", action="store_true", help="Python heap peak (slower)")
+    report.add_argument("--output", help="Write the results as JSON")
+    report.add_argument("--baseline", help="JSON results to compare against")
+    report.add_argument(
+        "--tolerance", type=float, default=0.1, help="Allowed relative regression"
+    )
+    options = parser.parse_args(argv)
+    unknown = set(options.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(sorted(unknown))}")
+    return options
+
+
+def _configure_environment(workdir: str):
+    """Keep the run local and self-contained; must run before the app is imported"""
+    os.environ.update(
+        OPENAI_API_KEY="sk-benchmark",
+        VECTOR_STORE_BACKEND="local",
+        LOCAL_INDEX_PATH=os.path.join(workdir, "vector_index"),
+        EMBEDDING_CACHE_PATH=os.path.join(workdir, "embeddings.sqlite3"),
+        # The populate scenario writes its datasets here
+        INGEST_DATA_DIR=workdir,
+        MONGODB_BOOTSTRAP_INDEXES="false",
+        LANGCHAIN_TRACING_V2="false",
+        LANGSMITH_TRACING="false",
+    )
+    for name in ("CLOUDINARY_CLOUD_NAME", "CLOUDINARY_API_KEY", "CLOUDINARY_API_SECRET"):
+        os.environ.setdefault(name, "benchmark")
+    os.environ.setdefault("CLIENT_URI", "http://localhost:5173")
+
+
+def _rss_mb() -> float:
+    """Resident memory of this process now"""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _percentile(ordered, q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def run_scenario(app, scenario, options):
+    """Send the warmup then the measured requests; return the scenario's results"""
+    from utils.metrics import metrics  # pylint: disable=import-outside-toplevel
+
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        return local.client
+
+    def timed(number):
+        start = time.perf_counter()
+        try:
+            status = scenario.request(client(), number)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"❌ {scenario.name} request {number} raised {e!r}")
+            status = 599
+        return time.perf_counter() - start, status
+
+    scenario.setup(client())
+    with ThreadPoolExecutor(options.concurrency) as pool:
+        list(pool.map(timed, range(-scenario.warmup, 0)))
+
+    metrics.reset()
+    rss_before = _rss_mb()
+    if options.trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(options.concurrency) as pool:
+        samples = list(pool.map(timed, range(scenario.requests)))
+    elapsed = time.perf_counter() - start
+    heap_peak = None
+    if options.trace_memory:
+        heap_peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    latencies = sorted(seconds for seconds, _ in samples)
+    results = {
+        "requests": len(samples),
+        "errors": sum(1 for _, status in samples if status >= 400),
+        "concurrency": options.concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+            **{
+                f"p{int(q * 100)}": round(_percentile(latencies, q) * 1000, 2)
+                for q in (0.5, 0.95, 0.99)
+            },
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+        "memory_mb": {
+            "rss_before": round(rss_before, 1),
+            "rss_after": round(_rss_mb(), 1),
+            "rss_peak": round(_peak_rss_mb(), 1),
+            **({"heap_peak": round(heap_peak, 1)} if heap_peak is not None else {}),
+        },
+        "stages_ms": {
+            stage: {key: round(timing[key] * 1000, 2) for key in ("p50", "p95", "p99")}
+            for stage, timing in metrics.snapshot()["stages"].items()
+        },
+    }
+    results.update(scenario.summary(results))
+    return results
+
+
+def _print_results(name, results):
+    latency = results["latency_ms"]
+    memory = results["memory_mb"]
+    print(f"\n=== {name} ===")
+    print(
+        f"{results['requests']} requests ({results['errors']} errors) at concurrency "
+        f"{results['concurrency']} in {results['elapsed_seconds']} s: "
+        f"{results['throughput_rps']} req/s"
+    )
+    print(
+        f"latency ms: mean {latency['mean']}, p50 {latency['p50']}, "
+        f"p95 {latency['p95']}, p99 {latency['p99']}, max {latency['max']}"
+    )
+    print(
+        f"memory MB: rss {memory['rss_before']} -> {memory['rss_after']}, "
+        f"peak {memory['rss_peak']}"
+        + (f", python heap peak {memory['heap_peak']}" if "heap_peak" in memory else "")
+    )
+    for key, value in results.items():
+        if key not in ("requests", "errors", "concurrency", "elapsed_seconds",
+                       "throughput_rps", "latency_ms", "memory_mb", "stages_ms"):
+            print(f"{key}: {value}")
+    stages = sorted(results["stages_ms"].items(), key=lambda item: -item[1]["p95"])
+    if stages:
+        print("slowest stages (p50 / p95 ms):")
+        for stage, timing in stages[:8]:
+            print(f"  {stage}: {timing['p50']} / {timing['p95']}")
+
+
+def compare(results, baseline, tolerance: float):
+    """List the scenarios slower than the baseline by more than `tolerance`"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric, higher_is_worse in (("p50", True), ("p95", True), ("throughput_rps", False)):
+            before = previous["latency_ms"][metric] if metric != "throughput_rps" else previous[metric]
+            after = current["latency_ms"][metric] if metric != "throughput_rps" else current[metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            if (change if higher_is_worse else -change) > tolerance:
+                regressions.append(f"{name} {metric}: {before} -> {after} ({change:+.1%})")
+    return regressions
+
+
+def main(argv=None):
+    """Run the selected scenarios; exit 1 on errors or regressions"""
+    options = _parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="react-codegen-bench-")
+    _configure_environment(workdir)
+
+    # pylint: disable=import-outside-toplevel
+    from benchmarks.fakes import LatencyProfile, FakeImageHost, install
+    from benchmarks.scenarios import NewChat, Messages, AddSnippet, Populate
+
+    profile = (
+        LatencyProfile.instant()
+        if options.no_latency
+        else LatencyProfile(
+            first_token=options.first_token,
+            tokens_per_second=options.tokens_per_second,
+            reply_tokens=options.reply_tokens,
+            vision=options.vision,
+            embedding=options.embedding,
+            image_host=options.image_host,
+            fast_factor=options.fast_factor,
+        )
+    )
+
+    from app import app
+
+    install(profile)
+
+    results = {}
+    with FakeImageHost(latency=profile.image_host) as image_host:
+        scenarios = {
+            "new-chat": lambda: NewChat(options, image_host),
+            "messages": lambda: Messages(options),
+            "add-snippet": lambda: AddSnippet(options),
+            "populate": lambda: Populate(options, workdir),
+        }
+        for name in options.scenarios or SCENARIOS:
+            results[name] = run_scenario(app, scenarios[name](), options)
+            _print_results(name, results[name])
+
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+        print(f"\nResults written to {options.output}")
+
+    failed = any(result["errors"] for result in results.values())
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as baseline:
+            regressions = compare(results, json.load(baseline), options.tolerance)
+        if regressions:
+            print("\n❌ Regressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            failed = True
+        else:
+            print(f"\n✅ No regression beyond {options.tolerance:.0%} against the baseline")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+"""Deterministic local stand-ins for the services the server calls.
+
+Each fake answers like the real client (same methods, same response shapes) and
+waits a configurable time instead of doing network I/O, so a benchmark measures
+the server's own work plus a known, repeatable upstream latency:
+
+    - FakeChatModel: replaces `ChatOpenAI`; waits `first_token` seconds, then
+      produces `reply_tokens` tokens at `tokens_per_second` (also when streaming),
+      and reports token usage like the API. "mini" models (the fast route of
+      utils.model_router) take `fast_factor` times as long
+    - FakeEmbeddings: replaces `OpenAIEmbeddings`; hashed bag-of-words vectors,
+      so identical texts get identical vectors and similar texts similar ones
+    - FakeOpenAI: replaces `openai.OpenAI` (`embeddings.create` for ingestion)
+    - In-memory vector index: the repo's own `LocalVectorStore`, not persisted
+    - MongoDB: `mongomock`, in memory
+    - FakeImageHost: a local HTTP server with generated PNG mockups
+
+`install(profile)` patches the client classes and re-registers the services
+(utils.services) before any of them is built.
+
+Usage:
+    from benchmarks.fakes import LatencyProfile, FakeImageHost, install
+
+    install(LatencyProfile(first_token=0.2, tokens_per_second=500))
+    with FakeImageHost(latency=0.02) as images:
+        images.url(3)    # http://127.0.0.1:<port>/images/3.png
+"""
+
+import io
+import re
+import time
+import random
+import hashlib
+import threading
+from dataclasses import dataclass
+from functools import partial
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+EMBEDDING_DIMENSIONS = 1536
+
+# Characters per token of the generated replies (as counted by the server)
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class LatencyProfile:
+    """Upstream latencies, in seconds, and the size of generated replies"""
+
+    first_token: float = 0.1
+    tokens_per_second: float = 1000.0
+    reply_tokens: int = 300
+    vision: float = 0.2
+    embedding: float = 0.02
+    image_host: float = 0.02
+    fast_factor: float = 0.5
+
+    @classmethod
+    def instant(cls):
+        """No upstream latency: measures the server's own overhead"""
+        return cls(
+            first_token=0.0,
+            tokens_per_second=0.0,
+            vision=0.0,
+            embedding=0.0,
+            image_host=0.0,
+        )
+
+
+def _tokens(text: str):
+    return re.findall(r"[A-Za-z0-9_]+", text.lower())
+
+
+def fake_vector(text: str, dimensions: int = EMBEDDING_DIMENSIONS):
+    """Unit vector of the hashed word counts of `text`"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token in _tokens(text):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        vector[int.from_bytes(digest, "little") % dimensions] += 1.0
+    norm = np.linalg.norm(vector)
+    if not norm:
+        vector[0] = norm = 1.0
+    return (vector / norm).tolist()
+
+
+def fake_component(seed: int, lines: int = 20) -> str:
+    """A syntactically plausible React component, different for every seed"""
+    rng = random.Random(seed)
+    name = rng.choice(["Card", "Modal", "Navbar", "Form", "Table", "Sidebar", "Tabs"])
+    name += str(seed)
+    state = rng.choice(["open", "value", "items", "page", "query", "selected"])
+    tags = ["div", "section", "button", "span", "ul", "li", "input", "label"]
+    body = "\n".join(
+        f"      <{tag} className=\"{rng.choice(['p-2', 'flex', 'grid', 'text-sm', 'rounded'])}"
+        f" {rng.choice(['gap-2', 'mt-4', 'bg-white', 'shadow', 'w-full'])}\">"
+        f"{rng.choice(['Title', 'Save', 'Cancel', 'Next', 'Item'])} {rng.randint(0, 9999)}"
+        f"</{tag}>"
+        for tag in (rng.choice(tags) for _ in range(lines))
+    )
+    return (
+        "import React, { useState } from 'react';\n\n"
+        f"interface {name}Props {{\n  title: string;\n}}\n\n"
+        f"export default function {name}({{ title }}: {name}Props) {{\n"
+        f"  const [{state}, set{state.title()}] = useState(null);\n\n"
+        "  return (\n"
+        f"    <div aria-label={{title}} onClick={{() => set{state.title()}({state})}}>\n"
+        f"{body}\n"
+        "    </div>\n"
+        "  );\n"
+        "}\n"
+    )
+
+
+def fake_reply(prompt: str, tokens: int) -> str:
+    """A code reply of about `tokens` tokens, derived from the prompt"""
+    seed = int.from_bytes(hashlib.blake2b(prompt.encode("utf-8"), digest_size=4).digest(), "little")
+    text = "Here is the component:\n\n```tsx\n"
+    while len(text) < tokens * CHARS_PER_TOKEN:
+        text += fake_component(seed, lines=8)
+        seed += 1
+    return text[: tokens * CHARS_PER_TOKEN] + "\n```"
+
+
+def _message_text(messages) -> str:
+    """Text of a list of LangChain messages (image parts are ignored)"""
+    parts = []
+    for message in messages:
+        content = message.content
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(part.get("text", "") for part in content if isinstance(part, dict))
+    return "\n".join(parts)
+
+
+class FakeChatModel:
+    """`ChatOpenAI` stand-in with a configurable first-token latency and token rate"""
+
+    def __init__(self, profile: LatencyProfile, model: str = "gpt-4o", **_options):
+        self.profile = profile
+        self.model_name = model
+        self.factor = profile.fast_factor if "mini" in model else 1.0
+
+    def _is_vision(self, messages) -> bool:
+        return any(not isinstance(message.content, str) for message in messages)
+
+    def _usage(self, prompt: str, reply: str):
+        input_tokens = len(prompt) // CHARS_PER_TOKEN
+        output_tokens = len(reply) // CHARS_PER_TOKEN
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _reply(self, messages):
+        prompt = _message_text(messages)
+        if self._is_vision(messages):
+            time.sleep(self.profile.vision)
+            return prompt, (
+                "A card layout with a header, a two-column form (email, password), "
+                "a primary submit button and a footer with links."
+            )
+        return prompt, fake_reply(prompt, self.profile.reply_tokens)
+
+    def _token_delay(self):
+        rate = self.profile.tokens_per_second
+        return self.factor / rate if rate else 0.0
+
+    def invoke(self, messages, **_kwargs):
+        """Wait for the whole reply, then return it"""
+        prompt, reply = self._reply(messages)
+        time.sleep(self.profile.first_token * self.factor)
+        time.sleep(self._token_delay() * (len(reply) // CHARS_PER_TOKEN))
+        return AIMessage(content=reply, usage_metadata=self._usage(prompt, reply))
+
+    def stream(self, messages, **_kwargs):
+        """Yield the reply in chunks of about 8 tokens, at the configured rate"""
+        prompt, reply = self._reply(messages)
+        time.sleep(self.profile.first_token * self.factor)
+        step = 8 * CHARS_PER_TOKEN
+        for start in range(0, len(reply), step):
+            time.sleep(self._token_delay() * 8)
+            yield AIMessageChunk(content=reply[start : start + step])
+        yield AIMessageChunk(content="", usage_metadata=self._usage(prompt, reply))
+
+
+class FakeEmbeddings(Embeddings):
+    """`OpenAIEmbeddings` stand-in: one request per call, hashed word vectors"""
+
+    def __init__(self, profile: LatencyProfile, **_options):
+        self.profile = profile
+
+    def embed_documents(self, texts):
+        time.sleep(self.profile.embedding)
+        return [fake_vector(text) for text in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.profile.embedding)
+        return fake_vector(text)
+
+
+class FakeOpenAI:
+    """`openai.OpenAI` stand-in, for the ingestion pipeline's batched embeddings"""
+
+    def __init__(self, profile: LatencyProfile, **_options):
+        self.embeddings = SimpleNamespace(create=partial(self._create_embeddings, profile))
+
+    @staticmethod
+    def _create_embeddings(profile, model, **kwargs):
+        time.sleep(profile.embedding)
+        inputs = kwargs["input"]
+        return SimpleNamespace(
+            model=model,
+            data=[
+                SimpleNamespace(index=position, embedding=fake_vector(text))
+                for position, text in enumerate(inputs)
+            ],
+            usage=SimpleNamespace(
+                total_tokens=sum(len(text) // CHARS_PER_TOKEN for text in inputs)
+            ),
+        )
+
+
+def fake_mockup(number: int, size: int = 256) -> bytes:
+    """PNG mockup: a few coloured blocks laid out from `number`"""
+    from PIL import Image, ImageDraw  # pylint: disable=import-outside-toplevel
+
+    rng = random.Random(number)
+    image = Image.new("RGB", (size, size), "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(6):
+        x, y = rng.randrange(size - 40), rng.randrange(size - 40)
+        draw.rectangle(
+            (x, y, x + rng.randrange(20, 120), y + rng.randrange(10, 60)),
+            fill=tuple(rng.randrange(256) for _ in range(3)),
+        )
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeImageHost:
+    """Local HTTP server for mockup images, standing in for the Cloudinary CDN"""
+
+    def __init__(self, latency: float = 0.0, images: int = 20):
+        self.latency = latency
+        self.images = {number: fake_mockup(number) for number in range(images)}
+        self.requests = 0
+        self._server = None
+
+    def _handler(self):
+        host = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Serve /images/<n>.png after the configured latency"""
+
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                match = re.fullmatch(r"/images/(\d+)\.png", self.path)
+                image = host.images.get(int(match.group(1))) if match else None
+                time.sleep(host.latency)
+                host.requests += 1
+                if image is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(image)))
+                self.end_headers()
+                self.wfile.write(image)
+
+            def log_message(self, *_args):  # pylint: disable=arguments-differ
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def url(self, number: int) -> str:
+        port = self._server.server_address[1]
+        return f"http://127.0.0.1:{port}/images/{number % len(self.images)}.png"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *_exc):
+        self.stop()
+
+
+def _mongo_client():
+    """In-memory MongoDB (mongomock), accepting what recent pymongo sends"""
+    import mongomock  # pylint: disable=import-outside-toplevel
+
+    builder = mongomock.collection.BulkOperationBuilder
+    if not getattr(builder, "_accepts_sort", False):
+        add_update = builder.add_update
+
+        # pymongo >= 4.11 passes the `sort` of UpdateOne, unknown to mongomock
+        def add_update_without_sort(self, *args, sort=None, **kwargs):
+            del sort
+            return add_update(self, *args, **kwargs)
+
+        builder.add_update = add_update_without_sort
+        builder._accepts_sort = True  # pylint: disable=protected-access
+    return mongomock.MongoClient()
+
+
+def install(profile: LatencyProfile):
+    """Swap every external client for its fake; call before the server is used"""
+    # pylint: disable=import-outside-toplevel
+    import openai
+    import langchain_openai
+    import utils.ingestion
+    from utils.services import services
+    from utils.vector_store import LocalVectorStore
+
+    # The factories import these classes when they run, on first use
+    langchain_openai.ChatOpenAI = partial(FakeChatModel, profile)
+    langchain_openai.OpenAIEmbeddings = partial(FakeEmbeddings, profile)
+    openai.OpenAI = partial(FakeOpenAI, profile)
+    utils.ingestion.OpenAI = openai.OpenAI
+
+    services.register("mongodb", _mongo_client)
+    services.register("vector_store", LocalVectorStore)
+    services.reset()
@@ -0,0 +1,270 @@
+"""Benchmark scenarios: one per endpoint, each driving the Flask app in-process.
+
+A scenario prepares its data in `setup` (outside the measurement), then
+`request(client, number)` sends one request and returns the response status;
+every call is timed by the runner (benchmarks.__main__).
+
+    - new-chat: POST /api/chat/new-chat (or /new-chat/stream), spread over
+      `sessions` sessions, with an image for a share of the requests
+    - messages: GET /api/chat/messages/<id>, on sessions seeded with `history`
+      messages each
+    - add-snippet: POST /api/chat/add-snippet with generated components
+    - populate: POST /api/populate/populate-from-hf on a generated JSONL dataset,
+      timed until the job finishes (latency is the job duration)
+"""
+
+import os
+import json
+import time
+import datetime
+from benchmarks.fakes import fake_component, fake_vector
+
+PROMPTS = [
+    "Create a responsive login form with email validation",
+    "Make a red button",
+    "Build a data table with sorting, pagination and a search box",
+    "Create a modal dialog with a close button",
+    "Make a navbar with a dropdown menu and a mobile hamburger toggle",
+    "Build a multi-step checkout form with a progress indicator",
+    "Create a card grid for products with prices and an add to cart button",
+    "Make the previous component dark mode",
+]
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# Knowledge base snippets are generated from their own seeds, apart from requests
+SEED_OFFSET = 1_000_000
+
+
+def seed_knowledge_base(count: int):
+    """Store `count` snippets (MongoDB, vector store, lexical index) for retrieval"""
+    # pylint: disable=import-outside-toplevel
+    from utils.connect_db import snippets_col
+    from utils.pc_index import index
+    from utils.lexical_index import lexical_index
+
+    if not count or snippets_col.count_documents({"benchmark_seed": True}):
+        return
+    texts = [fake_component(SEED_OFFSET + number, lines=10 + number % 30) for number in range(count)]
+    result = snippets_col.insert_many(
+        [{"text": text, "tags": ["react"], "chunk_count": 1, "benchmark_seed": True} for text in texts]
+    )
+    index.upsert(
+        [
+            (
+                str(snippet_id),
+                fake_vector(text),
+                {
+                    "text": text,
+                    "parent_id": str(snippet_id),
+                    "chunk": 0,
+                    "chunk_count": 1,
+                    "tags": "react",
+                    "tag_list": ["react"],
+                },
+            )
+            for snippet_id, text in zip(result.inserted_ids, texts)
+        ]
+    )
+    for snippet_id, text in zip(result.inserted_ids, texts):
+        lexical_index.add(str(snippet_id), text)
+
+
+class Scenario:
+    """Base scenario: `setup` once, then `request` for every measured call"""
+
+    name = ""
+
+    def __init__(self, options):
+        self.options = options
+        self.requests = options.requests
+        self.warmup = options.warmup
+
+    def setup(self, client):
+        """Prepare data before the measurement"""
+
+    def request(self, client, number: int) -> int:
+        """Send request `number`; return the HTTP status"""
+        raise NotImplementedError
+
+    def summary(self, results) -> dict:
+        """Scenario-specific figures to add to the report"""
+        del results
+        return {}
+
+
+class NewChat(Scenario):
+    """Code generation, the main path: retrieval, LLM and two message writes"""
+
+    name = "new-chat"
+
+    def __init__(self, options, image_host=None):
+        super().__init__(options)
+        self.image_host = image_host
+        self.first_token = []  # Seconds to the first streamed event
+
+    def setup(self, client):
+        seed_knowledge_base(self.options.snippets)
+
+    def _payload(self, number: int):
+        options = self.options
+        payload = {
+            "session_id": f"bench-chat-{number % options.sessions}",
+            "message": f"{PROMPTS[number % len(PROMPTS)]} (variant {number})",
+        }
+        if options.repeat and number % round(1 / options.repeat) == 0:
+            # Same text as earlier requests: answered by the semantic cache
+            payload["message"] = PROMPTS[number % len(PROMPTS)]
+        if (
+            self.image_host is not None
+            and options.image_ratio
+            and number % round(1 / options.image_ratio) == 0
+        ):
+            payload["image_url"] = self.image_host.url(number)
+        return payload
+
+    def request(self, client, number: int) -> int:
+        if not self.options.stream:
+            return client.post("/api/chat/new-chat", json=self._payload(number)).status_code
+
+        start = time.perf_counter()
+        response = client.post(
+            "/api/chat/new-chat/stream", json=self._payload(number), buffered=False
+        )
+        first = None
+        for _ in response.response:
+            if first is None:
+                first = time.perf_counter() - start
+        response.close()
+        self.first_token.append(first or 0.0)
+        return response.status_code
+
+    def summary(self, results):
+        if not self.first_token:
+            return {}
+        ordered = sorted(self.first_token)
+        return {"first_event_p50_ms": round(ordered[len(ordered) // 2] * 1000, 2)}
+
+
+class Messages(Scenario):
+    """History reads on long sessions"""
+
+    name = "messages"
+
+    def setup(self, client):
+        from utils.connect_db import messages_col  # pylint: disable=import-outside-toplevel
+
+        options = self.options
+        start = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+        for session in range(options.sessions):
+            messages_col.insert_many(
+                [
+                    {
+                        "session_id": f"bench-history-{session}",
+                        "role": "user" if position % 2 == 0 else "assistant",
+                        "message": (
+                            PROMPTS[position % len(PROMPTS)]
+                            if position % 2 == 0
+                            else fake_component(position, lines=12)
+                        ),
+                        "created_at": start + datetime.timedelta(seconds=position),
+                    }
+                    for position in range(options.history)
+                ]
+            )
+
+    def request(self, client, number: int) -> int:
+        session = f"bench-history-{number % self.options.sessions}"
+        return client.get(
+            f"/api/chat/messages/{session}?limit={self.options.page_size}"
+        ).status_code
+
+
+class AddSnippet(Scenario):
+    """Knowledge base writes: chunking, embedding, vector and lexical upserts"""
+
+    name = "add-snippet"
+
+    def request(self, client, number: int) -> int:
+        return client.post(
+            "/api/chat/add-snippet",
+            json={
+                "text": fake_component(number, lines=10 + number % 60),
+                "tags": ["react", "benchmark"],
+            },
+        ).status_code
+
+
+class Populate(Scenario):
+    """Dataset ingestion jobs, each on its own generated JSONL file"""
+
+    name = "populate"
+
+    def __init__(self, options, workdir):
+        super().__init__(options)
+        self.workdir = workdir
+        self.loaded = 0
+        # Each request is a whole ingestion job
+        self.requests = options.jobs
+        self.warmup = 0
+
+    def _source(self, number: int) -> str:
+        return os.path.join(self.workdir, f"dataset-{number}.jsonl")
+
+    def setup(self, client):
+        options = self.options
+        for number in range(self.requests):
+            with open(self._source(number), "w", encoding="utf-8") as dataset:
+                for record in range(options.records):
+                    seed = number * options.records + record
+                    dataset.write(
+                        json.dumps(
+                            {
+                                "messages": [
+                                    {"role": "user", "content": PROMPTS[seed % len(PROMPTS)]},
+                                    {
+                                        "role": "assistant",
+                                        "content": "```tsx\n"
+                                        + fake_component(seed, lines=10 + seed % 80)
+                                        + "```",
+                                    },
+                                ],
+                                "model": "gpt-4o",
+                                "recommended": seed % 3 == 0,
+                                "upvoted": seed % 5 == 0,
+                            }
+                        )
+                        + "\n"
+                    )
+
+    def request(self, client, number: int) -> int:
+        response = client.post(
+            "/api/populate/populate-from-hf",
+            json={
+                "source": self._source(number),
+                "limit": self.options.records,
+                "batch_size": self.options.batch_size,
+                "restart": True,
+            },
+        )
+        if response.status_code != 202:
+            return response.status_code
+
+        status_url = f"/api/populate/jobs/{response.get_json()['job_id']}"
+        while True:
+            job = client.get(status_url).get_json()
+            if job["status"] in TERMINAL_STATUSES:
+                break
+            time.sleep(0.05)
+        if job["status"] != "completed":
+            print(f"Populate job {job['id']} {job['status']}: {job.get('error')}")
+            return 500
+        self.loaded += job["result"]["loaded"]
+        return 200
+
+    def summary(self, results):
+        elapsed = results["elapsed_seconds"]
+        return {
+            "snippets_loaded": self.loaded,
+            "snippets_per_second": round(self.loaded / elapsed, 1) if elapsed else 0.0,
+        }
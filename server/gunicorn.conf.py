@@ -0,0 +1,33 @@
+"""Gunicorn hooks for the lazy services (see utils.services).
+
+Loaded automatically by `gunicorn app:app` when run from this directory.
+
+With `--preload`, the app is imported once in the master and the workers are
+forked from it: the modules are shared, but any client the master built (e.g.
+MongoDB for the index bootstrap) must not be. `post_fork` drops them, so each
+worker builds its own on first use, or right away with SERVICES_WARM=all.
+"""
+
+# pylint: disable=import-outside-toplevel,unused-argument
+
+
+def post_fork(server, worker):
+    """Forget the clients inherited from the master"""
+    from utils.services import services
+
+    services.reset()
+
+
+def post_worker_init(worker):
+    """Build the clients before the first request if SERVICES_WARM=all, and
+    start building the BM25 index in hybrid retrieval mode"""
+    from utils.services import services
+    from utils.consts import RETRIEVER_MODE
+
+    if services.warm_mode == "all":
+        services.warm()
+        services.log_report()
+    if RETRIEVER_MODE == "hybrid":
+        from utils.lexical_index import lexical_index
+
+        lexical_index.start()
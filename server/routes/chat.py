@@ -7,10 +7,15 @@ code generation.
 
 Routes:
     POST /api/chat/new-chat - Generate React code from text/image input
+    POST /api/chat/new-chat/stream - Same as new-chat, streamed as Server-Sent Events
     GET /api/chat/messages/<session_id> - Retrieve conversation history
+        (paginated with ?limit=&cursor=&since=&fields=&preview=)
     DELETE /api/chat/delete-session/<session_id> - Delete session and messages
     POST /api/chat/add-snippet - Add code snippet to knowledge base
     POST /api/chat/upload-image - Upload UI mockup images to Cloudinary
+    GET /api/chat/image-cache - Vision cache hit rate and counters
+    DELETE /api/chat/image-cache - Forget every cached image description
+    DELETE /api/chat/image-cache/<sha256> - Forget the description of one image
 
 Features:
     - AI-powered React component generation from natural language
@@ -29,17 +34,24 @@ Dependencies:
 
 Data Flow:
     1. User sends message/image via POST /new-chat
-    2. Image analysis (if provided) using Vision API
+    2. Image analysis (if provided) using Vision API: reused from upload time
+       when available, otherwise run concurrently with context retrieval on the
+       user's text (CONCURRENT_PIPELINE)
     3. Context retrieval from Pinecone vector database
-    4. Code generation using GPT-4 with retrieved context
-    5. Response storage in MongoDB and return to client
+    4. Code generation using GPT-4 with retrieved context and the session
+       memory (recent messages plus a rolling summary, see utils.session_memory)
+    5. Response storage in MongoDB (write-behind, see utils.message_writer)
+       and return to client
 
 Request/Response Formats:
     New Chat Request:
         {
             "message": "Create a button component",
             "session_id": "uuid-string",
-            "image_url": "https://cloudinary.com/image.jpg"
+            "image_url": "https://cloudinary.com/image.jpg",
+            "no_cache": false,  (optional, skip the semantic response cache)
+            "filters": {"recommended": true, "tags": ["form"]}  (optional,
+                restrict retrieved context by snippet metadata)
         }
 
     New Chat Response:
@@ -51,6 +63,26 @@ Request/Response Formats:
             "created_at": "ISO-datetime"
         }
 
+    Streaming Response (POST /new-chat/stream or `Accept: text/event-stream`):
+        event: start
+        data: {"session_id": "uuid-string"}
+
+        event: token
+        data: {"token": "Generated "}
+
+        event: done
+        data: {<same body as the New Chat Response>}
+
+        event: error
+        data: {"error": "Streaming failed: ..."}  (instead of `done`)
+
+        `start` is sent before the image analysis and generation begin. The
+        assistant message is saved to MongoDB once the stream closes.
+
+    Stored assistant messages also carry `context_usage`, the retrieved context
+    token report ({"tokens": 1187, "budget": 1500, ...}, see
+    utils.context_packer), so prompt cost can be tracked per request.
+
 Error Handling:
     All endpoints include comprehensive error handling with specific error messages
     and appropriate HTTP status codes. Fallback responses are provided when AI
@@ -82,27 +114,416 @@ Performance:
     - Connection pooling for external API calls
 """
 
+import json
 import uuid
 import base64
+import binascii
 import datetime
 import traceback
-from flask import Blueprint, jsonify, request
-import requests
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from flask import Blueprint, Response, jsonify, request
 from langsmith import traceable
 from utils.connect_db import BASE_API_URL, messages_col, snippets_col
+from utils.vision_cache import vision_cache
+from utils.lexical_index import lexical_index
+from utils.chunking import chunk_code, chunk_ids
+from utils.ingestion import snippet_hash
+from utils.near_duplicates import (
+    MinHasher,
+    MinHashLSH,
+    encode_signature,
+    decode_signature,
+)
+from utils.session_memory import session_memory
+from utils.message_writer import message_writer
+from utils.http_client import http_clients
+from utils.metrics import metrics
 from utils.pc_index import index
+from utils.vector_store import build_filter
 from utils.langchain_service import react_assistant
 from utils.cloudinary_service import cloudinary_service
+from utils.consts import (
+    CONCURRENT_PIPELINE,
+    MERGE_IMAGE_CONTEXT,
+    VISION_PREANALYZE,
+    MEMORY_ENABLED,
+    MESSAGES_PAGE_SIZE,
+    MESSAGES_MAX_PAGE_SIZE,
+    MESSAGES_LEGACY_LIST,
+    NEAR_DUP_ENABLED,
+    NEAR_DUP_THRESHOLD,
+)
 
 chat_bp = Blueprint("chat", __name__)
 BASE_API_URL = f"{BASE_API_URL}/chat"
 
+BOILERPLATE_REPLY = """🚀 **For complete project setup, check out this CLI tool:**
+
+```bash
+npx @julseb-lib/julseb-cli
+```
+
+This CLI provides ready-to-use project templates and boilerplates for React, Express, and more!
+
+📦 **Package:** https://www.npmjs.com/package/@julseb-lib/julseb-cli"""
+
+
+def _sse_event(event, data):
+    """Format one Server-Sent Events frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Fields the message history can be projected on (`_id` is always returned)
+MESSAGE_FIELDS = (
+    "session_id",
+    "role",
+    "message",
+    "has_image",
+    "image_url",
+    "references_image",
+    "created_at",
+)
+
+
+def _encode_cursor(message):
+    """Opaque cursor pointing just after `message` in (created_at, _id) order."""
+    raw = f"{message['created_at'].isoformat()}|{message['_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor):
+    """Cursor -> (created_at, _id). Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, message_id = raw.split("|", 1)
+        return datetime.datetime.fromisoformat(created_at), ObjectId(message_id)
+    except (binascii.Error, UnicodeError, ValueError, InvalidId) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _history_query(session_id, args):
+    """Build the find() arguments for a page of message history.
+
+    Returns:
+        tuple: (filter, projection, sort, limit, fields)
+
+    Raises:
+        ValueError: If a query parameter is invalid
+    """
+    try:
+        limit = int(args.get("limit", MESSAGES_PAGE_SIZE))
+        preview = int(args["preview"]) if args.get("preview") else None
+    except ValueError as e:
+        raise ValueError("limit and preview must be integers") from e
+    if not 1 <= limit <= MESSAGES_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MESSAGES_MAX_PAGE_SIZE}")
+    if preview is not None and preview < 0:
+        raise ValueError("preview must be positive")
+
+    order = args.get("order", "asc")
+    if order not in ("asc", "desc"):
+        raise ValueError('order must be "asc" or "desc"')
+    direction = 1 if order == "asc" else -1
+    after = "$gt" if direction == 1 else "$lt"
+
+    query = {"session_id": str(session_id)}
+    if args.get("since"):
+        try:
+            query["created_at"] = {
+                "$gt": datetime.datetime.fromisoformat(args["since"])
+            }
+        except ValueError as e:
+            raise ValueError("since must be an ISO 8601 datetime") from e
+    if args.get("cursor"):
+        created_at, message_id = _decode_cursor(args["cursor"])
+        query["$or"] = [
+            {"created_at": {after: created_at}},
+            {"created_at": created_at, "_id": {after: message_id}},
+        ]
+
+    fields = MESSAGE_FIELDS
+    if args.get("fields"):
+        fields = tuple(field.strip() for field in args["fields"].split(",") if field.strip())
+        unknown = set(fields) - set(MESSAGE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    # The cursor is built from created_at
+    projection = {field: 1 for field in fields + ("created_at",)}
+    if preview is not None and "message" in fields:
+        # Truncated in MongoDB, so full bodies never leave the database
+        projection["message"] = {"$substrCP": [{"$ifNull": ["$message", ""]}, 0, preview]}
+        projection["message_length"] = {"$strLenCP": {"$ifNull": ["$message", ""]}}
+
+    sort = [("created_at", direction), ("_id", direction)]
+    return query, projection, sort, limit, fields
+
+
+def _serialize_message(message, fields):
+    message["_id"] = str(message["_id"])
+    if "message_length" in message:
+        message["truncated"] = message.pop("message_length") > len(message["message"])
+    if isinstance(message.get("created_at"), datetime.datetime):
+        message["created_at"] = message["created_at"].isoformat()
+    if "created_at" not in fields:
+        message.pop("created_at", None)
+    return message
+
+
+def _near_duplicate(text, content_hash):
+    """Sign a snippet and look for a stored near-duplicate of it.
+
+    Returns:
+        tuple: (signature fields to store, id of the closest stored
+            near-duplicate or None). Stored copies of the same text are not
+            near-duplicates.
+    """
+    hasher = MinHasher()
+    lsh = MinHashLSH(NEAR_DUP_THRESHOLD, hasher.num_perm)
+    signature = hasher.signature(text)
+    band_keys = lsh.band_keys(signature)
+    fields = {"minhash": encode_signature(signature), "lsh_bands": band_keys}
+    if not NEAR_DUP_ENABLED:
+        return fields, None
+
+    for doc in snippets_col.find(
+        {"lsh_bands": {"$in": band_keys}, "content_hash": {"$ne": content_hash}},
+        {"minhash": 1},
+    ):
+        if doc.get("minhash") is not None:
+            lsh.add(str(doc["_id"]), decode_signature(doc["minhash"]))
+    return fields, lsh.near_duplicate_of(signature)
+
+
+def _fetch_image(image_url):
+    """Download an image and return its raw bytes (over a keep-alive connection)."""
+    with metrics.span("image_download"):
+        response = http_clients.get("images", image_url)
+        response.raise_for_status()
+        return response.content
+
+
+def _save_assistant_message(session_id, reply, image_url=None, context_usage=None):
+    """Store the assistant reply and return the JSON-ready message.
+
+    `context_usage` is the prompt context token report (tokens used vs budget),
+    stored with the message for cost tracking but not returned to the client.
+    """
+    # UTC, like every timestamp the TTL index and the history cursor compare to
+    created_at = datetime.datetime.utcnow()
+    assistant_message_data = {
+        "session_id": session_id,
+        "role": "assistant",
+        "message": reply,
+        "created_at": created_at,
+    }
+
+    if image_url:
+        assistant_message_data["references_image"] = image_url
+    if context_usage:
+        assistant_message_data["context_usage"] = context_usage
+
+    # Written in the background; the id is generated up front
+    with metrics.span("save_assistant_message"):
+        message_id = message_writer.save(assistant_message_data)
+
+    # Fold older turns into the session summary, off the request path
+    if MEMORY_ENABLED:
+        session_memory.refresh(session_id)
+
+    return {
+        "_id": str(message_id),
+        "session_id": session_id,
+        "role": "assistant",
+        "message": reply,
+        "created_at": created_at.isoformat(),
+    }
+
+
+def _prepare_input(user_input, image_url, filters=None):
+    """Analyze the mockup, if any, and build the input sent to the assistant.
+
+    Returns:
+        tuple: (ai_input, image_description, documents) where
+            `image_description` is None without an image or when its analysis
+            failed, and `documents` is the context retrieved alongside the
+            vision call (None to let the assistant retrieve it)
+    """
+    image_description = ""
+    documents = None
+    precomputed_description = (
+        react_assistant.pending_image_description(image_url) if image_url else None
+    )
+    if precomputed_description:
+        # Analyzed at upload time: no download, no vision call
+        image_description = precomputed_description
+    elif image_url and CONCURRENT_PIPELINE:
+        # Vision runs alongside retrieval on the user's text
+        image_description, documents = react_assistant.analyze_image_with_context(
+            user_input,
+            lambda: _fetch_image(image_url),
+            merge_image_context=MERGE_IMAGE_CONTEXT,
+            filters=filters,
+        )
+    elif image_url:
+        try:
+            image_data = _fetch_image(image_url)
+
+            try:
+                image_description = react_assistant.describe_image(image_data)
+            except Exception:  # pylint: disable=broad-exception-caught
+                image_description = "Image analysis failed"
+
+        except Exception as image_error:  # pylint: disable=broad-exception-caught
+            image_description = "Image processing failed"
+            print("Error: " + str(image_error))
+
+    if not image_description or "failed" in image_description.lower():
+        return user_input or "Generate a React component", None, documents
+
+    ai_input = (
+        f"{user_input}\n\nUI Analysis: {image_description}"
+        if user_input
+        else f"Generate React code for this UI: {image_description}"
+    )
+    return ai_input, image_description, documents
+
+
+def _load_history(session_id):
+    """Rendered session memory, or None when memory is off"""
+    if not MEMORY_ENABLED:
+        return None
+    with metrics.span("history"):
+        return session_memory.history(session_id).text
+
+
+def _save_user_message(session_id, user_input, image_url=None):
+    """Queue the user message (written in the background)"""
+    user_message_data = {
+        "session_id": session_id,
+        "role": "user",
+        "message": user_input,
+        "has_image": bool(image_url),
+        "image_url": image_url,
+        "created_at": datetime.datetime.utcnow(),
+    }
+
+    with metrics.span("save_user_message"):
+        message_writer.save(user_message_data)
+
+
+def _stream_reply(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    session_id,
+    user_input,
+    image_url,
+    is_boilerplate,
+    bypass_cache=False,
+    filters=None,
+    continuing=False,
+):
+    """Stream the assistant reply as Server-Sent Events.
+
+    The `start` event is flushed as soon as the response opens, before the
+    image analysis, the session memory and the user message save, then one
+    `token` event follows per LLM chunk. Once the stream closes the assembled
+    reply is saved to MongoDB and sent back in a final `done` event. A failure
+    at any stage ends the stream with an `error` event.
+
+    `continuing` is set when the client sent an existing session id, whose
+    memory is then loaded.
+    """
+
+    def generate():
+        yield _sse_event("start", {"session_id": session_id})
+
+        try:
+            ai_input, image_description, documents = _prepare_input(
+                user_input, image_url, filters
+            )
+            history = _load_history(session_id) if continuing else None
+            _save_user_message(session_id, user_input, image_url)
+        except Exception as prepare_error:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
+            yield _sse_event(
+                "error", {"error": f"Failed to prepare the request: {str(prepare_error)}"}
+            )
+            return
+
+        chunks = []
+        context_usage = None
+        try:
+            if is_boilerplate:
+                tokens = iter([BOILERPLATE_REPLY])
+            else:
+                tokens = react_assistant.stream_code(
+                    user_input=ai_input,
+                    image_description=image_description,
+                    documents=documents,
+                    bypass_cache=bypass_cache,
+                    filters=filters,
+                    history=history,
+                )
+            with metrics.span("generate"):
+                for token in tokens:
+                    chunks.append(token)
+                    yield _sse_event("token", {"token": token})
+            if not is_boilerplate:
+                context_usage = react_assistant.context_usage()
+
+        except GeneratorExit:
+            # Client disconnected: keep what was generated so history stays consistent
+            if chunks:
+                try:
+                    _save_assistant_message(
+                        session_id,
+                        "".join(chunks),
+                        image_url,
+                        None if is_boilerplate else react_assistant.context_usage(),
+                    )
+                except Exception as save_error:  # pylint: disable=broad-exception-caught
+                    print(f"Failed to save partial reply: {str(save_error)}")
+            raise
+        except Exception as stream_error:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
+            yield _sse_event("error", {"error": f"Streaming failed: {str(stream_error)}"})
+            return
+
+        try:
+            response_data = _save_assistant_message(
+                session_id, "".join(chunks), image_url, context_usage
+            )
+        except Exception as save_error:  # pylint: disable=broad-exception-caught
+            yield _sse_event(
+                "error", {"error": f"Failed to save assistant message: {str(save_error)}"}
+            )
+            return
+
+        yield _sse_event("done", response_data)
+
+    # Everything the generator needs is passed in explicitly, so it does not
+    # depend on the request context still being active while streaming
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @chat_bp.route(f"{BASE_API_URL}/new-chat", methods=["POST"])
+@chat_bp.route(f"{BASE_API_URL}/new-chat/stream", methods=["POST"])
 @traceable(run_type="tool", name="chat_endpoint")
-def chat():  # pylint: disable=too-many-locals,too-many-return-statements,too-many-branches
-    """Generate React code from user input and optional UI mockup image."""
+def chat():  # pylint: disable=too-many-locals,too-many-return-statements,too-many-branches,too-many-statements
+    """Generate React code from user input and optional UI mockup image.
+
+    The reply is streamed as Server-Sent Events when the request targets
+    `/new-chat/stream` or sends `Accept: text/event-stream`.
+    """
     try:
+        wants_stream = request.path.endswith(
+            "/stream"
+        ) or "text/event-stream" in request.headers.get("Accept", "")
+
         # Step 1: Parse request data
         try:
             data = request.get_json()
@@ -112,6 +533,13 @@ def chat():  # pylint: disable=too-many-locals,too-many-return-statements,too-ma
         user_input = data.get("message", "") if data else ""
         session_id = data.get("session_id") if data else None
         image_url = data.get("image_url") if data else None
+        bypass_cache = bool(data.get("no_cache", False)) if data else False
+        filters = data.get("filters") if data else None
+        try:
+            # Rejected here: retrieval would otherwise run without context
+            build_filter(filters)
+        except ValueError as filter_error:
+            return jsonify({"error": f"Invalid filters: {str(filter_error)}"}), 400
 
         # Step 2: Generate session ID if needed
         if not session_id:
@@ -140,84 +568,52 @@ def chat():  # pylint: disable=too-many-locals,too-many-return-statements,too-ma
             keyword in user_input.lower() for keyword in boilerplate_keywords
         )
 
-        # Step 4: Image analysis (if image provided)
-        image_description = ""
-        if image_url:
-            try:
-                response = requests.get(image_url, timeout=10)
-                response.raise_for_status()
-                image_data = response.content
-
-                base64_image = base64.b64encode(image_data).decode("utf-8")
-
-                try:
-                    image_description = react_assistant.analyze_image(base64_image)
-                except Exception:
-                    image_description = "Image analysis failed"
-
-            except Exception as image_error:
-                image_description = "Image processing failed"
-                print("Error: " + str(image_error))
+        # Streaming: the response opens now, every later stage runs inside it
+        if wants_stream:
+            return _stream_reply(
+                session_id,
+                user_input,
+                image_url,
+                is_boilerplate_request,
+                bypass_cache,
+                filters,
+                continuing=bool(data.get("session_id")),
+            )
 
-        # Step 5: Prepare AI input
-        try:
-            if image_description and "failed" not in image_description.lower():
-                ai_input = (
-                    f"{user_input}\n\nUI Analysis: {image_description}"
-                    if user_input
-                    else f"Generate React code for this UI: {image_description}"
-                )
-            else:
-                ai_input = user_input or "Generate a React component"
+        # Step 4: Image analysis (if image provided) and AI input
+        ai_input, image_description, documents = _prepare_input(
+            user_input, image_url, filters
+        )
 
-        except Exception as input_error:
-            return (
-                jsonify({"error": f"Input preparation failed: {str(input_error)}"}),
-                500,
-            )
+        # Step 5: Load the session memory, then save the user message
+        history = _load_history(session_id) if data.get("session_id") else None
 
-        # Step 6: Save user message
         try:
-            user_message_data = {
-                "session_id": session_id,
-                "role": "user",
-                "message": user_input,
-                "has_image": bool(image_url),
-                "image_url": image_url,
-                "created_at": datetime.datetime.now(),
-            }
-
-            messages_col.insert_one(user_message_data)
+            _save_user_message(session_id, user_input, image_url)
         except Exception as save_error:
             return (
                 jsonify({"error": f"Failed to save user message: {str(save_error)}"}),
                 500,
             )
 
-            # Step 7: Generate AI response
+        # Step 6: Generate AI response
+        context_usage = None
         try:
             # For boilerplate requests, only show CLI recommendation
             if is_boilerplate_request:
-                reply = """🚀 **For complete project setup, check out this CLI tool:**
-
-```bash
-npx @julseb-lib/julseb-cli
-```
-
-This CLI provides ready-to-use project templates and boilerplates for React, Express, and more!
-
-📦 **Package:** https://www.npmjs.com/package/@julseb-lib/julseb-cli"""
+                reply = BOILERPLATE_REPLY
             else:
                 # Generate normal AI response for non-boilerplate requests
-                reply = react_assistant.generate_code(
-                    user_input=ai_input,
-                    image_description=(
-                        image_description
-                        if image_description
-                        and "failed" not in image_description.lower()
-                        else None
-                    ),
-                )
+                with metrics.span("generate"):
+                    reply = react_assistant.generate_code(
+                        user_input=ai_input,
+                        image_description=image_description,
+                        documents=documents,
+                        bypass_cache=bypass_cache,
+                        filters=filters,
+                        history=history,
+                    )
+                context_usage = react_assistant.context_usage()
 
         except Exception:
             # Fallback responses
@@ -246,19 +642,11 @@ const Button = () => {
 export default Button;
 ```"""
 
-        # Step 8: Save assistant response
+        # Step 7: Save assistant response
         try:
-            assistant_message_data = {
-                "session_id": session_id,
-                "role": "assistant",
-                "message": reply,
-                "created_at": datetime.datetime.now(),
-            }
-
-            if image_url:
-                assistant_message_data["references_image"] = image_url
-
-            result = messages_col.insert_one(assistant_message_data)
+            response_data = _save_assistant_message(
+                session_id, reply, image_url, context_usage
+            )
         except Exception as save_error:
             return (
                 jsonify(
@@ -267,15 +655,8 @@ export default Button;
                 500,
             )
 
-        # Step 9: Prepare response
+        # Step 8: Prepare response
         try:
-            response_data = {
-                "_id": str(result.inserted_id),
-                "session_id": session_id,
-                "role": "assistant",
-                "message": reply,
-                "created_at": datetime.datetime.now().isoformat(),
-            }
             return jsonify(response_data), 201
 
         except Exception as response_error:
@@ -301,20 +682,79 @@ export default Button;
 
 @chat_bp.route(f"{BASE_API_URL}/messages/<session_id>", methods=["GET"])
 def get_session_messages(session_id):
-    """Retrieve all messages for a specific session.
+    """Retrieve the messages of a session, oldest first.
+
+    Messages are returned a page at a time, read through the
+    (session_id, created_at, _id) index; without query parameters that is the
+    first MESSAGES_PAGE_SIZE messages with the MESSAGE_FIELDS projection. While
+    clients migrate, MESSAGES_LEGACY_LIST=true answers requests without query
+    parameters with the original plain list of every message instead.
 
     Args:
         session_id (str): Session UUID to retrieve messages for
 
+    Query Parameters:
+        limit (int, optional): Messages per page (default MESSAGES_PAGE_SIZE,
+            at most MESSAGES_MAX_PAGE_SIZE)
+        cursor (str, optional): `next_cursor` of the previous page
+        since (str, optional): ISO datetime; only messages created after it,
+            for incremental polling
+        fields (str, optional): Comma-separated fields to return, e.g.
+            "role,created_at" (`_id` is always included)
+        preview (int, optional): Return only the first N characters of each
+            message, with `truncated` set when it was cut
+        order (str, optional): "asc" (default) or "desc" for newest first
+
     Returns:
-        tuple: JSON list of messages with MongoDB object IDs converted to strings,
-               HTTP status code 201
+        tuple: JSON response, HTTP status code
+            Plain list (201, MESSAGES_LEGACY_LIST only): every message,
+                `_id` as string
+            Page (200):
+                - messages (list): The page, `created_at` as ISO datetime
+                - next_cursor (str | None): Cursor after the last message
+                  returned; pass it back for the next page, or later to poll
+                  for new messages
+                - has_more (bool): True if another page follows right away
+            Error (400):
+                - error (str): Invalid query parameter
     """
-    res = messages_col.find({"session_id": str(session_id)})
-    messages = list(res)
-    for message in messages:
-        message["_id"] = str(message["_id"])
-    return jsonify(messages), 201
+    # Include messages still in the write-behind queue
+    message_writer.wait_for(str(session_id))
+    if MESSAGES_LEGACY_LIST and not request.args:
+        res = messages_col.find({"session_id": str(session_id)}).sort(
+            [("created_at", 1), ("_id", 1)]
+        )
+        messages = list(res)
+        for message in messages:
+            message["_id"] = str(message["_id"])
+        return jsonify(messages), 201
+
+    try:
+        query, projection, sort, limit, fields = _history_query(
+            session_id, request.args
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # One extra message tells whether another page follows
+    messages = list(messages_col.find(query, projection).sort(sort).limit(limit + 1))
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    # Always set once there are messages, so pollers can resume from it
+    next_cursor = (
+        _encode_cursor(messages[-1]) if messages else request.args.get("cursor")
+    )
+
+    return (
+        jsonify(
+            {
+                "messages": [_serialize_message(message, fields) for message in messages],
+                "next_cursor": next_cursor,
+                "has_more": has_more,
+            }
+        ),
+        200,
+    )
 
 
 @chat_bp.route(f"{BASE_API_URL}/delete-session/<session_id>", methods=["DELETE"])
@@ -327,34 +767,100 @@ def delete_session(session_id):
     Returns:
         str: Confirmation message
     """
+    message_writer.wait_for(session_id)
     messages_col.delete_many({"session_id": session_id})
+    session_memory.forget(session_id)
     return "Your session has been deleted!"
 
 
 @chat_bp.route(f"{BASE_API_URL}/add-snippet", methods=["POST"])
 def add_snippet():
-    """Add a new code snippet to the knowledge base."""
+    """Add a new code snippet to the knowledge base.
+
+    Snippets are keyed by `content_hash` like ingested ones (see
+    utils.ingestion), so adding text that is already stored and indexed is a
+    no-op, and a snippet whose vectors were never confirmed is indexed again.
+    They are signed with MinHash like ingested ones too: a near-duplicate of a
+    stored snippet (NEAR_DUP_THRESHOLD) is refused unless the body sets
+    `allow_near_duplicate`.
+
+    Returns:
+        tuple: JSON response, HTTP status code
+            Success (200): status ("added" or "exists") and id of the snippet
+            Conflict (409): error and duplicate_of, the similar snippet's id
+    """
     data = request.get_json()
     text = data["text"]
     tags = data.get("tags", [])
 
-    # Store in DB
-    result = snippets_col.insert_one(
+    # Long snippets are stored as one vector per chunk
+    chunks = chunk_code(text)
+    content_hash = snippet_hash(text)
+
+    signature_fields, duplicate_of = _near_duplicate(text, content_hash)
+    if duplicate_of and not data.get("allow_near_duplicate"):
+        return (
+            jsonify(
+                {
+                    "error": "A near-duplicate of this snippet is already stored",
+                    "duplicate_of": duplicate_of,
+                }
+            ),
+            409,
+        )
+
+    # Store in DB, once per content
+    now = datetime.datetime.utcnow()
+    snippet = snippets_col.find_one_and_update(
+        {"content_hash": content_hash},
         {
-            "text": text,
-            "tags": tags,
-            "created_at": datetime.datetime.now(),
-            "updated_at": datetime.datetime.now(),
-        }
+            "$setOnInsert": {
+                "text": text,
+                "tags": tags,
+                "chunk_count": len(chunks),
+                "indexed": False,
+                "created_at": now,
+                "updated_at": now,
+                **signature_fields,
+            }
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
     )
+    snippet_id = str(snippet["_id"])
+    if snippet.get("indexed"):
+        return jsonify({"status": "exists", "id": snippet_id})
+    # A stored copy keeps its own text, tags and chunking
+    tags = snippet.get("tags", tags)
+    chunks = chunk_code(snippet["text"]) if snippet["text"] != text else chunks
 
     # Generate and upload to Pinecone using existing embeddings
-    embedding = react_assistant.embeddings.embed_query(text)
+    embeddings = react_assistant.embeddings.embed_documents(chunks)
 
     index.upsert(
-        [(str(result.inserted_id), embedding, {"text": text, "tags": ",".join(tags)})]
+        [
+            (
+                vector_id,
+                embedding,
+                {
+                    "text": chunk,
+                    "parent_id": snippet_id,
+                    "chunk": position,
+                    "chunk_count": len(chunks),
+                    "tags": ",".join(tags),
+                    "tag_list": tags,
+                    "content_hash": content_hash,
+                },
+            )
+            for position, (vector_id, chunk, embedding) in enumerate(
+                zip(chunk_ids(snippet_id, len(chunks)), chunks, embeddings)
+            )
+        ]
     )
-    return jsonify({"status": "added"})
+    # Only now is the snippet skipped by ingestion and later adds
+    snippets_col.update_one({"_id": snippet["_id"]}, {"$set": {"indexed": True}})
+    lexical_index.add(snippet_id, snippet["text"])
+    return jsonify({"status": "added", "id": snippet_id})
 
 
 @chat_bp.route(f"{BASE_API_URL}/upload-image", methods=["POST"])
@@ -366,6 +872,8 @@ def upload_image():
 
     Form Data:
         image (file): Image file (PNG, JPG, GIF, max 5MB)
+        analyze (str, optional): "true" to start the vision analysis right away
+            on the uploaded bytes, "false" to skip it. Defaults to VISION_PREANALYZE.
 
     Returns:
         tuple: JSON response with upload results, HTTP status code
@@ -374,6 +882,8 @@ def upload_image():
                 - image_url (str): Cloudinary secure URL
                 - public_id (str): Cloudinary public identifier
                 - filename (str): Original filename
+                - analysis_started (bool): True if the vision analysis runs in
+                  the background and will be reused by new-chat
             Error (400/500):
                 - error (str): Error description
 
@@ -402,6 +912,16 @@ def upload_image():
         )
 
         if cloudinary_result["success"]:
+            analyze = request.form.get(
+                "analyze", str(VISION_PREANALYZE)
+            ).lower() in ("true", "1")
+            if analyze:
+                react_assistant.prefetch_image_description(
+                    image_data,
+                    cloudinary_result["url"],
+                    cloudinary_result["public_id"],
+                )
+
             return (
                 jsonify(
                     {
@@ -409,6 +929,7 @@ def upload_image():
                         "image_url": cloudinary_result["url"],
                         "public_id": cloudinary_result["public_id"],
                         "filename": image_file.filename,
+                        "analysis_started": analyze,
                     }
                 ),
                 200,
@@ -422,3 +943,33 @@ def upload_image():
     except Exception as e:
         print(f"Upload error: {str(e)}")
         return jsonify({"error": str(e)}), 500
+
+
+@chat_bp.route(f"{BASE_API_URL}/image-cache", methods=["GET"])
+def image_cache_stats():
+    """Return vision cache counters.
+
+    Returns:
+        tuple: JSON with exact_hits, perceptual_hits, misses, errors, hit_rate
+            and known_hashes, HTTP status code 200
+    """
+    return jsonify(vision_cache.stats()), 200
+
+
+@chat_bp.route(f"{BASE_API_URL}/image-cache", methods=["DELETE"])
+@chat_bp.route(f"{BASE_API_URL}/image-cache/<sha256>", methods=["DELETE"])
+def clear_image_cache(sha256=None):
+    """Invalidate cached image descriptions.
+
+    Args:
+        sha256 (str, optional): Content hash of one image. Clears everything
+            when omitted.
+
+    Returns:
+        tuple: JSON with the number of removed entries, HTTP status code
+    """
+    try:
+        removed = vision_cache.invalidate(sha256) if sha256 else vision_cache.clear()
+        return jsonify({"status": "cleared", "removed": removed}), 200
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        return jsonify({"error": f"Failed to clear image cache: {str(e)}"}), 500
@@ -6,31 +6,40 @@ downloads, processes, and embeds React components to build a comprehensive knowl
 base for the AI-powered code generation system.
 
 Routes:
-    POST /api/populate/populate-from-hf - Download and process React dataset from HuggingFace
+    POST /api/populate/populate-from-hf - Start a background job loading the React dataset
+    GET /api/populate/jobs/<job_id> - Job status, live progress, throughput and ETA
+    POST /api/populate/jobs/<job_id>/cancel - Cancel a queued or running job
+
+The extraction, embedding and storage steps live in `utils.ingestion`. Jobs run
+on a local thread pool (`utils.jobs`) and keep their state in MongoDB, so any
+gunicorn worker can report on or cancel a job started by another one.
 
 Features:
-    - Automated dataset download from HuggingFace Hub
+    - Streaming dataset reads from HuggingFace Hub (only the records needed)
+    - Local JSONL/Parquet files from INGEST_DATA_DIR accepted as the source
     - Intelligent React code detection and filtering
-    - Batch processing for optimal performance
+    - Near-duplicate elimination (MinHash/LSH) before embedding
+    - Batched, concurrent embedding requests and bulk MongoDB writes
     - Dual storage: MongoDB for metadata, Pinecone for vector search
-    - Progress tracking and error handling
+    - Background execution with live progress, ETA and cancellation
     - Content validation and preprocessing
 
 Dataset Processing:
     - Source: cfahlgren1/react-code-instructions dataset
     - Filters: Assistant messages containing React code patterns
     - Keywords: import react, useState, useEffect, JSX, components
-    - Limit: 1000 high-quality React examples
-    - Batch size: 100 items per Pinecone upsert
+    - Limit: 1000 high-quality React examples (INGEST_LIMIT)
+    - Batch size: 100 snippets per embedding request (INGEST_BATCH_SIZE)
+    - Concurrency: 4 embedding requests in flight (INGEST_CONCURRENCY)
 
 Data Flow:
-    1. Download dataset from HuggingFace
+    1. Stream dataset records from HuggingFace (or a local file)
     2. Extract assistant messages with React code
     3. Validate content with React keyword detection
-    4. Store full content in MongoDB with metadata
-    5. Generate embeddings using OpenAI text-embedding-ada-002
-    6. Batch upload embeddings to Pinecone vector database
-    7. Return processing statistics
+    4. Generate embeddings for a whole batch with OpenAI text-embedding-ada-002
+    5. Store the batch in MongoDB with one bulk_write of upserts on content_hash
+    6. Upload the batch to Pinecone in the background while the next one is embedded
+    7. Return processing statistics and throughput
 
 Data Structure:
     MongoDB Document:
@@ -41,21 +50,29 @@ Data Structure:
             "model": "gpt-4",
             "recommended": true,
             "upvoted": false,
+            "content_hash": "sha256 of the whitespace-normalized text",
+            "indexed": true,
+            "chunk_count": 2,
             "created_at": datetime,
             "updated_at": datetime
         }
 
-    Pinecone Vector:
+    Pinecone Vector (one per chunk of a long snippet, see utils.chunking):
         {
-            "id": "mongodb_object_id",
+            "id": "mongodb_object_id" | "mongodb_object_id#1",
             "vector": [1536-dimensional embedding],
             "metadata": {
-                "text": "Truncated code (1000 chars)",
+                "text": "Chunk text: whole components/functions (2000 chars max)",
+                "parent_id": "mongodb_object_id",
+                "chunk": 0,
+                "chunk_count": 2,
                 "tags": "react,recommended",
+                "tag_list": ["react", "recommended"],
                 "recommended": true,
                 "upvoted": false,
                 "model": "gpt-4",
-                "dataset": "cfahlgren1/react-code-instructions"
+                "dataset": "cfahlgren1/react-code-instructions",
+                "content_hash": "sha256 of the whitespace-normalized text"
             }
         }
 
@@ -66,47 +83,112 @@ Dependencies:
     - pinecone: Vector database operations
 
 Performance Optimizations:
-    - Batch processing (100 items per Pinecone upsert)
+    - One embeddings request per batch instead of per snippet, several in flight
+    - One OpenAI client per run (connection reuse)
+    - One bulk_write per batch, upserting on content_hash: no round trip per
+      snippet, and snippets already stored are not inserted twice
+    - Streaming reads: the dataset is never materialized, and reading stops at the limit
+    - Pinecone upserts pipelined on a background thread (100 vectors per request)
     - Content length validation (min 50 chars)
-    - Text truncation for embedding API (8000 chars max)
-    - Metadata truncation for Pinecone (1000 chars)
-    - Progress logging every 100 processed items
+    - Code-aware chunking at component/function boundaries (CHUNK_MAX_CHARS)
+      instead of truncating long snippets
+    - Progress and throughput logging after every stored batch
 
 Error Handling:
     - Individual item failures don't stop processing
+    - Reruns are idempotent (content-hash upserts) and resume from a checkpoint
     - MongoDB connection errors handled gracefully
-    - OpenAI API failures skip item and continue
-    - Pinecone batch upload retries
+    - OpenAI API failures are retried by the client, then skip the batch
+    - A failed batch is not written anywhere (no snippets without vectors)
     - Comprehensive error logging and traceback
 
 Request/Response Format:
     Request:
         POST /api/populate/populate-from-hf
         (No body required)
+        Optional: {"batch_size": 100, "concurrency": 4, "limit": 1000,
+                   "source": "cfahlgren1/react-code-instructions", "streaming": true,
+                   "restart": false, "near_duplicate_threshold": 0.85}
+
+    Response (202 Accepted):
+        {
+            "status": "queued",
+            "job_id": "uuid-string",
+            "status_url": "/api/populate/jobs/uuid-string"
+        }
 
-    Response (Success):
+    Job Status:
+        GET /api/populate/jobs/<job_id>
+        {
+            "id": "uuid-string",
+            "type": "populate-from-hf",
+            "status": "running",  (queued, running, completed, failed, cancelled)
+            "params": {"source": "cfahlgren1/react-code-instructions", ...},
+            "progress": {"processed": 2210, "loaded": 400, "skipped": 0,
+                         "failed": 0, "snippets_per_second": 24.1,
+                         "eta_seconds": 24.9, ...},
+            "result": null,  (final statistics, see below)
+            "cancel_requested": false,
+            "stale": false,  (true when a running job stopped sending heartbeats)
+            "created_at": "ISO-datetime",
+            "started_at": "ISO-datetime",
+            "heartbeat_at": "ISO-datetime"
+        }
+
+    Job Result:
         {
-            "status": "success",
             "loaded": 1000,
             "processed": 5234,
-            "pinecone_populated": true
+            "skipped": 0,
+            "near_duplicates": 312,
+            "near_duplicate_ratio": 0.2378,
+            "failed": 0,
+            "batches": 10,
+            "upsert_errors": 0,
+            "resumed_from": 0,
+            "target": 1000,
+            "eta_seconds": 0.0,
+            "cancelled": false,
+            "elapsed_seconds": 41.2,
+            "snippets_per_second": 24.3,
+            "batch_size": 100,
+            "concurrency": 4,
+            "pinecone_populated": true,
+            "checkpoint": {
+                "dataset": "cfahlgren1/react-code-instructions",
+                "split": "train",
+                "offset": 5234,
+                "loaded": 1000,
+                "skipped": 0,
+                "failed": 0,
+                "exhausted": false,
+                "status": "completed"
+            }
         }
 
     Response (Error):
         {
             "error": "Detailed error message"
         }
+    (409 with "job_id" when the same source is already being populated)
 
 Example Usage:
     # Populate knowledge base from HuggingFace
     POST /api/populate/populate-from-hf
 
-    # Monitor progress in server logs:
-    # Progress: Processed 100, Loaded 23
-    # Upserting batch of 100 to Pinecone...
+    # Poll progress
+    GET /api/populate/jobs/<job_id>
+
+    # Stop early (the checkpoint keeps what was loaded)
+    POST /api/populate/jobs/<job_id>/cancel
+
+    # Or follow the server logs:
+    # Progress: Processed 523, Loaded 100 (31.4 snippets/s)
     # === FINAL RESULTS ===
     # Processed: 5234 items
     # Loaded: 1000 React components
+    # Failed: 0 snippets
+    # Throughput: 24.3 snippets/s in 41.2s
 
 Security Considerations:
     - Content validation before storage
@@ -116,218 +198,231 @@ Security Considerations:
 
 Note:
     This endpoint should be run during initial setup or when refreshing
-    the knowledge base. Processing 1000+ items may take several minutes
-    due to embedding generation and API rate limits.
+    the knowledge base. Jobs run inside the server process, so a worker
+    restart interrupts them; start the population again to resume from the
+    checkpoint. Throughput is mostly bound by the embeddings API rate
+    limits; raise INGEST_CONCURRENCY only as far as your OpenAI tier allows.
 
-Raises:
+Raises (reported as the job "error"):
     ConnectionError: If unable to connect to HuggingFace, MongoDB, or Pinecone
     ValueError: If dataset format is invalid or corrupted
     Exception: If embedding generation or batch processing fails
 """
 
-import datetime
-import traceback
-from flask import jsonify, Blueprint
-from datasets import load_dataset
-from openai import OpenAI
-from utils.connect_db import BASE_API_URL, snippets_col
-from utils.pc_index import index
-from utils.consts import OPENAI_API_KEY
+from flask import jsonify, request, Blueprint
+from utils.connect_db import BASE_API_URL
+from utils.ingestion import (
+    IngestionPipeline,
+    IngestionCheckpoint,
+    DATASET_NAME,
+    resolve_source,
+    load_records,
+)
+from utils.jobs import job_runner, JobConflict
+from utils.consts import (
+    INGEST_BATCH_SIZE,
+    INGEST_CONCURRENCY,
+    INGEST_LIMIT,
+    INGEST_STREAMING,
+    INGEST_DATA_DIR,
+    NEAR_DUP_ENABLED,
+    NEAR_DUP_THRESHOLD,
+)
 
 populate_bp = Blueprint("populate", __name__)
 
 BASE_API_URL = f"{BASE_API_URL}/populate"
 
+POPULATE_JOB = "populate-from-hf"
+
+
+def _flag(options, name, default):
+    """Read a boolean option sent as a JSON boolean or "true"/"false" string"""
+    value = options.get(name, default)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    raise ValueError(f"{name} must be true or false")
+
+
+def _populate_job(  # pylint: disable=too-many-arguments
+    context,
+    source,
+    streaming,
+    batch_size,
+    concurrency,
+    limit,
+    restart,
+    near_duplicate_threshold,
+):
+    """Background job body: stream the dataset through the ingestion pipeline"""
+    print(f"Starting populate from {source}...")
+
+    # Open the dataset (lazily when streaming: records are pulled on demand)
+    print(f"Loading {source} ({'streaming' if streaming else 'full download'})...")
+    records = load_records(source, streaming=streaming)
+
+    checkpoint = IngestionCheckpoint(source)
+    if restart:
+        checkpoint.reset()
+
+    pipeline = IngestionPipeline(
+        batch_size=batch_size,
+        concurrency=concurrency,
+        limit=limit,
+        dataset=source,
+        checkpoint=checkpoint,
+        on_progress=context.report,
+        should_stop=context.cancelled,
+        near_duplicate_threshold=near_duplicate_threshold,
+    )
+    stats = pipeline.run(records)
+    context.report(stats, force=True)
+
+    return {
+        **stats,
+        "pinecone_populated": stats["loaded"] > 0 and not stats["upsert_errors"],
+        "checkpoint": checkpoint.load(),
+    }
+
 
 @populate_bp.route(f"{BASE_API_URL}/populate-from-hf", methods=["POST"])
-def populate_from_huggingface():  # pylint: disable=too-many-locals disable=too-many-branches disable=too-many-statements
-    """Download and process React code examples from HuggingFace dataset.
+def populate_from_huggingface():
+    """Start a background job that loads React code examples from HuggingFace.
+
+    The job streams the cfahlgren1/react-code-instructions dataset, extracts
+    React components from assistant messages, generates embeddings in
+    concurrent batches, and populates both MongoDB and Pinecone for the AI code
+    generation knowledge base. Follow it with GET /jobs/<job_id>.
 
-    Downloads the cfahlgren1/react-code-instructions dataset, extracts React
-    components from assistant messages, generates embeddings, and populates
-    both MongoDB and Pinecone for the AI code generation knowledge base.
+    Optional JSON body: batch_size, concurrency, limit (defaults from
+    INGEST_BATCH_SIZE, INGEST_CONCURRENCY and INGEST_LIMIT; limit 0 loads the
+    whole dataset), source (HuggingFace dataset name, or .jsonl/.parquet file
+    inside INGEST_DATA_DIR), streaming (default INGEST_STREAMING),
+    restart (forget the saved checkpoint and start from the first record) and
+    near_duplicate_threshold (estimated Jaccard similarity above which a snippet
+    is dropped as a near-duplicate, null to disable; default NEAR_DUP_THRESHOLD).
+
+    Runs are idempotent: snippets already stored are skipped without being
+    embedded, and an interrupted run resumes from its checkpoint.
 
     Returns:
-        tuple: JSON response with processing statistics, HTTP status code
-            Success (200):
-                - status (str): "success"
-                - loaded (int): Number of React components stored
-                - processed (int): Total items processed from dataset
-                - pinecone_populated (bool): True if vector embeddings uploaded
+        tuple: JSON response, HTTP status code
+            Accepted (202):
+                - status (str): "queued"
+                - job_id (str): Id of the background job
+                - status_url (str): Where to poll the job progress
+            Error (400):
+                - error (str): Invalid batch_size, concurrency, limit, source,
+                  streaming, restart or near_duplicate_threshold
+            Error (409):
+                - error (str): This dataset is already being populated
+                - job_id (str): Id of the running job
             Error (500):
                 - error (str): Detailed error description
-
-    Raises:
-        ConnectionError: If dataset download or database connections fail
-        ValueError: If dataset format is invalid
-        Exception: If processing pipeline encounters unrecoverable errors
     """
-    try:  # pylint: disable=too-many-nested-blocks
-        print("Starting populate from HuggingFace...")
-
-        # Load the React dataset
-        print("Loading React code instructions dataset...")
-        dataset = load_dataset("cfahlgren1/react-code-instructions")
-        print(f"Dataset loaded. Total items: {len(dataset['train'])}")
-
-        loaded_count = 0
-        processed_count = 0
-        pinecone_batch = []  # Batch upserts for better performance
-
-        for item in dataset["train"]:
-            try:
-                processed_count += 1
-                if processed_count % 100 == 0:
-                    print(
-                        f"Progress: Processed {processed_count}, Loaded {loaded_count}"
-                    )
-
-                # Extract messages from the dataset
-                messages = item.get("messages", [])
-                if not messages:
-                    continue
-
-                # Look for assistant messages containing React code
-                for message in messages:
-                    if message.get("role") == "assistant":
-                        content = message.get("content", "")
-
-                        if not content or len(content) < 50:
-                            continue
-
-                        # Check if content contains React code
-                        react_keywords = [
-                            "import react",
-                            "from 'react'",
-                            "export default",
-                            "usestate",
-                            "useeffect",
-                            "jsx",
-                            "component",
-                            "function",
-                            "const",
-                            "=>",
-                            "return",
-                        ]
-
-                        if any(
-                            keyword in content.lower() for keyword in react_keywords
-                        ):
-                            # Extract metadata
-                            tags = ["react"]
-                            if item.get("recommended", False):
-                                tags.append("recommended")
-                            if item.get("upvoted", False):
-                                tags.append("upvoted")
-                            if item.get("model"):
-                                tags.append(f"model:{item['model']}")
-
-                            # Store in MongoDB
-                            try:
-                                result = snippets_col.insert_one(
-                                    {
-                                        "text": content,
-                                        "tags": tags,
-                                        "original_dataset": "cfahlgren1/react-code-instructions",
-                                        "model": item.get("model"),
-                                        "recommended": item.get("recommended", False),
-                                        "upvoted": item.get("upvoted", False),
-                                        "created_at": datetime.datetime.utcnow(),
-                                        "updated_at": datetime.datetime.utcnow(),
-                                    }
-                                )
-                                snippet_id = str(result.inserted_id)
-                            except (
-                                Exception  # pylint: disable=broad-exception-caught
-                            ) as mongo_error:
-                                print(f"MongoDB error: {str(mongo_error)}")
-                                continue
-
-                            # Generate embedding
-                            try:
-                                # Limit text length for embedding API
-                                embedding_text = (
-                                    content[:8000] if len(content) > 8000 else content
-                                )
-
-                                client = OpenAI(api_key=OPENAI_API_KEY)
-                                response = client.embeddings.create(
-                                    input=embedding_text, model="text-embedding-ada-002"
-                                )
-                                embedding = response.data[0].embedding
-
-                                # Add to batch for Pinecone
-                                pinecone_batch.append(
-                                    (
-                                        snippet_id,
-                                        embedding,
-                                        {
-                                            "text": content[
-                                                :1000
-                                            ],  # Truncate for metadata
-                                            "tags": ",".join(tags),
-                                            "recommended": item.get(
-                                                "recommended", False
-                                            ),
-                                            "upvoted": item.get("upvoted", False),
-                                            "model": item.get("model", "unknown"),
-                                            "dataset": "cfahlgren1/react-code-instructions",
-                                        },
-                                    )
-                                )
-
-                                loaded_count += 1
-
-                                # Batch upsert to Pinecone every 100 items
-                                if len(pinecone_batch) >= 100:
-                                    print(
-                                        f"Upserting batch of {len(pinecone_batch)} to Pinecone..."
-                                    )
-                                    index.upsert(pinecone_batch)
-                                    pinecone_batch = []  # Clear batch
-
-                            except (
-                                Exception  # pylint: disable=broad-exception-caught
-                            ) as embedding_error:
-                                print(
-                                    f"Embedding/Pinecone error: {str(embedding_error)}"
-                                )
-                                continue
-
-                            # Stop at limit
-                            if loaded_count >= 1000:
-                                print(f"Reached limit of {loaded_count} items")
-                                break
-
-                if loaded_count >= 1000:
-                    break
-
-            except Exception as item_error:  # pylint: disable=broad-exception-caught
-                print(f"Error processing item {processed_count}: {str(item_error)}")
-                continue
-
-        # Upload remaining batch to Pinecone
-        if pinecone_batch:
-            print(f"Upserting final batch of {len(pinecone_batch)} to Pinecone...")
-            index.upsert(pinecone_batch)
-
-        print("\n=== FINAL RESULTS ===")
-        print(f"Processed: {processed_count} items")
-        print(f"Loaded: {loaded_count} React components")
-        print(f"Successfully populated Pinecone with {loaded_count} embeddings")
-
-        return jsonify(
-            {
-                "status": "success",
-                "loaded": loaded_count,
-                "processed": processed_count,
-                "pinecone_populated": True,
-            }
+    options = request.get_json(silent=True) or {}
+    try:
+        batch_size = int(options.get("batch_size", INGEST_BATCH_SIZE))
+        concurrency = int(options.get("concurrency", INGEST_CONCURRENCY))
+        limit = int(options.get("limit", INGEST_LIMIT))
+    except (TypeError, ValueError):
+        return jsonify({"error": "batch_size, concurrency and limit must be integers"}), 400
+    if batch_size < 1 or concurrency < 1 or limit < 0:
+        return (
+            jsonify(
+                {
+                    "error": "batch_size and concurrency must be at least 1, "
+                    "limit at least 0"
+                }
+            ),
+            400,
+        )
+    try:
+        streaming = _flag(options, "streaming", INGEST_STREAMING)
+        restart = _flag(options, "restart", False)
+    except ValueError as flag_error:
+        return jsonify({"error": str(flag_error)}), 400
+    near_duplicate_threshold = options.get(
+        "near_duplicate_threshold",
+        NEAR_DUP_THRESHOLD if NEAR_DUP_ENABLED else None,
+    )
+    if near_duplicate_threshold is not None and not (
+        isinstance(near_duplicate_threshold, (int, float))
+        and 0 < near_duplicate_threshold <= 1
+    ):
+        return (
+            jsonify({"error": "near_duplicate_threshold must be between 0 and 1"}),
+            400,
+        )
+    try:
+        source = resolve_source(options.get("source", DATASET_NAME), INGEST_DATA_DIR)
+    except ValueError as source_error:
+        return jsonify({"error": str(source_error)}), 400
+
+    try:
+        # Runs on the same dataset would fight over its checkpoint: one at a time
+        job_id = job_runner.submit(
+            POPULATE_JOB,
+            _populate_job,
+            lock_key=source,
+            source=source,
+            streaming=streaming,
+            batch_size=batch_size,
+            concurrency=concurrency,
+            limit=limit,
+            restart=restart,
+            near_duplicate_threshold=near_duplicate_threshold,
+        )
+    except JobConflict as conflict:
+        return (
+            jsonify(
+                {
+                    "error": f"{source} is already being populated",
+                    "job_id": conflict.job_id,
+                }
+            ),
+            409,
         )
-
     except Exception as e:  # pylint: disable=broad-exception-caught
-        error_msg = f"Main error: {str(e)}"
+        error_msg = f"Could not start job: {str(e)}"
         print(f"Error: {error_msg}")
-
-        traceback.print_exc()
         return jsonify({"error": error_msg}), 500
+
+    return (
+        jsonify(
+            {
+                "status": "queued",
+                "job_id": job_id,
+                "status_url": f"{BASE_API_URL}/jobs/{job_id}",
+            }
+        ),
+        202,
+    )
+
+
+@populate_bp.route(f"{BASE_API_URL}/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Return the status and live progress of a population job.
+
+    `progress` holds processed/loaded/skipped/failed counts, snippets_per_second
+    and eta_seconds; `result` holds the final statistics once the job is done.
+    """
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+@populate_bp.route(f"{BASE_API_URL}/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    """Cancel a population job.
+
+    A running job finishes its in-flight batches and saves its checkpoint, so
+    starting the population again resumes where it stopped.
+    """
+    status = job_runner.cancel(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"job_id": job_id, "status": status})
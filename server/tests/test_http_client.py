@@ -0,0 +1,49 @@
+"""HttpClients: cumulative request and connection counters per upstream"""
+
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import pytest
+from utils.http_client import HttpClients
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = HTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+def test_requests_reuse_one_keep_alive_connection(server_url):
+    clients = HttpClients()
+    for _ in range(5):
+        clients.get("images", server_url)
+
+    stats = clients.stats()["images"]
+    assert (stats["requests"], stats["connections"], stats["reused"]) == (5, 1, 4)
+
+
+def test_counters_survive_the_pool_being_closed(server_url):
+    clients = HttpClients()
+    for _ in range(5):
+        clients.get("images", server_url)
+    # What urllib3 does when it evicts a pool
+    clients.session("images").get_adapter(server_url).poolmanager.clear()
+    for _ in range(2):
+        clients.get("images", server_url)
+
+    stats = clients.stats()["images"]
+    assert (stats["requests"], stats["connections"], stats["reused"]) == (7, 2, 5)
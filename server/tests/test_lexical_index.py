@@ -0,0 +1,74 @@
+"""LexicalIndex: incremental sync from updated_at, late commits, deletions"""
+
+import datetime
+from utils.lexical_index import LexicalIndex
+
+T0 = datetime.datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _at(seconds):
+    return T0 + datetime.timedelta(seconds=seconds)
+
+
+class FakeCollection:
+    """Just enough of a collection for find({field: {"$gte": t}})"""
+
+    def __init__(self):
+        self.docs = []
+
+    def insert(self, **doc):
+        self.docs.append(doc)
+
+    def find(self, query, projection=None):  # pylint: disable=unused-argument
+        for field, condition in query.items():
+            return [
+                doc
+                for doc in self.docs
+                if doc.get(field) is not None and doc[field] >= condition["$gte"]
+            ]
+        return list(self.docs)
+
+
+def _index(collection, deletions=None, lookback=60):
+    return LexicalIndex(collection, deletions, sync_interval=3600, lookback=lookback)
+
+
+def test_sync_picks_up_writes_that_commit_after_a_newer_one():
+    snippets = FakeCollection()
+    index = _index(snippets)
+    snippets.insert(_id="a", text="useReducer todo", updated_at=T0)
+    snippets.insert(_id="c", text="modal dialog", updated_at=_at(10))
+    index.sync()
+
+    # Stamped before "c" but committed after the previous sync
+    snippets.insert(_id="b", text="useReducer cart", updated_at=_at(5))
+    index.sync()
+
+    assert {doc_id for doc_id, _ in index.search("useReducer")} == {"a", "b"}
+
+
+def test_sync_does_not_reindex_unchanged_snippets(monkeypatch):
+    snippets = FakeCollection()
+    index = _index(snippets)
+    snippets.insert(_id="a", text="useReducer todo", updated_at=T0)
+    index.sync()
+
+    added = []
+    monkeypatch.setattr(index, "add", lambda doc_id, text: added.append(doc_id))
+    snippets.insert(_id="b", text="modal", updated_at=_at(1))
+    index.sync()
+
+    assert added == ["b"]
+
+
+def test_sync_replays_deletions_logged_by_other_workers():
+    snippets, deletions = FakeCollection(), FakeCollection()
+    index = _index(snippets, deletions)
+    snippets.insert(_id="a", text="useReducer todo", updated_at=T0)
+    snippets.insert(_id="b", text="useReducer cart", updated_at=T0)
+    index.sync()
+
+    deletions.insert(snippet_id="b", deleted_at=_at(1))
+    index.sync()
+
+    assert [doc_id for doc_id, _ in index.search("useReducer")] == ["a"]
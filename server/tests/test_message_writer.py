@@ -0,0 +1,129 @@
+"""MessageWriter: per-session order, queue-full fallback, wait_for, failed batches"""
+
+# pylint: disable=protected-access
+
+import time
+import threading
+import pytest
+from pymongo.errors import AutoReconnect
+from utils import message_writer as writer_module
+from utils.message_writer import MessageWriter
+
+
+class FakeCollection:
+    """Records inserted documents; writes can be held back or made to fail"""
+
+    def __init__(self, failures=0):
+        self.docs = []
+        self.failures = failures
+        self.gate = threading.Event()
+        self.gate.set()
+        self._lock = threading.Lock()
+
+    def insert_many(self, docs, ordered=True):  # pylint: disable=unused-argument
+        self.gate.wait()
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                raise AutoReconnect("connection lost")
+            self.docs.extend(docs)
+
+    def insert_one(self, doc):
+        with self._lock:
+            self.docs.append(doc)
+
+    def messages(self, session_id):
+        return [doc["n"] for doc in self.docs if doc["session_id"] == session_id]
+
+
+@pytest.fixture
+def make_writer():
+    writers = []
+
+    def make(collection, **options):
+        options.setdefault("flush_interval", 0.01)
+        options.setdefault("flush_timeout", 2)
+        writer = MessageWriter(collection, mode="async", **options)
+        writers.append((writer, collection))
+        return writer
+
+    yield make
+    for writer, collection in writers:
+        collection.gate.set()
+        writer.close()
+
+
+def test_messages_of_a_session_are_written_in_save_order(make_writer):
+    collection = FakeCollection()
+    writer = make_writer(collection, batch_size=7)
+
+    def save_session(session_id):
+        for n in range(200):
+            writer.save({"session_id": session_id, "n": n})
+
+    threads = [
+        threading.Thread(target=save_session, args=(f"s{i}",)) for i in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert writer.wait_for()
+    for i in range(4):
+        assert collection.messages(f"s{i}") == list(range(200))
+    assert writer.stats()["queued"] == 0
+
+
+def test_full_queue_writes_inline_instead_of_dropping(make_writer):
+    collection = FakeCollection()
+    collection.gate.clear()
+    writer = make_writer(collection, max_queue=1, batch_size=1, flush_timeout=0.1)
+
+    writer.save({"session_id": "a", "n": 0})  # Taken by the blocked writer
+    deadline = time.monotonic() + 2
+    while not writer._queue.empty() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.save({"session_id": "a", "n": 1})  # Fills the queue
+    writer.save({"session_id": "b", "n": 0})  # No room: written inline
+
+    assert collection.messages("b") == [0]
+    assert collection.messages("a") == []
+    assert writer.stats()["sync_writes"] == 1
+
+    collection.gate.set()
+    assert writer.wait_for(timeout=2)
+    assert collection.messages("a") == [0, 1]
+
+
+def test_wait_for_waits_only_for_the_given_session(make_writer):
+    collection = FakeCollection()
+    collection.gate.clear()
+    writer = make_writer(collection)
+
+    writer.save({"session_id": "a", "n": 0})
+    assert not writer.wait_for("a", timeout=0.1)
+    assert writer.wait_for("b", timeout=0.1)
+
+    collection.gate.set()
+    assert writer.wait_for("a", timeout=2)
+    assert collection.messages("a") == [0]
+
+
+def test_failed_batch_is_kept_and_written_before_newer_messages(
+    make_writer, monkeypatch
+):
+    monkeypatch.setattr(writer_module, "RETRY_BACKOFF", 0)
+    monkeypatch.setattr(writer_module, "HELD_RETRY_INTERVAL", 0.05)
+    # Every attempt of the first batch fails, then the database is back
+    collection = FakeCollection(failures=writer_module.WRITE_RETRIES + 2)
+    writer = make_writer(collection)
+
+    writer.save({"session_id": "a", "n": 0})
+    writer.save({"session_id": "a", "n": 1})
+    assert writer.wait_for(timeout=2)
+    writer.save({"session_id": "a", "n": 2})
+    assert writer.wait_for(timeout=2)
+
+    assert collection.messages("a") == [0, 1, 2]
+    assert writer.stats()["failed"] == 1
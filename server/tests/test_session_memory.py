@@ -0,0 +1,131 @@
+"""SessionMemory: recent window, rolling summary and the messages in between"""
+
+import datetime
+from types import SimpleNamespace
+from utils.session_memory import SessionMemory
+
+T0 = datetime.datetime(2026, 1, 1, 12, 0, 0)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda doc, f=field: doc[f], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    """Equality and $lt/$gt conditions, upserts by _id"""
+
+    def __init__(self):
+        self.docs = []
+
+    @staticmethod
+    def _matches(doc, query):
+        for field, condition in query.items():
+            value = doc.get(field)
+            if isinstance(condition, dict):
+                if "$lt" in condition and not value < condition["$lt"]:
+                    return False
+                if "$gt" in condition and not value > condition["$gt"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def find(self, query, projection=None):  # pylint: disable=unused-argument
+        return FakeCursor(
+            [dict(doc) for doc in self.docs if self._matches(doc, query)]
+        )
+
+    def find_one(self, query):
+        return next(iter(self.find(query)), None)
+
+    def update_one(self, query, update, **options):  # pylint: disable=unused-argument
+        doc = self.find_one(query)
+        if doc is None:
+            self.docs.append({**query, **update["$set"]})
+        else:
+            self.docs = [d for d in self.docs if d["_id"] != doc["_id"]]
+            self.docs.append({**doc, **update["$set"]})
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):  # pylint: disable=unused-argument
+        self.calls += 1
+        return SimpleNamespace(content=f"summary {self.calls}")
+
+
+def _memory(count, window=2, summarize_after=3):
+    messages = FakeCollection()
+    for n in range(count):
+        messages.docs.append(
+            {
+                "_id": n,
+                "session_id": "s",
+                "role": "user" if n % 2 == 0 else "assistant",
+                "message": f"message {n}",
+                "created_at": T0 + datetime.timedelta(seconds=n),
+            }
+        )
+    return SessionMemory(
+        messages,
+        FakeCollection(),
+        llm=FakeLLM(),
+        window=window,
+        token_cap=10_000,
+        summarize_after=summarize_after,
+        cache_ttl=0,
+    )
+
+
+def _included(history):
+    return [n for n in range(20) if f"message {n}\n" in history.text + "\n"]
+
+
+def test_messages_out_of_the_window_are_kept_until_summarized():
+    # 2 messages left the window, fewer than summarize_after: no summary yet
+    memory = _memory(4)
+    memory._summarize("s")  # pylint: disable=protected-access
+
+    history = memory.history("s")
+
+    assert memory.llm.calls == 0
+    assert _included(history) == [0, 1, 2, 3]
+    assert not history.report["summary"]
+
+
+def test_history_covers_the_gap_between_summary_and_window():
+    memory = _memory(6)
+    memory._summarize("s")  # pylint: disable=protected-access
+    # Two more turns: 2 messages between the summary and the window
+    for n in (6, 7):
+        memory.messages.docs.append(
+            {
+                "_id": n,
+                "session_id": "s",
+                "role": "user",
+                "message": f"message {n}",
+                "created_at": T0 + datetime.timedelta(seconds=n),
+            }
+        )
+    memory._summarize("s")  # pylint: disable=protected-access
+
+    history = memory.history("s")
+
+    assert memory.llm.calls == 1  # Messages 0-3 folded, 4 and 5 pending
+    assert "summary 1" in history.text
+    assert _included(history) == [4, 5, 6, 7]
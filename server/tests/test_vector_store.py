@@ -0,0 +1,150 @@
+"""LocalVectorStore: persistence across workers, metadata filters, HNSW recall"""
+
+import os
+import numpy as np
+import pytest
+from utils.vector_store import LocalVectorStore, build_filter
+
+DIM = 32
+
+
+def _vectors(count, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, DIM)).astype(np.float32)
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "index")
+
+
+def _store(path=None, **options):
+    # A long interval: the tests call sync() themselves
+    options.setdefault("autosave_interval", 3600)
+    return LocalVectorStore(path=path, **options)
+
+
+def test_upsert_is_saved_by_sync_not_inline(store_path):
+    store = _store(store_path)
+    store.upsert([("a", _vectors(1)[0], {"text": "a"})])
+    assert not os.path.exists(os.path.join(store_path, "index.json"))
+
+    store.sync()
+    reloaded = _store(store_path)
+    assert len(reloaded) == 1
+    assert reloaded.fetch(["a"]).vectors["a"].metadata == {"text": "a"}
+
+
+def test_save_keeps_the_writes_of_other_workers(store_path):
+    vectors = _vectors(4)
+    first, second = _store(store_path), _store(store_path)
+    first.upsert([("a", vectors[0], {}), ("b", vectors[1], {})])
+    second.upsert([("c", vectors[2], {})])
+    first.sync()
+    # second saves last: it merges first's save instead of overwriting it
+    second.sync()
+    first.delete(["b"])
+    first.sync()
+
+    assert len(_store(store_path)) == 2
+    for store in (first, second):
+        store.sync()
+        assert sorted(store.fetch(["a", "b", "c"]).vectors) == ["a", "c"]
+
+
+def test_replaced_vector_and_compaction_survive_reload(store_path):
+    vectors = _vectors(3)
+    store = _store(store_path)
+    store.upsert([("a", vectors[0], {"v": 1}), ("b", vectors[1], {})])
+    store.upsert([("a", vectors[2], {"v": 2})])
+    store.compact()
+    store.sync()
+
+    reloaded = _store(store_path)
+    match = reloaded.query(vector=vectors[2], top_k=1).matches[0]
+    assert (match.id, match.metadata) == ("a", {"v": 2})
+    assert reloaded.describe_index_stats()["tombstoned_rows"] == 0
+
+
+def test_filters_are_applied_before_scoring():
+    vectors = _vectors(6)
+    store = _store()
+    store.upsert(
+        [
+            (str(i), vectors[i], {"tag_list": ["form"] if i % 2 else ["nav"],
+                                  "recommended": i < 3, "lines": i * 10})
+            for i in range(6)
+        ]
+    )
+
+    def ids(filters, vector=vectors[0]):
+        matches = store.query(vector=vector, top_k=6, filter=build_filter(filters)).matches
+        return sorted(match.id for match in matches)
+
+    assert ids({"tags": ["form"]}) == ["1", "3", "5"]
+    assert ids({"tags": ["form"], "recommended": True}) == ["1"]
+    assert ids({"tags": {"$nin": ["form"]}}) == ["0", "2", "4"]
+    assert ids({"$or": [{"tags": "nav"}, {"lines": {"$gt": 40}}]}) == ["0", "2", "4", "5"]
+    assert ids({"lines": {"$gte": 30}}) == ["3", "4", "5"]
+    assert ids({"$or": [{"recommended": {"$eq": True}}, {"lines": {"$gt": 40}}]}) == [
+        "0", "1", "2", "5"
+    ]
+    assert ids({"tags": ["missing"]}) == []
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {"tags": {"$regex": "form"}},
+        {"$not": {"tags": "form"}},
+        {"$or": {"tags": "form"}},
+        {"tags": {"$in": "form"}},
+        {"$and": [{}]},
+    ],
+)
+def test_unsupported_filters_are_rejected(filters):
+    with pytest.raises(ValueError):
+        build_filter(filters)
+
+
+def test_update_merges_metadata_and_reindexes_it():
+    vectors = _vectors(2)
+    store = _store()
+    store.upsert([("a", vectors[0], {"tags": "form,nav"}), ("b", vectors[1], {})])
+    store.update(id="a", set_metadata={"tag_list": ["form", "nav"]})
+
+    matches = store.query(vector=vectors[0], top_k=2, filter=build_filter({"tags": ["nav"]}))
+    assert [(m.id, m.metadata) for m in matches.matches] == [
+        ("a", {"tags": "form,nav", "tag_list": ["form", "nav"]})
+    ]
+
+
+def test_hnsw_recall():
+    vectors = _vectors(3000, seed=1)
+    store = _store(hnsw_threshold=2000, hnsw_ef_construction=64, hnsw_ef_search=64)
+    # Walk the graph even for these small candidate sets
+    store.FILTERED_BRUTE_FORCE_LIMIT = 0
+    store.upsert([(str(i), vector, {}) for i, vector in enumerate(vectors)])
+    assert not store.describe_index_stats()["hnsw"]
+
+    store.sync()
+    assert store.describe_index_stats()["hnsw"]
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = _vectors(50, seed=2)
+    found = 0
+    for query in queries:
+        exact = set(np.argsort(-(normalized @ query))[:10].astype(str))
+        matches = store.query(vector=query, top_k=10).matches
+        found += len(exact & {match.id for match in matches})
+    assert found / (10 * len(queries)) >= 0.9
+
+
+def test_graph_links_vectors_upserted_after_the_build():
+    vectors = _vectors(600, seed=3)
+    store = _store(hnsw_threshold=500, hnsw_ef_construction=32)
+    store.FILTERED_BRUTE_FORCE_LIMIT = 0
+    store.upsert([(str(i), vector, {}) for i, vector in enumerate(vectors[:500])])
+    store.sync()
+    store.upsert([(str(i), vectors[i], {}) for i in range(500, 600)])
+
+    assert store.query(vector=vectors[550], top_k=1).matches[0].id == "550"
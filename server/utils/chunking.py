@@ -0,0 +1,165 @@
+"""Code-aware chunking of long snippets.
+
+Assistant answers in the knowledge base are often several thousand characters
+of prose and code. Embedding them whole (truncated at 8000 characters) blurs
+the vector, and storing only their first 1000 characters as context hands the
+model half a component. `chunk_code` instead splits a snippet at natural
+boundaries, so each chunk is a whole unit of code:
+
+    1. Markdown code fences: prose and fenced blocks are separate units
+    2. Top-level declarations inside a block: `function`, `const`/`let`
+       components and hooks, `class`, `interface`, `type`, `export default`
+       (imports stay with the first declaration)
+    3. Blank lines, then single lines, only for units still too long
+
+Units are packed greedily, in order, into chunks of at most CHUNK_MAX_CHARS.
+Code units from the same block are re-fenced with their language, so every
+chunk is valid markdown on its own.
+
+Chunk ids:
+    The first chunk keeps the snippet id, the others are "<snippet id>#<n>".
+    Every chunk stores `parent_id` and `chunk` in its metadata, and the
+    retriever collapses chunks back to one result per parent.
+
+Usage:
+    from utils.chunking import chunk_code, chunk_ids
+
+    chunks = chunk_code(long_answer)            # ["```tsx\\n...```", ...]
+    ids = chunk_ids(snippet_id, len(chunks))    # ["66b1...", "66b1...#1", ...]
+
+Configuration:
+    - CHUNK_MAX_CHARS: Maximum characters per chunk (default: 2000)
+"""
+
+import re
+from utils.consts import CHUNK_MAX_CHARS
+
+_FENCE_RE = re.compile(r"^```[ \t]*([\w+#.-]*)[^\n]*\n(.*?)^```[ \t]*$", re.M | re.S)
+_DECLARATION_RE = re.compile(
+    r"^(?:export\s+(?:default\s+)?)?(?:async\s+)?"
+    r"(?:function\b|const\s|let\s|var\s|class\s|interface\s|type\s|enum\s)"
+    r"|^export\s+default\b"
+)
+_IMPORT_RE = re.compile(r"^(?:import\b|['\"]use (?:client|strict)['\"])")
+
+
+def chunk_ids(parent_id: str, count: int):
+    """Return the vector ids of a snippet's chunks (the first one is the snippet id)"""
+    return [parent_id] + [f"{parent_id}#{n}" for n in range(1, count)]
+
+
+def _split_lines(text: str, max_chars: int):
+    """Split an oversized unit at blank lines, then at line ends"""
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        current = ""
+        for line in paragraph.split("\n"):
+            while len(line) > max_chars:
+                pieces.append(line[:max_chars])
+                line = line[max_chars:]
+            if current and len(current) + len(line) + 1 > max_chars:
+                pieces.append(current)
+                current = ""
+            current = f"{current}\n{line}" if current else line
+        if current:
+            pieces.append(current)
+    return [piece for piece in pieces if piece.strip()]
+
+
+def _code_units(code: str):
+    """Split a code block at top-level declarations (imports join the first one)"""
+    units, current = [], []
+    seen_declaration = False
+    for line in code.split("\n"):
+        if _DECLARATION_RE.match(line):
+            if seen_declaration and current:
+                units.append("\n".join(current))
+                current = []
+            seen_declaration = True
+        elif _IMPORT_RE.match(line) and seen_declaration and current:
+            units.append("\n".join(current))
+            current = []
+            seen_declaration = False
+        current.append(line)
+    if current:
+        units.append("\n".join(current))
+    return [unit.strip("\n") for unit in units if unit.strip()]
+
+
+def _units(text: str, max_chars: int):
+    """Split a snippet into (block, lang, text) units; block is None for prose"""
+    units = []
+    position = 0
+    for block, match in enumerate(_FENCE_RE.finditer(text)):
+        prose = text[position : match.start()].strip()
+        if prose:
+            units.extend((None, "", piece) for piece in _split_lines(prose, max_chars))
+        lang = match.group(1)
+        # Leave room for the fence markers
+        budget = max(max_chars - len(lang) - 8, 1)
+        for unit in _code_units(match.group(2)):
+            pieces = [unit] if len(unit) <= budget else _split_lines(unit, budget)
+            units.extend((block, lang, piece) for piece in pieces)
+        position = match.end()
+
+    rest = text[position:].strip()
+    if rest:
+        if position == 0 and not _FENCE_RE.search(text):
+            # Bare code without fences: still split at declarations
+            for unit in _code_units(rest):
+                pieces = [unit] if len(unit) <= max_chars else _split_lines(unit, max_chars)
+                units.extend((None, "", piece) for piece in pieces)
+        else:
+            units.extend((None, "", piece) for piece in _split_lines(rest, max_chars))
+    return units
+
+
+def _render(units):
+    """Join units back into markdown, re-fencing consecutive code from one block"""
+    parts = []
+    index = 0
+    while index < len(units):
+        block, lang, text = units[index]
+        if block is None:
+            parts.append(text)
+            index += 1
+            continue
+        code = [text]
+        index += 1
+        while index < len(units) and units[index][0] == block:
+            code.append(units[index][2])
+            index += 1
+        body = "\n\n".join(code)
+        parts.append(f"```{lang}\n{body}\n```")
+    return "\n\n".join(parts)
+
+
+def chunk_code(text: str, max_chars: int = CHUNK_MAX_CHARS):
+    """Split a snippet into whole code units of at most about `max_chars` characters.
+
+    Args:
+        text (str): Snippet (markdown with code fences, or bare code)
+        max_chars (int, optional): Chunk size limit. Defaults to CHUNK_MAX_CHARS.
+
+    Returns:
+        list[str]: Chunks in order; a short snippet is returned as a single chunk
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks, current, size = [], [], 0
+    for unit in _units(text, max_chars):
+        # Fence markers add a few characters when a chunk starts inside a block
+        unit_size = len(unit[2]) + (len(unit[1]) + 8 if unit[0] is not None else 0) + 2
+        if current and size + unit_size > max_chars:
+            chunks.append(_render(current))
+            current, size = [], 0
+        current.append(unit)
+        size += unit_size
+    if current:
+        chunks.append(_render(current))
+    return chunks
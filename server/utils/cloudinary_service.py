@@ -1,5 +1,10 @@
 """Cloudinary service
 Uploads images to Cloudinary
+
+Cloudinary is configured when the service is first used in a process, not at
+import time (see utils.services). Uploads and admin calls then share one
+keep-alive pool per process, sized and timed out from the HTTP_* settings, with
+its connection reuse reported by utils.http_client.
 """
 
 import time
@@ -8,27 +13,17 @@ import traceback
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
+import cloudinary.api_client.call_api
 from cloudinary.exceptions import Error as CloudinaryError
+from cloudinary.utils import get_http_connector
+from utils.services import services
+from utils.http_client import http_clients
 from utils.consts import (
     CLOUDINARY_CLOUD_NAME,
     CLOUDINARY_API_KEY,
     CLOUDINARY_API_SECRET,
 )
 
-# Configure Cloudinary
-try:
-    cloudinary.config(
-        cloud_name=CLOUDINARY_CLOUD_NAME,
-        api_key=CLOUDINARY_API_KEY,
-        api_secret=CLOUDINARY_API_SECRET,
-        secure=True,
-    )
-    print("✅ Cloudinary configured successfully")
-except CloudinaryError as e:
-    print(f"❌ Cloudinary configuration error: {e}")
-except ValueError as e:
-    print(f"❌ Configuration value error: {e}")
-
 
 class CloudinaryService:
     """Service for handling Cloudinary image uploads and management"""
@@ -179,5 +174,31 @@ class CloudinaryService:
             return {"success": False, "error": f"Invalid parameters: {str(e)}"}
 
 
-# Create service instance
-cloudinary_service = CloudinaryService()
+def _create_service():
+    # Configure Cloudinary
+    try:
+        cloudinary.config(
+            cloud_name=CLOUDINARY_CLOUD_NAME,
+            api_key=CLOUDINARY_API_KEY,
+            api_secret=CLOUDINARY_API_SECRET,
+            secure=True,
+        )
+        print("✅ Cloudinary configured successfully")
+    except CloudinaryError as e:
+        print(f"❌ Cloudinary configuration error: {e}")
+    except ValueError as e:
+        print(f"❌ Configuration value error: {e}")
+
+    # The SDK builds its pools at import time (before a fork): use one of ours
+    pool_manager = get_http_connector(
+        cloudinary.config(),
+        {**cloudinary.CERT_KWARGS, **http_clients.pool_options("cloudinary")},
+    )
+    cloudinary.uploader._http = pool_manager  # pylint: disable=protected-access
+    cloudinary.api_client.call_api._http = pool_manager  # pylint: disable=protected-access
+    http_clients.track("cloudinary", pool_manager)
+    return CloudinaryService()
+
+
+# Create service instance (configured on first use)
+cloudinary_service = services.register("cloudinary", _create_service)
@@ -1,19 +1,279 @@
 """Connect to MongoDB
 All variables for MongoDB
+
+The client is configured from the environment (pool size, timeouts, write
+concern), and this module owns the schema: `ensure_indexes` creates every index
+the app's queries rely on, idempotently, and `check_indexes` logs how they are
+used. Both run at startup through `bootstrap_database`.
+
+The client is built lazily, on the first query of each process (see
+utils.services): a `MongoClient` created before a gunicorn fork would share its
+connection pool and monitor threads with the workers. `db` and the collections
+below are stand-ins that resolve to the client of the current process.
+
+Indexes:
+    - messages: (session_id, created_at, _id) for history, memory and deletes;
+      optional TTL on created_at (SESSION_TTL_DAYS)
+    - session_summaries: optional TTL on updated_at (SESSION_TTL_DAYS)
+    - snippets: unique content_hash, lsh_bands, updated_at (lexical index sync)
+    - snippet_deletions: TTL on deleted_at (7 days), the log of deleted snippet
+      ids every worker's lexical index replays
+    - image_analyses: sha256, urls, created_at
+    - jobs: (type, status); unique `lock`: "type:key" while a job that must
+      not run twice (e.g. a population of one dataset) is queued or running
+
+Configuration:
+    - MONGODB_MAX_POOL_SIZE: Connections per process (default: 50)
+    - MONGODB_MIN_POOL_SIZE: Connections kept open when idle (default: 0)
+    - MONGODB_MAX_IDLE_TIME_MS: Idle time before a connection is closed (default: 60000)
+    - MONGODB_CONNECT_TIMEOUT_MS: Connection timeout (default: 5000)
+    - MONGODB_SERVER_SELECTION_TIMEOUT_MS: Time to find a server (default: 10000)
+    - MONGODB_SOCKET_TIMEOUT_MS: Operation socket timeout, 0 for none (default: 0)
+    - MONGODB_WRITE_CONCERN: "w" value, e.g. 1 or majority (default: 1)
+    - MONGODB_WTIMEOUT_MS: Write concern timeout, 0 for none (default: 0)
+    - MONGODB_BOOTSTRAP_INDEXES: Create indexes at startup (default: true)
+    - SESSION_TTL_DAYS: Delete chat messages and summaries after this many days,
+      0 to keep them forever (default: 0)
 """
 
 import os
-from pymongo import MongoClient
+import threading
+from pymongo import MongoClient, IndexModel, ASCENDING
+from pymongo.errors import PyMongoError, OperationFailure
 from dotenv import load_dotenv
+from utils.services import services
 
 load_dotenv()
 MONGODB_CLUSTER = os.getenv("MONGODB_CLUSTER")
 MONGODB_USERNAME = os.getenv("MONGODB_USERNAME")
 MONGODB_PW = os.getenv("MONGODB_PW")
 
-client = MongoClient(MONGODB_CLUSTER, 27017)
-db = client["final_project_ai"]
-messages_col = db["messages"]
-snippets_col = db["snippets"]
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000"))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(
+    os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "10000")
+)
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "0"))
+MONGODB_WRITE_CONCERN = os.getenv("MONGODB_WRITE_CONCERN", "1")
+MONGODB_WTIMEOUT_MS = int(os.getenv("MONGODB_WTIMEOUT_MS", "0"))
+MONGODB_BOOTSTRAP_INDEXES = (
+    os.getenv("MONGODB_BOOTSTRAP_INDEXES", "true").lower() == "true"
+)
+SESSION_TTL_DAYS = float(os.getenv("SESSION_TTL_DAYS", "0"))
+
+# Server error codes for an existing index with other options
+INDEX_CONFLICT_CODES = (85, 86)
+
+DATABASE_NAME = "final_project_ai"
+
+
+def _create_client():
+    return MongoClient(
+        MONGODB_CLUSTER,
+        27017,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS or None,
+        w=(
+            int(MONGODB_WRITE_CONCERN)
+            if MONGODB_WRITE_CONCERN.isdigit()
+            else MONGODB_WRITE_CONCERN
+        ),
+        **({"wTimeoutMS": MONGODB_WTIMEOUT_MS} if MONGODB_WTIMEOUT_MS else {}),
+    )
+
+
+client = services.register("mongodb", _create_client, imports=("pymongo",))
+db = services.view("mongodb", lambda mongo: mongo[DATABASE_NAME])
+messages_col = services.view("mongodb", lambda mongo: mongo[DATABASE_NAME]["messages"])
+snippets_col = services.view("mongodb", lambda mongo: mongo[DATABASE_NAME]["snippets"])
+image_analyses_col = services.view(
+    "mongodb", lambda mongo: mongo[DATABASE_NAME]["image_analyses"]
+)
+ingestion_checkpoints_col = services.view(
+    "mongodb", lambda mongo: mongo[DATABASE_NAME]["ingestion_checkpoints"]
+)
+jobs_col = services.view("mongodb", lambda mongo: mongo[DATABASE_NAME]["jobs"])
+session_summaries_col = services.view(
+    "mongodb", lambda mongo: mongo[DATABASE_NAME]["session_summaries"]
+)
+snippet_deletions_col = services.view(
+    "mongodb", lambda mongo: mongo[DATABASE_NAME]["snippet_deletions"]
+)
 
 BASE_API_URL = "/api"
+
+# Indexes every query path relies on, by collection. Default names are kept so
+# indexes created by earlier versions are recognized.
+INDEXES = {
+    "messages": [
+        IndexModel(
+            [("session_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]
+        ),
+    ],
+    "snippets": [
+        IndexModel(
+            "content_hash",
+            unique=True,
+            partialFilterExpression={"content_hash": {"$exists": True}},
+        ),
+        IndexModel("lsh_bands"),
+        IndexModel("updated_at"),
+    ],
+    "snippet_deletions": [IndexModel("deleted_at", expireAfterSeconds=7 * 86400)],
+    "image_analyses": [
+        IndexModel("sha256"),
+        IndexModel("urls"),
+        IndexModel("created_at"),
+    ],
+    "jobs": [
+        IndexModel([("type", ASCENDING), ("status", ASCENDING)]),
+        IndexModel(
+            "lock", unique=True, partialFilterExpression={"lock": {"$exists": True}}
+        ),
+    ],
+}
+
+# Single-field TTL indexes enabled by SESSION_TTL_DAYS: collection -> field
+TTL_FIELDS = {"messages": "created_at", "session_summaries": "updated_at"}
+
+
+def _ensure_ttl(database, collection: str, field: str, seconds: int):
+    """Create, update or drop the TTL index on `field` to match `seconds`"""
+    name = f"{field}_1"
+    existing = database[collection].index_information().get(name)
+    if not seconds:
+        if existing and "expireAfterSeconds" in existing:
+            database[collection].drop_index(name)
+        return None
+    if existing and "expireAfterSeconds" in existing:
+        if existing["expireAfterSeconds"] != seconds:
+            database.command(
+                "collMod",
+                collection,
+                index={"keyPattern": {field: 1}, "expireAfterSeconds": seconds},
+            )
+        return name
+    if existing:
+        # A plain index on the same field: replace it with the TTL one
+        database[collection].drop_index(name)
+    return database[collection].create_index(field, expireAfterSeconds=seconds)
+
+
+def ensure_indexes(database=None, collections=None, session_ttl_days=SESSION_TTL_DAYS):
+    """Create the app's indexes. Safe to run any number of times.
+
+    Args:
+        database (Database, optional): Defaults to the app database
+        collections (Iterable[str], optional): Only these collections. Defaults
+            to all of them.
+        session_ttl_days (float, optional): Message and summary expiry, 0 to
+            disable. Defaults to SESSION_TTL_DAYS.
+
+    Returns:
+        dict: Index names by collection
+    """
+    database = db if database is None else database
+    ttl_seconds = int(session_ttl_days * 86400)
+    created = {}
+
+    for collection, models in INDEXES.items():
+        if collections is not None and collection not in collections:
+            continue
+        try:
+            created[collection] = database[collection].create_indexes(models)
+        except OperationFailure as e:
+            if e.code not in INDEX_CONFLICT_CODES:
+                raise
+            # An index with the same keys but other options already exists:
+            # keep it, and still create the others
+            print(f"Index conflict on {collection} (keeping the existing one): {e}")
+            created[collection] = []
+            for model in models:
+                try:
+                    created[collection].append(
+                        database[collection].create_indexes([model])[0]
+                    )
+                except OperationFailure as model_error:
+                    if model_error.code not in INDEX_CONFLICT_CODES:
+                        raise
+
+    for collection, field in TTL_FIELDS.items():
+        if collections is not None and collection not in collections:
+            continue
+        name = _ensure_ttl(database, collection, field, ttl_seconds)
+        if name:
+            created.setdefault(collection, []).append(name)
+
+    return created
+
+
+def check_indexes(database=None):
+    """Log how each managed index is used and whether history reads use one.
+
+    Returns:
+        dict: {collection: {index name: operations since the server started}}
+    """
+    database = db if database is None else database
+    usage = {}
+    for collection in list(INDEXES) + [name for name in TTL_FIELDS if name not in INDEXES]:
+        try:
+            stats = database[collection].aggregate([{"$indexStats": {}}])
+            usage[collection] = {
+                stat["name"]: stat["accesses"]["ops"] for stat in stats
+            }
+        except PyMongoError as e:
+            print(f"Index stats unavailable for {collection}: {e}")
+            continue
+        print(
+            f"Indexes on {collection}: "
+            + ", ".join(f"{name} ({ops} ops)" for name, ops in usage[collection].items())
+        )
+
+    # The hottest query: a session's latest messages
+    try:
+        plan = (
+            database["messages"]
+            .find({"session_id": "__index_check__"})
+            .sort([("created_at", -1), ("_id", -1)])
+            .limit(1)
+            .explain()
+        )
+        if "COLLSCAN" in str(plan.get("queryPlanner", {}).get("winningPlan", {})):
+            print("❌ Session history query does a collection scan")
+        else:
+            print("✅ Session history query uses an index")
+    except PyMongoError as e:
+        print(f"Query plan check failed: {e}")
+    return usage
+
+
+def bootstrap_database(background: bool = True):
+    """Create indexes and log their usage, in a background thread by default.
+
+    Runs at app startup (MONGODB_BOOTSTRAP_INDEXES). In the background, a slow
+    or unreachable MongoDB does not delay the server start.
+    """
+
+    def run():
+        try:
+            created = ensure_indexes()
+            print(
+                "✅ MongoDB indexes ready: "
+                + ", ".join(f"{name} ({len(names)})" for name, names in created.items())
+            )
+            check_indexes()
+        except PyMongoError as e:
+            print(f"❌ MongoDB index bootstrap failed: {e}")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="mongo-bootstrap", daemon=True)
+    thread.start()
+    return thread
@@ -20,3 +20,122 @@ LANGCHAIN_PROJECT = os.getenv("LANGCHAIN_PROJECT")
 CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
 CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
 CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
+
+# Chat pipeline
+CONCURRENT_PIPELINE = os.getenv("CONCURRENT_PIPELINE", "true").lower() == "true"
+MERGE_IMAGE_CONTEXT = os.getenv("MERGE_IMAGE_CONTEXT", "true").lower() == "true"
+PIPELINE_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "8"))
+
+# Semantic response cache
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
+# Embedding cache (SQLite file shared by all workers)
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "embeddings.sqlite3"),
+)
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "2048"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+
+# Vision analysis cache
+VISION_CACHE_ENABLED = os.getenv("VISION_CACHE_ENABLED", "true").lower() == "true"
+VISION_CACHE_MAX_DISTANCE = int(os.getenv("VISION_CACHE_MAX_DISTANCE", "4"))
+VISION_CACHE_MIN_CONTRAST = float(os.getenv("VISION_CACHE_MIN_CONTRAST", "12"))
+VISION_CACHE_TTL = int(os.getenv("VISION_CACHE_TTL", str(30 * 24 * 3600)))
+VISION_PREANALYZE = os.getenv("VISION_PREANALYZE", "true").lower() == "true"
+VISION_PENDING_TIMEOUT = int(os.getenv("VISION_PENDING_TIMEOUT", "30"))
+
+# Vector store ("pinecone" or "local")
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "ironhack-final-project")
+LOCAL_INDEX_PATH = os.getenv(
+    "LOCAL_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "vector_index"),
+)
+LOCAL_INDEX_HNSW_THRESHOLD = int(os.getenv("LOCAL_INDEX_HNSW_THRESHOLD", "20000"))
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+LOCAL_INDEX_SYNC_INTERVAL = float(os.getenv("LOCAL_INDEX_SYNC_INTERVAL", "5"))
+
+# Retrieval ("vector" or "hybrid" = vector + BM25 fused with reciprocal rank fusion)
+RETRIEVER_MODE = os.getenv("RETRIEVER_MODE", "vector").lower()
+LEXICAL_SYNC_INTERVAL = int(os.getenv("LEXICAL_SYNC_INTERVAL", "30"))
+# Seconds each sync reads back before its cursor, for writes that commit late
+LEXICAL_SYNC_LOOKBACK = int(os.getenv("LEXICAL_SYNC_LOOKBACK", "120"))
+
+# Knowledge base ingestion
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+INGEST_LIMIT = int(os.getenv("INGEST_LIMIT", "1000"))
+INGEST_STREAMING = os.getenv("INGEST_STREAMING", "true").lower() == "true"
+# Directory the populate API may read local dataset files from ("" = none)
+INGEST_DATA_DIR = os.getenv("INGEST_DATA_DIR", "")
+
+# Background jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", "120"))
+
+# Near-duplicate detection (MinHash + LSH)
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+MINHASH_PERMUTATIONS = int(os.getenv("MINHASH_PERMUTATIONS", "128"))
+SHINGLE_SIZE = int(os.getenv("SHINGLE_SIZE", "5"))
+
+# Code-aware chunking of long snippets
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "2000"))
+
+# Token-budgeted prompt context
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "4"))
+CONTEXT_DEDUP_OVERLAP = float(os.getenv("CONTEXT_DEDUP_OVERLAP", "0.8"))
+
+# Conversation memory per chat session
+MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "true").lower() == "true"
+MEMORY_WINDOW = int(os.getenv("MEMORY_WINDOW", "6"))
+MEMORY_TOKEN_CAP = int(os.getenv("MEMORY_TOKEN_CAP", "1500"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+MEMORY_SUMMARIZE_AFTER = int(os.getenv("MEMORY_SUMMARIZE_AFTER", "4"))
+MEMORY_SUMMARY_MODEL = os.getenv("MEMORY_SUMMARY_MODEL", "gpt-4o-mini")
+MEMORY_CACHE_TTL = int(os.getenv("MEMORY_CACHE_TTL", "60"))
+
+# Message history pagination
+MESSAGES_PAGE_SIZE = int(os.getenv("MESSAGES_PAGE_SIZE", "50"))
+MESSAGES_MAX_PAGE_SIZE = int(os.getenv("MESSAGES_MAX_PAGE_SIZE", "200"))
+# Transition flag: answer requests without query parameters with the old full list
+MESSAGES_LEGACY_LIST = os.getenv("MESSAGES_LEGACY_LIST", "false").lower() == "true"
+
+# Write-behind persistence of chat messages
+MESSAGE_WRITE_MODE = os.getenv("MESSAGE_WRITE_MODE", "async").lower()
+MESSAGE_QUEUE_SIZE = int(os.getenv("MESSAGE_QUEUE_SIZE", "1000"))
+MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", "100"))
+MESSAGE_FLUSH_INTERVAL = float(os.getenv("MESSAGE_FLUSH_INTERVAL", "0.05"))
+MESSAGE_FLUSH_TIMEOUT = float(os.getenv("MESSAGE_FLUSH_TIMEOUT", "5"))
+
+# Service startup ("none", "imports" or "all", see utils.services)
+SERVICES_WARM = os.getenv("SERVICES_WARM", "imports").lower()
+
+# Outbound HTTP (keep-alive pools per upstream, see utils.http_client)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_POOL_SIZES = os.getenv("HTTP_POOL_SIZES", "")
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+
+# Metrics (stage timings and counters, see utils.metrics)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "react_codegen")
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1024"))
+
+# Model routing by request complexity (see utils.model_router)
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+MODEL_ROUTE_FAST = os.getenv("MODEL_ROUTE_FAST", "gpt-4o-mini")
+MODEL_ROUTE_COMPLEX = os.getenv("MODEL_ROUTE_COMPLEX", "gpt-4o")
+MODEL_ROUTE_THRESHOLD = float(os.getenv("MODEL_ROUTE_THRESHOLD", "3"))
+MODEL_ROUTE_WEIGHTS = os.getenv("MODEL_ROUTE_WEIGHTS", "")
+MODEL_ROUTE_FORCE = os.getenv("MODEL_ROUTE_FORCE", "").lower()
+MODEL_FAST_TIMEOUT = int(os.getenv("MODEL_FAST_TIMEOUT", "20"))
@@ -0,0 +1,253 @@
+"""Token-budgeted assembly of the retrieved context for the generation prompt.
+
+`ContextPacker` turns the retrieved documents into the `{context}` slot of
+the prompt, within a token budget, so the prompt size (and with it latency and
+cost) does not depend on how long the matching snippets are:
+
+    1. Extract: keep the fenced code blocks of each document and drop the prose
+       around them (a document without fences is kept whole, it is bare code)
+    2. Dedup: skip blocks identical to, contained in, or mostly overlapping
+       (line Jaccard >= CONTEXT_DEDUP_OVERLAP) a block already selected
+    3. Pack: walk the blocks in retrieval order, most relevant first, and add
+       each one that still fits in the budget; a first block too large for the
+       whole budget is cut at a line boundary rather than dropped
+
+Tokens are counted with tiktoken for the generation model. When tiktoken or its
+encoding file is unavailable (e.g. no network on first use), a regex
+approximation is used instead, and the report says so.
+
+Every call returns a report with the tokens used against the budget, which the
+chat route stores on the assistant message.
+
+Usage:
+    from utils.context_packer import context_packer
+
+    packed = context_packer.pack(documents)
+    prompt = template.format(context=packed.text, question=question)
+    packed.report
+    # {"tokens": 1187, "budget": 1500, "documents": 4, "blocks": 3,
+    #  "duplicates": 1, "dropped": 2, "truncated": False, "tokenizer": "o200k_base"}
+
+Configuration:
+    - CONTEXT_TOKEN_BUDGET: Maximum tokens of retrieved context (default: 1500)
+    - CONTEXT_CANDIDATES: Documents retrieved for the packer to choose from
+      (default: 4)
+    - CONTEXT_DEDUP_OVERLAP: Line overlap above which a block is a duplicate
+      (default: 0.8)
+"""
+
+import re
+import threading
+from collections import namedtuple
+from utils.consts import CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_OVERLAP
+
+# Opening fence, code, then a closing fence or the end of a truncated text
+_FENCE_RE = re.compile(r"^```[ \t]*([\w+#.-]*)[^\n]*\n(.*?)(?:^```[ \t]*$|\Z)", re.M | re.S)
+_APPROX_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Tokens between two blocks ("\n\n")
+SEPARATOR_TOKENS = 1
+
+PackedContext = namedtuple("PackedContext", ["text", "report"])
+CodeBlock = namedtuple("CodeBlock", ["lang", "code"])
+
+
+class TokenCounter:
+    """Count tokens with tiktoken, falling back to an approximation"""
+
+    def __init__(self, model: str = "gpt-4o"):
+        self.model = model
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # The encoding file is downloaded on first use: try once per process
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                import tiktoken  # pylint: disable=import-outside-toplevel
+
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"tiktoken unavailable, approximating token counts: {e}")
+                self._encoding = None
+            self._loaded = True
+
+    @property
+    def name(self) -> str:
+        """Tokenizer in use: the tiktoken encoding name, or "approximate\""""
+        if not self._loaded:
+            self._load()
+        return self._encoding.name if self._encoding is not None else "approximate"
+
+    def count(self, text: str) -> int:
+        """Number of tokens in `text`"""
+        if not self._loaded:
+            self._load()
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        # Identifiers and punctuation are roughly one token each in code
+        return len(_APPROX_TOKEN_RE.findall(text))
+
+
+def extract_code(text: str):
+    """Return the code blocks of a document, without the prose around them.
+
+    Args:
+        text (str): Markdown answer or bare code
+
+    Returns:
+        list[CodeBlock]: Fenced blocks in order, or the whole text when it has
+            no fences
+    """
+    blocks = [
+        CodeBlock(match.group(1), match.group(2).strip("\n"))
+        for match in _FENCE_RE.finditer(text)
+    ]
+    blocks = [block for block in blocks if block.code.strip()]
+    if blocks:
+        return blocks
+    text = text.strip()
+    return [CodeBlock("", text)] if text else []
+
+
+def _normalize(code: str) -> str:
+    return " ".join(code.split())
+
+
+def _line_set(code: str):
+    return {line.strip() for line in code.splitlines() if line.strip()}
+
+
+def _render(block: CodeBlock) -> str:
+    return f"```{block.lang}\n{block.code}\n```"
+
+
+class ContextPacker:
+    """Pack retrieved documents into a context of at most `budget` tokens"""
+
+    def __init__(
+        self,
+        budget: int = CONTEXT_TOKEN_BUDGET,
+        dedup_overlap: float = CONTEXT_DEDUP_OVERLAP,
+        counter: TokenCounter = None,
+    ):
+        self.budget = budget
+        self.dedup_overlap = dedup_overlap
+        self.counter = counter or token_counter
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_used = 0
+        self.tokens_budgeted = 0
+
+    def _is_duplicate(self, code: str, selected) -> bool:
+        normalized = _normalize(code)
+        lines = _line_set(code)
+        for other_normalized, other_lines in selected:
+            if normalized in other_normalized:
+                return True
+            union = lines | other_lines
+            if union and len(lines & other_lines) / len(union) >= self.dedup_overlap:
+                return True
+        return False
+
+    def _truncate(self, block: CodeBlock, budget: int):
+        """Cut a block at a line boundary so it fits in `budget` tokens"""
+        lines = block.code.splitlines()
+        # Binary search on the number of leading lines kept
+        low, high = 0, len(lines)
+        while low < high:
+            middle = (low + high + 1) // 2
+            candidate = CodeBlock(block.lang, "\n".join(lines[:middle]))
+            if self.counter.count(_render(candidate)) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return CodeBlock(block.lang, "\n".join(lines[:low])) if low else None
+
+    def pack(self, documents, budget: int = None) -> PackedContext:
+        """Build the context for `documents`, most relevant first.
+
+        Args:
+            documents (list[Document]): Retrieved documents, in relevance order
+            budget (int, optional): Token budget. Defaults to the packer's budget.
+
+        Returns:
+            PackedContext: text (the context) and report (tokens, budget,
+                documents, blocks, duplicates, dropped, truncated, tokenizer)
+        """
+        budget = self.budget if budget is None else budget
+        used = 0
+        parts = []
+        selected = []  # (normalized code, line set) of the blocks kept
+        duplicates = dropped = 0
+        truncated = False
+
+        for document in documents:
+            for block in extract_code(document.page_content):
+                if self._is_duplicate(block.code, selected):
+                    duplicates += 1
+                    continue
+
+                cost = self.counter.count(_render(block)) + (
+                    SEPARATOR_TOKENS if parts else 0
+                )
+                if used + cost > budget:
+                    # Better part of the best match than no context at all
+                    block = self._truncate(block, budget) if not parts else None
+                    if block is None:
+                        dropped += 1
+                        continue
+                    cost = self.counter.count(_render(block))
+                    truncated = True
+
+                parts.append(_render(block))
+                selected.append((_normalize(block.code), _line_set(block.code)))
+                used += cost
+
+        report = {
+            "tokens": used,
+            "budget": budget,
+            "documents": len(documents),
+            "blocks": len(parts),
+            "duplicates": duplicates,
+            "dropped": dropped,
+            "truncated": truncated,
+            "tokenizer": self.counter.name,
+        }
+        with self._lock:
+            self.requests += 1
+            self.tokens_used += used
+            self.tokens_budgeted += budget
+        return PackedContext("\n\n".join(parts), report)
+
+    def stats(self):
+        """Return cumulative token usage.
+
+        Returns:
+            dict: requests, tokens_used, average_tokens, budget_utilization
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "tokens_used": self.tokens_used,
+                "average_tokens": (
+                    self.tokens_used / self.requests if self.requests else 0.0
+                ),
+                "budget_utilization": (
+                    self.tokens_used / self.tokens_budgeted
+                    if self.tokens_budgeted
+                    else 0.0
+                ),
+            }
+
+
+# Create global instances (the counter is shared with utils.session_memory)
+token_counter = TokenCounter()
+context_packer = ContextPacker()
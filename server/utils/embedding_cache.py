@@ -0,0 +1,261 @@
+"""Persistent embedding cache shared by all gunicorn workers.
+
+`OpenAIEmbeddings.embed_query` is called for every chat request, every new
+snippet and every similarity lookup, often for text that was already embedded.
+`CachedEmbeddings` wraps any LangChain embeddings model and answers repeated
+texts locally:
+
+    1. In-process LRU (fastest, per worker)
+    2. SQLite file on disk, shared by every worker on the machine (WAL mode)
+    3. The wrapped embeddings API, only for texts found in neither
+
+Entries are keyed by a SHA-256 of the model name plus the whitespace-normalized
+text, so switching models never returns stale vectors.
+
+Usage:
+    from langchain_openai import OpenAIEmbeddings
+    from utils.embedding_cache import CachedEmbeddings
+
+    embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-ada-002"))
+    vector = embeddings.embed_query("React button component")
+    embeddings.stats()
+    # {"memory_hits": 4, "disk_hits": 1, "misses": 2, "disk_entries": 3, ...}
+
+Configuration:
+    - EMBEDDING_CACHE_PATH: SQLite file (default: server/.cache/embeddings.sqlite3)
+    - EMBEDDING_CACHE_MEMORY_SIZE: Entries kept in the in-process LRU (default: 2048)
+    - EMBEDDING_CACHE_MAX_ENTRIES: Rows kept on disk before eviction (default: 100000)
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from utils.consts import (
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_MEMORY_SIZE,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with an in-process LRU in front of a shared SQLite store"""
+
+    # Check the on-disk size bound once every N writes
+    EVICTION_CHECK_INTERVAL = 100
+
+    def __init__(
+        self,
+        embeddings,
+        path: str = EMBEDDING_CACHE_PATH,
+        memory_size: int = EMBEDDING_CACHE_MEMORY_SIZE,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+    ):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", type(embeddings).__name__)
+        self.path = path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+
+    def __getattr__(self, name):
+        # Anything else (dimensions, client...) comes from the wrapped model
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+    def _key(self, text: str) -> str:
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{self.model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _connection(self):
+        """One SQLite connection per thread and per process (fork-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, keys):
+        if not keys:
+            return {}
+        try:
+            conn = self._connection()
+            rows = []
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(
+                    conn.execute(
+                        "SELECT key, vector FROM embeddings "
+                        f"WHERE key IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                )
+            if rows:
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(time.time(), key) for key, _ in rows],
+                )
+        except sqlite3.Error as e:
+            print(f"Embedding cache read error: {e}")
+            return {}
+        return {
+            key: np.frombuffer(blob, dtype=np.float32).tolist() for key, blob in rows
+        }
+
+    def _write_disk(self, items):
+        if not items:
+            return
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (key, self.model, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for key, vector in items
+                ],
+            )
+            with self._lock:
+                self._writes += len(items)
+                check = self._writes >= self.EVICTION_CHECK_INTERVAL
+                if check:
+                    self._writes = 0
+            if check:
+                self._evict(conn)
+        except sqlite3.Error as e:
+            print(f"Embedding cache write error: {e}")
+
+    def _evict(self, conn):
+        """Drop the least recently used rows above `max_entries`"""
+        (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+            self.disk_evictions += overflow
+
+    def _lookup(self, keys):
+        """Resolve keys from memory, then disk. Returns {key: vector}"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            self.memory_hits += len(found)
+
+        on_disk = self._read_disk([key for key in keys if key not in found])
+        for key, vector in on_disk.items():
+            self._remember(key, vector)
+        with self._lock:
+            self.disk_hits += len(on_disk)
+        found.update(on_disk)
+        return found
+
+    def embed_documents(self, texts):
+        """Embed a list of texts, calling the API only for uncached ones"""
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            with self._lock:
+                self.misses += len(missing)
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            for key, vector in new_items:
+                self._remember(key, vector)
+                found[key] = vector
+            self._write_disk(new_items)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        """Embed a single query, served from cache when possible"""
+        key = self._key(text)
+        found = self._lookup([key])
+        if key in found:
+            return found[key]
+
+        with self._lock:
+            self.misses += 1
+        vector = self.embeddings.embed_query(text)
+        self._remember(key, vector)
+        self._write_disk([(key, vector)])
+        return vector
+
+    def stats(self):
+        """Return hit/miss counters for memory and disk.
+
+        Returns:
+            dict: memory_hits, disk_hits, misses, hit_rate, memory_entries,
+                disk_entries, disk_evictions
+        """
+        try:
+            (disk_entries,) = (
+                self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            )
+        except sqlite3.Error:
+            disk_entries = None
+
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (
+                    (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+                ),
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "disk_evictions": self.disk_evictions,
+            }
@@ -0,0 +1,269 @@
+"""Shared keep-alive HTTP clients for outbound calls.
+
+`HttpClients` holds one pooled, keep-alive client per upstream, for each
+process, so outbound calls reuse open (TLS-negotiated) connections instead of
+opening one per request:
+
+    - openai: one `httpx.Client` shared by every OpenAI client (the generation,
+      vision and summary models, embeddings, ingestion and `app.client`)
+    - images: a `requests.Session` for image downloads from the CDN
+    - cloudinary: the urllib3 pool of the Cloudinary SDK, sized and timed out
+      from the same settings (see utils.cloudinary_service)
+    - pinecone: the urllib3 pool of the Pinecone index (see utils.pc_index)
+
+It is built per process through utils.services, so forked workers never share
+a socket. `stats()` reports, per upstream, the requests sent, the connections
+opened and how many requests reused an open connection: a reuse ratio well
+below 1 means TLS handshakes are still on the request path.
+
+Usage:
+    from utils.http_client import http_clients
+
+    http_clients.get("images", image_url).content
+    openai.OpenAI(http_client=http_clients.httpx_client("openai"))
+    http_clients.stats()
+    # {"openai": {"requests": 120, "connections": 2, "reused": 118,
+    #             "reuse_ratio": 0.983, "pool_size": 20}, ...}
+
+Configuration:
+    - HTTP_POOL_SIZE: Connections kept open per upstream host (default: 20)
+    - HTTP_POOL_SIZES: Per-upstream overrides, e.g. "openai=32,images=4"
+    - HTTP_CONNECT_TIMEOUT: Seconds to open a connection (default: 5)
+    - HTTP_READ_TIMEOUT: Seconds to wait for a response (default: 30)
+    - HTTP_KEEPALIVE_EXPIRY: Seconds an idle connection stays open (default: 60)
+    - HTTP_RETRIES: Retries of failed connections for idempotent requests
+      (default: 2)
+"""
+
+import threading
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.timeout import Timeout
+from utils.services import services
+from utils.consts import (
+    HTTP_POOL_SIZE,
+    HTTP_POOL_SIZES,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_RETRIES,
+)
+
+
+def _parse_pool_sizes(value: str):
+    """"openai=32,images=4" -> {"openai": 32, "images": 4}"""
+    sizes = {}
+    for item in value.split(","):
+        name, _, size = item.partition("=")
+        if name.strip() and size.strip().isdigit():
+            sizes[name.strip().lower()] = int(size)
+    return sizes
+
+
+class _Counter:
+    """Requests sent and connections (sockets) opened for one upstream.
+
+    Both are cumulative for the life of the process, so they can be exported
+    as counters whatever happens to the pools that served them.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def add(self, requests_sent: int = 0, connections: int = 0):
+        """Count requests sent and sockets opened (thread-safe)"""
+        with self._lock:
+            self.requests += requests_sent
+            self.connections += connections
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    """httpx transport counting requests and new connections"""
+
+    def __init__(self, counter: _Counter, **kwargs):
+        super().__init__(**kwargs)
+        self.counter = counter
+
+    def handle_request(self, request):
+        upstream_trace = request.extensions.get("trace")
+
+        def trace(event, info):
+            if event == "connection.connect_tcp.complete":
+                self.counter.add(connections=1)
+            if upstream_trace is not None:
+                upstream_trace(event, info)
+
+        request.extensions["trace"] = trace
+        self.counter.add(requests_sent=1)
+        return super().handle_request(request)
+
+
+def _instrument(pool_manager, counter: _Counter):
+    """Make the pools a urllib3 PoolManager creates from now on count their traffic.
+
+    urllib3's own `num_connections` misses reconnections of a pooled connection
+    whose socket was closed, which is exactly the cost to watch, and its
+    `num_requests` is lost when the PoolManager evicts or closes a pool.
+    """
+
+    def counting_pool(pool_cls):
+        class CountingConnection(pool_cls.ConnectionCls):
+            """Connection counting each socket it opens"""
+
+            def connect(self):
+                """Open the socket, counting it as a new connection"""
+                counter.add(connections=1)
+                super().connect()
+
+        def urlopen(self, *args, **kwargs):
+            # Retries call urlopen again: each attempt is a request sent
+            counter.add(requests_sent=1)
+            return pool_cls.urlopen(self, *args, **kwargs)
+
+        return type(
+            pool_cls.__name__,
+            (pool_cls,),
+            {"ConnectionCls": CountingConnection, "urlopen": urlopen},
+        )
+
+    pool_manager.pool_classes_by_scheme = {
+        scheme: counting_pool(pool_cls)
+        for scheme, pool_cls in pool_manager.pool_classes_by_scheme.items()
+    }
+
+
+class HttpClients:
+    """Pooled keep-alive clients, one per upstream"""
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        pool_size: int = HTTP_POOL_SIZE,
+        pool_sizes: str = HTTP_POOL_SIZES,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+        retries: int = HTTP_RETRIES,
+    ):
+        self.default_pool_size = pool_size
+        self.pool_sizes = _parse_pool_sizes(pool_sizes)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keepalive_expiry = keepalive_expiry
+        self.retries = retries
+
+        self._sessions = {}  # upstream -> requests.Session
+        self._httpx = {}  # upstream -> httpx.Client
+        self._counters = {}  # upstream -> _Counter
+        self._lock = threading.Lock()
+
+    def pool_size(self, upstream: str) -> int:
+        """Connections kept open for `upstream`"""
+        return self.pool_sizes.get(upstream, self.default_pool_size)
+
+    @property
+    def timeout(self):
+        """(connect, read) timeout in seconds, as requests expects it"""
+        return (self.connect_timeout, self.read_timeout)
+
+    def session(self, upstream: str) -> requests.Session:
+        """The keep-alive requests session of `upstream`"""
+        with self._lock:
+            session = self._sessions.get(upstream)
+            if session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=self.pool_size(upstream),
+                    max_retries=Retry(
+                        total=self.retries, connect=self.retries, read=0, status=0
+                    ),
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[upstream] = session
+                self._counters[upstream] = _Counter()
+                _instrument(adapter.poolmanager, self._counters[upstream])
+            return session
+
+    def get(self, upstream: str, url: str, **kwargs) -> requests.Response:
+        """GET through the session of `upstream`, with the configured timeouts"""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session(upstream).get(url, **kwargs)
+
+    def httpx_client(self, upstream: str = "openai") -> httpx.Client:
+        """The shared httpx client of `upstream` (for the OpenAI SDK and LangChain)"""
+        with self._lock:
+            if upstream not in self._httpx:
+                size = self.pool_size(upstream)
+                self._counters[upstream] = _Counter()
+                transport = _CountingTransport(
+                    self._counters[upstream],
+                    limits=httpx.Limits(
+                        max_connections=size,
+                        max_keepalive_connections=size,
+                        keepalive_expiry=self.keepalive_expiry,
+                    ),
+                    retries=self.retries,
+                )
+                client = httpx.Client(
+                    transport=transport,
+                    timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    follow_redirects=True,
+                )
+                self._httpx[upstream] = client
+            return self._httpx[upstream]
+
+    def pool_options(self, upstream: str) -> dict:
+        """urllib3 PoolManager options for an SDK that builds its own pool"""
+        return {
+            "maxsize": self.pool_size(upstream),
+            "timeout": Timeout(connect=self.connect_timeout, read=self.read_timeout),
+        }
+
+    def track(self, upstream: str, pool_manager):
+        """Count the connections of a PoolManager owned by an SDK (Cloudinary, Pinecone)"""
+        with self._lock:
+            self._counters[upstream] = _Counter()
+            _instrument(pool_manager, self._counters[upstream])
+
+    def stats(self):
+        """Return connection reuse per upstream.
+
+        Returns:
+            dict: {upstream: {requests, connections, reused, reuse_ratio, pool_size}}
+        """
+        with self._lock:
+            counts = {
+                upstream: (counter.requests, counter.connections)
+                for upstream, counter in self._counters.items()
+            }
+
+        stats = {}
+        for upstream, (sent, opened) in counts.items():
+            reused = max(sent - opened, 0)
+            stats[upstream] = {
+                "requests": sent,
+                "connections": opened,
+                "reused": reused,
+                "reuse_ratio": round(reused / sent, 3) if sent else 0.0,
+                "pool_size": self.pool_size(upstream),
+            }
+        return stats
+
+    def close(self):
+        """Close every connection this process opened"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            for client in self._httpx.values():
+                client.close()
+            self._sessions = {}
+            self._httpx = {}
+
+
+# Create global instance (one per process, see utils.services)
+http_clients = services.register("http", HttpClients, imports=("httpx", "requests"))
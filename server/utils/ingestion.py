@@ -0,0 +1,831 @@
+"""Batched ingestion pipeline for the React snippets knowledge base.
+
+`IngestionPipeline` loads dataset records into MongoDB and the vector store
+in batches, as a chain of generators (filter -> tag -> embed -> store):
+
+    1. Records are read lazily (`load_records` opens the dataset in streaming
+       mode), assistant messages with React code are kept and tagged, and the
+       snippets are grouped into batches; reading stops once `limit` snippets
+       have been produced
+    2. Long snippets are split into chunks at code boundaries (see
+       `utils.chunking`), and all the chunks of a batch are embedded with a
+       single `embeddings.create` call (the API accepts a list of inputs); up
+       to `concurrency` batches are in flight
+    3. Embedded batches are written to MongoDB with one bulk upsert
+    4. Vector upserts run on a background thread, so the next batch is embedded
+       and stored while the previous one is still uploading
+
+Each chunk is one vector: the first one keeps the snippet id, the others are
+"<snippet id>#<n>", and all carry `parent_id`, `chunk` and the full chunk text
+in their metadata. A snippet's chunks are always upserted together, so a
+snippet is marked indexed only once all of them are stored.
+
+Completed batches are stored in the order they were submitted. A batch whose
+embedding request fails is counted as failed and skipped; nothing is written
+for it, so MongoDB never holds snippets without a vector. At most
+`concurrency` batches (and their pending upserts) are held in memory, whatever
+the size of the dataset.
+
+Idempotency:
+    Snippets are keyed by `content_hash`, a SHA-256 of their whitespace-normalized
+    text, and written with upserts, so running the same ingestion twice never
+    duplicates documents or vectors. Before a batch is embedded, snippets whose
+    hash is already stored *and* indexed (vector upsert confirmed) are skipped
+    outright, so nothing is embedded twice.
+
+    Near-duplicates (same component with cosmetic changes) are dropped too:
+    each snippet's MinHash signature is compared, through LSH band keys, with
+    the stored snippets and with the earlier snippets of the run (see
+    `utils.near_duplicates`).
+
+    With an `IngestionCheckpoint`, the dataset offset and cumulative counts are
+    saved in MongoDB after every batch whose vectors are confirmed. A rerun
+    after a crash skips the records already handled and continues until
+    `limit` new snippets have been loaded in total; a run that reached its
+    limit (or the end of the dataset) is a no-op until the checkpoint is reset.
+
+Usage:
+    from utils.ingestion import IngestionPipeline, load_records
+
+    pipeline = IngestionPipeline(batch_size=100, concurrency=4, limit=1000)
+    stats = pipeline.run(load_records("cfahlgren1/react-code-instructions"))
+    # {"processed": 5234, "loaded": 1000, "skipped": 0, "failed": 0,
+    #  "elapsed_seconds": 41.2, "snippets_per_second": 24.3, ...}
+
+    # Any local JSONL or Parquet file with the same record layout works too
+    stats = pipeline.run(load_records("data/react_sample.jsonl"))
+
+    # Resumable run
+    checkpoint = IngestionCheckpoint(DATASET_NAME)
+    pipeline = IngestionPipeline(limit=1000, checkpoint=checkpoint)
+    stats = pipeline.run(load_records(DATASET_NAME))
+
+Configuration:
+    - INGEST_BATCH_SIZE: Snippets per embedding request (default: 100)
+    - INGEST_CONCURRENCY: Embedding requests in flight (default: 4)
+    - INGEST_LIMIT: New snippets to load per ingestion (default: 1000)
+    - INGEST_STREAMING: Read the dataset lazily instead of downloading the
+      whole split first (default: true)
+    - INGEST_DATA_DIR: Directory whose files `resolve_source` accepts, for
+      sources coming from API requests (default: none, Hub datasets only)
+    - NEAR_DUP_ENABLED / NEAR_DUP_THRESHOLD: Near-duplicate filtering
+      (default: true / 0.85 estimated Jaccard similarity)
+"""
+
+import os
+import re
+import time
+import hashlib
+import datetime
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+from utils.connect_db import snippets_col, ingestion_checkpoints_col, ensure_indexes
+from utils.pc_index import index
+from utils.lexical_index import lexical_index
+from utils.chunking import chunk_code, chunk_ids
+from utils.http_client import http_clients
+from utils.metrics import metrics
+from utils.near_duplicates import (
+    MinHasher,
+    MinHashLSH,
+    encode_signature,
+    decode_signature,
+)
+from utils.consts import (
+    OPENAI_API_KEY,
+    INGEST_BATCH_SIZE,
+    INGEST_CONCURRENCY,
+    INGEST_LIMIT,
+    CHUNK_MAX_CHARS,
+    NEAR_DUP_ENABLED,
+    NEAR_DUP_THRESHOLD,
+)
+
+DATASET_NAME = "cfahlgren1/react-code-instructions"
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# Input size limits (chunks are at most CHUNK_MAX_CHARS, well under both)
+MAX_EMBEDDING_CHARS = 8000
+MAX_METADATA_CHARS = max(CHUNK_MAX_CHARS, 1000)
+MIN_CONTENT_CHARS = 50
+
+# Vectors per upsert request (Pinecone caps request size at 2MB)
+UPSERT_BATCH_SIZE = 100
+
+# Local file extension -> `datasets` builder
+LOCAL_FORMATS = {".jsonl": "json", ".json": "json", ".parquet": "parquet"}
+
+# HuggingFace Hub dataset id: "name" or "owner/name"
+HUB_DATASET_PATTERN = re.compile(r"^[A-Za-z0-9][\w.-]*(/[A-Za-z0-9][\w.-]*)?$")
+
+REACT_KEYWORDS = [
+    "import react",
+    "from 'react'",
+    "export default",
+    "usestate",
+    "useeffect",
+    "jsx",
+    "component",
+    "function",
+    "const",
+    "=>",
+    "return",
+]
+
+
+def snippet_hash(text: str) -> str:
+    """Return the SHA-256 hex digest of a snippet's whitespace-normalized text"""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def load_records(source: str = DATASET_NAME, streaming: bool = True, split="train"):
+    """Open a dataset split as an iterable of records.
+
+    Args:
+        source (str): HuggingFace dataset name, or a local .jsonl/.json/.parquet file
+        streaming (bool, optional): Read records lazily instead of downloading and
+            materializing the whole split first. Defaults to True.
+        split (str, optional): Dataset split. Defaults to "train".
+
+    Returns:
+        Iterable[dict]: Dataset records
+
+    Raises:
+        ValueError: If a local file has an unsupported extension
+    """
+    # Only ingestion needs `datasets` (pandas, pyarrow...): keep it out of app startup
+    from datasets import load_dataset  # pylint: disable=import-outside-toplevel
+
+    builder = check_source(source)
+    if builder:
+        return load_dataset(builder, data_files=source, split=split, streaming=streaming)
+    return load_dataset(source, split=split, streaming=streaming)
+
+
+def check_source(source: str):
+    """Validate a dataset source without opening it.
+
+    Returns:
+        str | None: The `datasets` builder for a local file, None for a Hub dataset
+
+    Raises:
+        ValueError: If a local file has an unsupported extension
+    """
+    if not isinstance(source, str) or not source:
+        raise ValueError("source must be a dataset name or a file path")
+    if not os.path.isfile(source):
+        return None
+    extension = os.path.splitext(source)[1].lower()
+    if extension not in LOCAL_FORMATS:
+        raise ValueError(
+            f"Unsupported file type {extension!r}, expected one of "
+            f"{', '.join(sorted(LOCAL_FORMATS))}"
+        )
+    return LOCAL_FORMATS[extension]
+
+
+def resolve_source(source: str, data_dir: str = ""):
+    """Validate a dataset source received from an untrusted client.
+
+    Hub datasets are accepted by name. Local files are only accepted inside
+    `data_dir`, relative paths being resolved against it.
+
+    Args:
+        source (str): HuggingFace dataset name, or a .jsonl/.json/.parquet file
+        data_dir (str, optional): Directory local files must be in; "" rejects
+            every local file. Defaults to "".
+
+    Returns:
+        str: The dataset name, or the file's real path
+
+    Raises:
+        ValueError: If the source is neither a Hub dataset name nor a
+            supported file inside `data_dir`
+    """
+    if not isinstance(source, str) or not source:
+        raise ValueError("source must be a dataset name or a file path")
+
+    extension = os.path.splitext(source)[1].lower()
+    if extension not in LOCAL_FORMATS:
+        # `datasets` also loads local directories given by name
+        if (
+            HUB_DATASET_PATTERN.match(source)
+            and ".." not in source
+            and not os.path.exists(source)
+        ):
+            return source
+        raise ValueError(f"{source!r} is not a HuggingFace dataset name")
+
+    if not data_dir:
+        raise ValueError("Local files are disabled, set INGEST_DATA_DIR to allow them")
+    root = os.path.realpath(data_dir)
+    path = os.path.realpath(os.path.join(root, source))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError("source must be a file inside INGEST_DATA_DIR")
+    if not os.path.isfile(path):
+        raise ValueError(f"{source!r} not found in INGEST_DATA_DIR")
+    check_source(path)
+    return path
+
+
+def assistant_messages(records):
+    """Stage 1: yield (record, content) for every assistant message"""
+    for item in records:
+        for message in item.get("messages") or []:
+            if isinstance(message, dict) and message.get("role") == "assistant":
+                yield item, message.get("content") or ""
+
+
+def react_only(messages):
+    """Stage 2: keep messages long enough and containing React code"""
+    for item, content in messages:
+        if len(content) < MIN_CONTENT_CHARS:
+            continue
+        lowered = content.lower()
+        if any(keyword in lowered for keyword in REACT_KEYWORDS):
+            yield item, content
+
+
+def tagged(messages):
+    """Stage 3: turn messages into snippets with tags and metadata"""
+    for item, content in messages:
+        tags = ["react"]
+        if item.get("recommended", False):
+            tags.append("recommended")
+        if item.get("upvoted", False):
+            tags.append("upvoted")
+        if item.get("model"):
+            tags.append(f"model:{item['model']}")
+
+        yield {
+            "text": content,
+            "tags": tags,
+            "model": item.get("model"),
+            "recommended": item.get("recommended", False),
+            "upvoted": item.get("upvoted", False),
+        }
+
+
+def skip_records(records, count: int):
+    """Skip the first `count` records, using the dataset's own `skip` if it has one"""
+    if not count:
+        return records
+    if hasattr(records, "skip"):
+        return records.skip(count)
+    return itertools.islice(records, count, None)
+
+
+def extract_snippets(records):
+    """Filter and tag the React snippets found in `records`, lazily.
+
+    Args:
+        records (Iterable[dict]): Dataset records with `messages` and optional
+            `recommended`, `upvoted` and `model` fields
+
+    Yields:
+        dict: text, tags, model, recommended, upvoted
+    """
+    return tagged(react_only(assistant_messages(records)))
+
+
+class IngestionCheckpoint:
+    """Progress of one dataset ingestion, persisted in MongoDB.
+
+    Fields: dataset, split, offset (records fully handled), loaded, skipped,
+    failed (cumulative snippet counts), exhausted (end of dataset reached),
+    status ("running", "completed", "failed" or "cancelled") and updated_at.
+    """
+
+    def __init__(self, dataset: str, split: str = "train", collection=None):
+        self.collection = (
+            collection if collection is not None else ingestion_checkpoints_col
+        )
+        self.key = f"{dataset}:{split}"
+        self.dataset = dataset
+        self.split = split
+
+    def load(self):
+        """Return the saved progress, or a fresh state"""
+        doc = self.collection.find_one({"_id": self.key}) or {}
+        return {
+            "dataset": self.dataset,
+            "split": self.split,
+            "offset": doc.get("offset", 0),
+            "loaded": doc.get("loaded", 0),
+            "skipped": doc.get("skipped", 0),
+            "failed": doc.get("failed", 0),
+            "exhausted": doc.get("exhausted", False),
+            "status": doc.get("status", "new"),
+        }
+
+    def save(self, **fields):
+        """Update the saved progress"""
+        fields["updated_at"] = datetime.datetime.utcnow()
+        self.collection.update_one(
+            {"_id": self.key},
+            {"$set": {"dataset": self.dataset, "split": self.split, **fields}},
+            upsert=True,
+        )
+
+    def reset(self):
+        """Forget the saved progress so the next run starts from the beginning"""
+        self.collection.delete_one({"_id": self.key})
+
+
+class IngestionPipeline:  # pylint: disable=too-many-instance-attributes
+    """Embed and store snippets in concurrent batches"""
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        batch_size: int = INGEST_BATCH_SIZE,
+        concurrency: int = INGEST_CONCURRENCY,
+        limit: int = INGEST_LIMIT,
+        dataset: str = DATASET_NAME,
+        client=None,
+        checkpoint: IngestionCheckpoint = None,
+        on_progress=None,
+        should_stop=None,
+        near_duplicate_threshold=NEAR_DUP_THRESHOLD if NEAR_DUP_ENABLED else None,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.limit = limit
+        self.dataset = dataset
+        self.checkpoint = checkpoint
+        self.on_progress = on_progress  # Called with `stats()` after every batch
+        self.should_stop = should_stop  # Polled before each batch; True cancels the run
+        # One client for the whole run, on the process-wide keep-alive pool
+        self.client = client or OpenAI(
+            api_key=OPENAI_API_KEY,
+            max_retries=5,
+            http_client=http_clients.httpx_client("openai"),
+        )
+
+        # None disables near-duplicate filtering
+        self.hasher = MinHasher() if near_duplicate_threshold else None
+        self.lsh = (
+            MinHashLSH(near_duplicate_threshold, self.hasher.num_perm)
+            if near_duplicate_threshold
+            else None
+        )
+
+        self.processed = 0
+        self.loaded = 0
+        self.skipped = 0
+        self.near_duplicates = 0
+        self.chunks = 0
+        self.failed = 0
+        self.batches = 0
+        self.upsert_errors = 0
+        self.cancelled = False
+        self._target = None
+        self._started = None
+
+        self._start_offset = 0
+        self._base = {"loaded": 0, "skipped": 0, "failed": 0}
+        # First record of the earliest failed batch: the checkpoint never moves past it
+        self._failed_at = None
+        self._limit_reached = False
+
+    def _embed(self, batch):
+        """Chunk every snippet of the batch and embed all the chunks in one request"""
+        for snippet in batch:
+            snippet["chunks"] = chunk_code(snippet["text"])
+        with metrics.span("ingest_embed"):
+            response = self.client.embeddings.create(
+                input=[
+                    chunk[:MAX_EMBEDDING_CHARS]
+                    for snippet in batch
+                    for chunk in snippet["chunks"]
+                ],
+                model=EMBEDDING_MODEL,
+            )
+        usage = getattr(response, "usage", None)
+        metrics.inc("embedding_tokens_total", getattr(usage, "total_tokens", 0) or 0)
+        # The API returns one item per input, tagged with its position
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    @staticmethod
+    def _upsert(vectors):
+        """Upload vectors, then mark their snippets as indexed"""
+        with metrics.span("ingest_upsert"):
+            index.upsert(vectors)
+        snippets_col.update_many(
+            {
+                "content_hash": {
+                    "$in": list({meta["content_hash"] for _, _, meta in vectors})
+                }
+            },
+            {"$set": {"indexed": True}},
+        )
+
+    def _store(self, batch, embeddings, upserter, pending_upserts):
+        """Upsert one embedded batch into MongoDB and queue its vector upsert"""
+        now = datetime.datetime.utcnow()
+        hashes = [snippet["content_hash"] for snippet in batch]
+        with metrics.span("ingest_store"):
+            snippets_col.bulk_write(
+                [
+                    UpdateOne(
+                        {"content_hash": snippet["content_hash"]},
+                        {
+                            "$setOnInsert": {
+                                "text": snippet["text"],
+                                "tags": snippet["tags"],
+                                "original_dataset": self.dataset,
+                                "model": snippet["model"],
+                                "recommended": snippet["recommended"],
+                                "upvoted": snippet["upvoted"],
+                                "indexed": False,
+                                "created_at": now,
+                            },
+                            "$set": {
+                                "chunk_count": len(snippet["chunks"]),
+                                **self._signature_fields(snippet),
+                            },
+                            # MongoDB's clock: one time source for every writer
+                            "$currentDate": {"updated_at": True},
+                        },
+                        upsert=True,
+                    )
+                    for snippet in batch
+                ],
+                ordered=False,
+            )
+            ids = {
+                doc["content_hash"]: str(doc["_id"])
+                for doc in snippets_col.find(
+                    {"content_hash": {"$in": hashes}}, {"content_hash": 1}
+                )
+            }
+
+        # Group vectors into upsert requests without splitting a snippet's chunks
+        groups, group = [], []
+        embeddings = iter(embeddings)
+        for snippet in batch:
+            snippet_id = ids[snippet["content_hash"]]
+            lexical_index.add(snippet_id, snippet["text"])
+            vectors = [
+                (
+                    vector_id,
+                    next(embeddings),
+                    {
+                        "text": chunk[:MAX_METADATA_CHARS],
+                        "parent_id": snippet_id,
+                        "chunk": position,
+                        "chunk_count": len(snippet["chunks"]),
+                        "tags": ",".join(snippet["tags"]),
+                        "tag_list": snippet["tags"],
+                        "recommended": snippet["recommended"],
+                        "upvoted": snippet["upvoted"],
+                        "model": snippet["model"] or "unknown",
+                        "dataset": self.dataset,
+                        "content_hash": snippet["content_hash"],
+                    },
+                )
+                for position, (vector_id, chunk) in enumerate(
+                    zip(chunk_ids(snippet_id, len(snippet["chunks"])), snippet["chunks"])
+                )
+            ]
+            if group and len(group) + len(vectors) > UPSERT_BATCH_SIZE:
+                groups.append(group)
+                group = []
+            group.extend(vectors)
+        groups.append(group)
+
+        for position, vectors in enumerate(groups):
+            # The checkpoint moves past this batch once its last group is confirmed
+            pending_upserts.append(
+                (
+                    upserter.submit(self._upsert, vectors),
+                    batch[0]["record"],
+                    batch[-1]["record"] if position == len(groups) - 1 else None,
+                )
+            )
+        self.loaded += len(batch)
+        self.chunks += sum(len(snippet["chunks"]) for snippet in batch)
+
+    def _signature_fields(self, snippet):
+        if "minhash" not in snippet:
+            return {}
+        return {
+            "minhash": encode_signature(snippet["minhash"]),
+            "lsh_bands": self.lsh.band_keys(snippet["minhash"]),
+        }
+
+    def _collect(self, in_flight, upserter, pending_upserts):
+        """Store the oldest in-flight batch once its embeddings are back"""
+        batch, future = in_flight.popleft()
+        try:
+            embeddings = future.result()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Embedding error ({len(batch)} snippets skipped): {str(e)}")
+            self._fail(batch)
+            return
+
+        try:
+            self._store(batch, embeddings, upserter, pending_upserts)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"MongoDB error ({len(batch)} snippets skipped): {str(e)}")
+            self._fail(batch)
+            return
+
+        self.batches += 1
+        print(
+            f"Progress: Processed {self.processed}, Loaded {self.loaded}, "
+            f"Skipped {self.skipped}, Near-duplicates {self.near_duplicates} "
+            f"({self.throughput():.1f} snippets/s)"
+        )
+        self._report()
+
+    def _report(self):
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress(self.stats())
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Progress callback error: {str(e)}")
+
+    def _fail(self, batch):
+        self.failed += len(batch)
+        self._mark_failed(batch[0]["record"])
+
+    def _mark_failed(self, record):
+        # A rerun must come back to these snippets: pin the checkpoint here
+        if self._failed_at is None or record < self._failed_at:
+            self._failed_at = record
+
+    def _finish_upsert(self, pending_upserts):
+        future, first_record, offset = pending_upserts.popleft()
+        try:
+            future.result()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Vector upsert error: {str(e)}")
+            self.upsert_errors += 1
+            self._mark_failed(first_record)
+            return
+        if offset is not None:
+            self._save_checkpoint(offset=offset, status="running")
+
+    def _save_checkpoint(self, offset=None, **fields):
+        if self.checkpoint is None:
+            return
+        if offset is not None and (
+            self._failed_at is None or offset <= self._failed_at
+        ):
+            fields["offset"] = offset
+        try:
+            self.checkpoint.save(
+                loaded=self._base["loaded"] + self.loaded,
+                skipped=self._base["skipped"] + self.skipped,
+                failed=self._base["failed"] + self.failed,
+                **fields,
+            )
+        except PyMongoError as e:
+            print(f"Checkpoint save error: {e}")
+
+    def _counted(self, records):
+        for item in records:
+            self.processed += 1
+            yield item
+
+    def _positioned(self, snippets):
+        """Record which dataset record each snippet came from, for the checkpoint"""
+        for snippet in snippets:
+            # Generators are lazy: the record being read is the one that produced it
+            snippet["record"] = self._start_offset + self.processed - 1
+            yield snippet
+
+    def _new_only(self, snippets):
+        """Drop snippets already stored and indexed, checking a chunk at a time"""
+        while True:
+            chunk = list(itertools.islice(snippets, self.batch_size))
+            if not chunk:
+                return
+
+            unique = {}
+            for snippet in chunk:
+                snippet["content_hash"] = snippet_hash(snippet["text"])
+                if snippet["content_hash"] in unique:
+                    self.skipped += 1
+                unique[snippet["content_hash"]] = snippet
+
+            existing = {
+                doc["content_hash"]
+                for doc in snippets_col.find(
+                    {"content_hash": {"$in": list(unique)}, "indexed": True},
+                    {"content_hash": 1},
+                )
+            }
+            self.skipped += len(existing)
+            for content_hash, snippet in unique.items():
+                if content_hash not in existing:
+                    yield snippet
+
+    def _distinct(self, snippets):
+        """Drop near-duplicates of stored snippets and of earlier snippets of the run"""
+        while True:
+            chunk = list(itertools.islice(snippets, self.batch_size))
+            if not chunk:
+                return
+
+            band_keys = set()
+            for snippet in chunk:
+                snippet["minhash"] = self.hasher.signature(snippet["text"])
+                band_keys.update(self.lsh.band_keys(snippet["minhash"]))
+
+            # Stored snippets sharing a band with this chunk
+            for doc in snippets_col.find(
+                {"lsh_bands": {"$in": list(band_keys)}},
+                {"content_hash": 1, "minhash": 1},
+            ):
+                if doc.get("minhash") is not None:
+                    self.lsh.add(
+                        doc.get("content_hash") or str(doc["_id"]),
+                        decode_signature(doc["minhash"]),
+                    )
+
+            for snippet in chunk:
+                # A stored but unindexed copy of the same text is not a duplicate
+                if self.lsh.near_duplicate_of(
+                    snippet["minhash"], exclude=snippet["content_hash"]
+                ):
+                    self.near_duplicates += 1
+                    continue
+                self.lsh.add(snippet["content_hash"], snippet["minhash"])
+                yield snippet
+
+    def _batches(self, records, limit):
+        """Group new snippets from `records` into batches, stopping at `limit`.
+
+        Records are pulled only as fast as batches are consumed, so with a
+        streaming dataset nothing past the limit is ever downloaded.
+        """
+        snippets = self._new_only(
+            self._positioned(extract_snippets(self._counted(records)))
+        )
+        if self.lsh is not None:
+            snippets = self._distinct(snippets)
+        if limit:
+            snippets = itertools.islice(snippets, limit)
+
+        produced = 0
+        while True:
+            if self.should_stop is not None and self.should_stop():
+                print("Ingestion cancelled")
+                self.cancelled = True
+                return
+            batch = list(itertools.islice(snippets, self.batch_size))
+            if not batch:
+                self._limit_reached = bool(limit) and produced >= limit
+                return
+            produced += len(batch)
+            yield batch
+
+    def _resume(self, records):
+        """Apply the checkpoint. Returns (records, limit), records None when done"""
+        if self.checkpoint is None:
+            return records, self.limit
+
+        state = self.checkpoint.load()
+        self._start_offset = state["offset"]
+        self._base = {key: state[key] for key in ("loaded", "skipped", "failed")}
+        limit = max(self.limit - state["loaded"], 0) if self.limit else self.limit
+        if state["exhausted"] or (self.limit and not limit):
+            print(f"Ingestion of {self.checkpoint.key} already complete")
+            return None, 0
+
+        if self._start_offset:
+            print(
+                f"Resuming {self.checkpoint.key} at record {self._start_offset} "
+                f"({state['loaded']} snippets already loaded)"
+            )
+        self._save_checkpoint(status="running")
+        return skip_records(records, self._start_offset), limit
+
+    def throughput(self) -> float:
+        """Loaded snippets per second since the run started"""
+        if not self._started:
+            return 0.0
+        elapsed = time.monotonic() - self._started
+        return self.loaded / elapsed if elapsed > 0 else 0.0
+
+    def run(self, records):
+        """Ingest every new React snippet found in `records`.
+
+        Records are consumed lazily (see `load_records`): at most
+        `concurrency` batches and their pending upserts are held in memory.
+
+        Args:
+            records (Iterable[dict]): Dataset records
+
+        Returns:
+            dict: Processing statistics (see `stats`)
+        """
+        self._started = time.monotonic()
+        records, limit = self._resume(records)
+        if records is None:
+            return self.stats()
+        self._target = limit or None
+
+        # Upserts rely on the unique content_hash index
+        try:
+            ensure_indexes(collections=("snippets",))
+        except PyMongoError as e:
+            print(f"Could not create snippet indexes: {e}")
+
+        in_flight = deque()
+        pending_upserts = deque()
+
+        with ThreadPoolExecutor(self.concurrency) as embedder, ThreadPoolExecutor(
+            1
+        ) as upserter:
+            for batch in self._batches(records, limit):
+                in_flight.append((batch, embedder.submit(self._embed, batch)))
+                if len(in_flight) >= self.concurrency:
+                    self._collect(in_flight, upserter, pending_upserts)
+                # Bound memory held by queued upserts
+                while len(pending_upserts) > self.concurrency:
+                    self._finish_upsert(pending_upserts)
+
+            while in_flight:
+                self._collect(in_flight, upserter, pending_upserts)
+
+            while pending_upserts:
+                self._finish_upsert(pending_upserts)
+
+        # At the end of the dataset every record read has been handled. When the
+        # limit or a cancellation stopped the run, snippets read ahead were
+        # dropped: keep the offset of the last confirmed batch instead.
+        exhausted = not self._limit_reached and not self.cancelled
+        if self._failed_at is not None:
+            status = "failed"
+        else:
+            status = "cancelled" if self.cancelled else "completed"
+        self._save_checkpoint(
+            offset=self._start_offset + self.processed if exhausted else None,
+            exhausted=exhausted and self._failed_at is None,
+            status=status,
+        )
+        self._report()
+
+        stats = self.stats()
+        print("\n=== FINAL RESULTS ===")
+        print(f"Processed: {stats['processed']} items")
+        print(
+            f"Loaded: {stats['loaded']} React components "
+            f"({stats['chunks']} chunks)"
+        )
+        print(f"Skipped: {stats['skipped']} already stored")
+        print(
+            f"Near-duplicates: {stats['near_duplicates']} removed "
+            f"({stats['near_duplicate_ratio']:.1%} of new snippets)"
+        )
+        print(f"Failed: {stats['failed']} snippets")
+        print(
+            f"Throughput: {stats['snippets_per_second']:.1f} snippets/s "
+            f"in {stats['elapsed_seconds']:.1f}s"
+        )
+        return stats
+
+    def stats(self):
+        """Return processing statistics for this run.
+
+        Returns:
+            dict: processed, loaded, skipped, near_duplicates,
+                near_duplicate_ratio, chunks (vectors written), failed, batches, upsert_errors,
+                resumed_from, target (new snippets this run aims for, None when
+                unlimited), eta_seconds, cancelled, elapsed_seconds,
+                snippets_per_second, batch_size, concurrency
+        """
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        rate = self.throughput()
+        eta = None
+        if self._target and rate > 0:
+            eta = round(max(self._target - self.loaded - self.failed, 0) / rate, 1)
+        candidates = self.loaded + self.failed + self.near_duplicates
+        return {
+            "processed": self.processed,
+            "loaded": self.loaded,
+            "skipped": self.skipped,
+            "near_duplicates": self.near_duplicates,
+            "near_duplicate_ratio": (
+                round(self.near_duplicates / candidates, 4) if candidates else 0.0
+            ),
+            "chunks": self.chunks,
+            "failed": self.failed,
+            "batches": self.batches,
+            "upsert_errors": self.upsert_errors,
+            "resumed_from": self._start_offset,
+            "target": self._target,
+            "eta_seconds": eta,
+            "cancelled": self.cancelled,
+            "elapsed_seconds": round(elapsed, 3),
+            "snippets_per_second": round(rate, 2),
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+        }
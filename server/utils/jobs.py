@@ -0,0 +1,359 @@
+"""Background jobs with their state stored in MongoDB.
+
+`JobRunner` runs long work, such as populating the knowledge base, outside
+the HTTP request, on a small thread pool in the worker that received it. It
+keeps the job document in `jobs_col` up to date, so any worker can answer
+status queries and accept cancellations.
+
+Job document:
+    {
+        "_id": "uuid-string",
+        "type": "populate-from-hf",
+        "status": "queued" | "running" | "completed" | "failed" | "cancelled",
+        "params": {...},
+        "progress": {...},          # Latest stats reported by the job
+        "result": {...},            # Final return value, once completed
+        "error": "message",         # Once failed
+        "cancel_requested": false,
+        "worker": "hostname:pid",
+        "lock": "type:key",         # Exclusive jobs until they finish, else the id
+        "created_at", "started_at", "finished_at", "heartbeat_at": datetime
+    }
+
+Exclusive jobs: `submit(..., lock_key=key)` stores a `lock` covered by a unique
+index, so at most one queued or running job of that type holds each key, across
+every worker. Submitting another raises `JobConflict`; a holder gone stale (its
+worker died) is marked failed and the lock taken over. Other jobs, and finished
+ones, hold their own id, so the index never sees two equal values.
+
+A job function receives a `JobContext` and calls `context.report(stats)` as it
+goes and `context.cancelled()` between units of work; it stops early when the
+latter returns True. Progress writes and cancellation checks are throttled so
+they cost at most one MongoDB round trip per second each.
+
+Usage:
+    from utils.jobs import job_runner
+
+    def work(context, count):
+        for i in range(count):
+            if context.cancelled():
+                return {"done": i}
+            context.report({"done": i})
+        return {"done": count}
+
+    job_id = job_runner.submit("example", work, count=10)
+    job_runner.submit("example", work, lock_key="daily", count=10)  # JobConflict
+    job_runner.get(job_id)     # Serialized job document
+    job_runner.cancel(job_id)  # From any worker
+
+Configuration:
+    - JOB_WORKERS: Jobs run concurrently per server process (default: 1)
+    - JOB_STALE_AFTER: Seconds without a heartbeat after which a job is
+      reported as stale, e.g. its worker was restarted (default: 120). Each
+      runner refreshes the heartbeat of its unfinished jobs, including those
+      still waiting in its queue, so only jobs whose worker is gone go stale.
+"""
+
+import os
+import time
+import uuid
+import socket
+import datetime
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import PyMongoError, DuplicateKeyError
+from utils.connect_db import jobs_col, ensure_indexes
+from utils.consts import JOB_WORKERS, JOB_STALE_AFTER
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobConflict(Exception):
+    """Another active job holds the lock of the job being submitted"""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Job {job_id} holds this lock")
+        self.job_id = job_id
+
+
+class JobContext:
+    """Handle given to a running job to report progress and check for cancellation"""
+
+    # Minimum seconds between two progress writes / cancellation reads
+    REPORT_INTERVAL = 1.0
+    CANCEL_CHECK_INTERVAL = 1.0
+
+    def __init__(self, collection, job_id: str):
+        self.collection = collection
+        self.job_id = job_id
+        self._last_report = 0.0
+        self._last_cancel_check = 0.0
+        self._cancelled = False
+
+    def report(self, progress: dict, force: bool = False):
+        """Save the latest progress (and heartbeat) on the job document"""
+        now = time.monotonic()
+        if not force and now - self._last_report < self.REPORT_INTERVAL:
+            return
+        self._last_report = now
+        try:
+            self.collection.update_one(
+                {"_id": self.job_id},
+                {
+                    "$set": {
+                        "progress": progress,
+                        "heartbeat_at": datetime.datetime.utcnow(),
+                    }
+                },
+            )
+        except PyMongoError as e:
+            print(f"Job progress error: {e}")
+
+    def cancelled(self) -> bool:
+        """Return True once a cancellation has been requested"""
+        if self._cancelled:
+            return True
+        now = time.monotonic()
+        if now - self._last_cancel_check < self.CANCEL_CHECK_INTERVAL:
+            return False
+        self._last_cancel_check = now
+        try:
+            doc = self.collection.find_one(
+                {"_id": self.job_id}, {"cancel_requested": 1}
+            )
+        except PyMongoError as e:
+            print(f"Job cancellation check error: {e}")
+            return False
+        self._cancelled = bool(doc and doc.get("cancel_requested"))
+        return self._cancelled
+
+
+class JobRunner:
+    """Run functions on a local thread pool, tracking them in MongoDB"""
+
+    def __init__(self, collection, max_workers: int = 1, stale_after: int = 120):
+        self.collection = collection
+        self.max_workers = max_workers
+        self.stale_after = stale_after
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        # Ids of the unfinished jobs submitted in this process
+        self._local_jobs = set()
+        self._indexed = False
+
+    def _pool(self):
+        """One pool per process: threads do not survive a gunicorn fork"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="job"
+                )
+                self._pid = os.getpid()
+                self._local_jobs = set()
+                threading.Thread(
+                    target=self._heartbeat_loop, name="job-heartbeat", daemon=True
+                ).start()
+            return self._executor
+
+    def _heartbeat_loop(self):
+        """Keep queued jobs, and running ones between reports, from going stale"""
+        while True:
+            time.sleep(max(self.stale_after / 4, 1))
+            with self._lock:
+                job_ids = list(self._local_jobs)
+            if not job_ids:
+                continue
+            try:
+                self.collection.update_many(
+                    {
+                        "_id": {"$in": job_ids},
+                        "status": {"$in": list(ACTIVE_STATUSES)},
+                    },
+                    {"$set": {"heartbeat_at": datetime.datetime.utcnow()}},
+                )
+            except PyMongoError as e:
+                print(f"Job heartbeat error: {e}")
+
+    def submit(self, job_type: str, func, lock_key=None, **params) -> str:
+        """Queue `func(context, **params)` and return the new job id.
+
+        Args:
+            job_type (str): Job type, stored on the document
+            func (callable): Job body
+            lock_key (str, optional): Run at most one active job of this type
+                with this key, across workers. Defaults to None.
+            **params: Arguments of `func`, stored on the document
+
+        Raises:
+            JobConflict: If an active job already holds the lock
+        """
+        job_id = str(uuid.uuid4())
+        now = datetime.datetime.utcnow()
+        doc = {
+            "_id": job_id,
+            "type": job_type,
+            "status": "queued",
+            "params": params,
+            "progress": {},
+            "cancel_requested": False,
+            "worker": f"{socket.gethostname()}:{os.getpid()}",
+            "created_at": now,
+            "heartbeat_at": now,
+            "lock": job_id,
+        }
+        if lock_key is None:
+            self.collection.insert_one(doc)
+        else:
+            doc["lock"] = f"{job_type}:{lock_key}"
+            self._insert_locked(doc)
+
+        pool = self._pool()
+        with self._lock:
+            self._local_jobs.add(job_id)
+        pool.submit(self._run, job_id, func, params)
+        return job_id
+
+    def _insert_locked(self, doc):
+        """Insert an exclusive job; the unique index on `lock` settles races"""
+        if not self._indexed:
+            try:
+                ensure_indexes(self.collection.database, collections=("jobs",))
+                self._indexed = True
+            except PyMongoError as e:
+                print(f"Could not create job indexes: {e}")
+
+        for _ in range(2):
+            try:
+                self.collection.insert_one(doc)
+                return
+            except DuplicateKeyError:
+                holder = self.collection.find_one({"lock": doc["lock"]})
+                if holder is None:
+                    continue  # Released meanwhile
+                if not self._is_stale(holder):
+                    raise JobConflict(holder["_id"]) from None
+                # Its worker is gone: fail it, unless it came back meanwhile
+                self.collection.update_one(
+                    {"_id": holder["_id"], "heartbeat_at": holder.get("heartbeat_at")},
+                    {
+                        "$set": {
+                            "status": "failed",
+                            "error": "Worker lost",
+                            "finished_at": datetime.datetime.utcnow(),
+                            "lock": holder["_id"],
+                        },
+                    },
+                )
+        holder = self.collection.find_one({"lock": doc["lock"]}, {"_id": 1})
+        raise JobConflict(holder["_id"] if holder else None)
+
+    def _finish(self, job_id: str, status: str, **fields):
+        try:
+            self.collection.update_one(
+                {"_id": job_id},
+                {
+                    "$set": {
+                        "status": status,
+                        "finished_at": datetime.datetime.utcnow(),
+                        "heartbeat_at": datetime.datetime.utcnow(),
+                        "lock": job_id,  # Release it
+                        **fields,
+                    },
+                },
+            )
+        except PyMongoError as e:
+            print(f"Job {job_id} could not be saved as {status}: {e}")
+
+    def _run(self, job_id: str, func, params):
+        try:
+            self._execute(job_id, func, params)
+        finally:
+            with self._lock:
+                self._local_jobs.discard(job_id)
+
+    def _execute(self, job_id: str, func, params):
+        # Cancelled while still queued
+        started = self.collection.find_one_and_update(
+            {"_id": job_id, "status": "queued"},
+            {
+                "$set": {
+                    "status": "running",
+                    "started_at": datetime.datetime.utcnow(),
+                    "heartbeat_at": datetime.datetime.utcnow(),
+                }
+            },
+        )
+        if started is None:
+            return
+
+        context = JobContext(self.collection, job_id)
+        try:
+            result = func(context, **params)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
+            self._finish(job_id, "failed", error=str(e))
+            return
+
+        self._finish(
+            job_id, "cancelled" if context.cancelled() else "completed", result=result
+        )
+
+    def _is_stale(self, doc) -> bool:
+        """True for an unfinished job whose worker stopped refreshing it"""
+        heartbeat = doc.get("heartbeat_at")
+        return (
+            doc.get("status") in ACTIVE_STATUSES
+            and heartbeat is not None
+            and (datetime.datetime.utcnow() - heartbeat).total_seconds()
+            > self.stale_after
+        )
+
+    def get(self, job_id: str):
+        """Return the job document ready for JSON, or None if unknown"""
+        doc = self.collection.find_one({"_id": job_id})
+        if doc is None:
+            return None
+
+        doc["stale"] = self._is_stale(doc)
+        for key, value in doc.items():
+            if isinstance(value, datetime.datetime):
+                doc[key] = value.isoformat()
+        doc["id"] = doc.pop("_id")
+        return doc
+
+    def cancel(self, job_id: str):
+        """Request cancellation. Returns the new status, or None if unknown.
+
+        A queued job is cancelled at once; a running one stops at its next
+        cancellation check, keeping the work already done.
+        """
+        doc = self.collection.find_one_and_update(
+            {"_id": job_id, "status": "queued"},
+            {
+                "$set": {
+                    "status": "cancelled",
+                    "cancel_requested": True,
+                    "finished_at": datetime.datetime.utcnow(),
+                    "lock": job_id,
+                },
+            },
+        )
+        if doc is not None:
+            return "cancelled"
+
+        doc = self.collection.find_one_and_update(
+            {"_id": job_id, "status": "running"},
+            {"$set": {"cancel_requested": True}},
+        )
+        if doc is not None:
+            return "cancelling"
+
+        doc = self.collection.find_one({"_id": job_id}, {"status": 1})
+        return doc["status"] if doc else None
+
+
+# Create global instance
+job_runner = JobRunner(jobs_col, max_workers=JOB_WORKERS, stale_after=JOB_STALE_AFTER)
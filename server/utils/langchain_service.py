@@ -14,6 +14,8 @@ Features:
     - Support for modern React patterns (hooks, functional components)
     - Tailwind CSS styling integration
     - TypeScript interface generation
+    - Simple requests answered by a faster model, complex ones by gpt-4o
+      (see utils.model_router)
 
 Dependencies:
     - OpenAI API for code generation and vision analysis
@@ -22,8 +24,10 @@ Dependencies:
     - LangSmith for tracing and monitoring
 
 Usage:
-    The module automatically creates a global `react_assistant` instance that can be
-    imported and used throughout the application for AI-powered code generation.
+    The module exports a global `react_assistant` that can be imported and used
+    throughout the application for AI-powered code generation. It is built on
+    first use in each process (see utils.services), so importing this module
+    creates no OpenAI client.
 
 Example:
     from utils.langchain_service import react_assistant
@@ -31,27 +35,73 @@ Example:
     # Generate React code from description
     code = react_assistant.generate_code("Create a button component")
 
+    # Stream React code as it is generated
+    for chunk in react_assistant.stream_code("Create a button component"):
+        print(chunk, end="")
+
     # Analyze UI mockup image
     description = react_assistant.analyze_image(base64_image_data)
 """
 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+import time
+import base64
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
 from langchain.schema import HumanMessage, Document
 from langchain.prompts import ChatPromptTemplate
 from langsmith import traceable
-from pinecone import Pinecone
-from pinecone.exceptions import PineconeException
-from utils.consts import PINECONE_API_KEY, OPENAI_API_KEY
+from utils.consts import (
+    OPENAI_API_KEY,
+    PIPELINE_MAX_WORKERS,
+    SEMANTIC_CACHE_ENABLED,
+    RETRIEVER_MODE,
+    VECTOR_STORE_BACKEND,
+    CONTEXT_CANDIDATES,
+    VISION_CACHE_ENABLED,
+    VISION_PENDING_TIMEOUT,
+    MODEL_FAST_TIMEOUT,
+)
+from utils.semantic_cache import semantic_cache
+from utils.embedding_cache import CachedEmbeddings
+from utils.vision_cache import vision_cache
+from utils.pc_index import index as vector_index
+from utils.vector_store import build_filter, matches_filter
+from utils.lexical_index import lexical_index, reciprocal_rank_fusion
+from utils.context_packer import context_packer, token_counter
+from utils.metrics import metrics
+from utils.model_router import model_router
+from utils.services import services
+from utils.http_client import http_clients
 
 
 class CustomPineconeRetriever:
-    """Custom Pinecone retriever that works without langchain-pinecone"""
+    """Custom Pinecone retriever that works without langchain-pinecone.
+
+    In "hybrid" mode, dense results are fused with BM25 results from the
+    lexical index using Reciprocal Rank Fusion, so exact identifier matches
+    ("useReducer", "Dialog") are not lost.
+
+    Long snippets are stored as several chunks (see utils.chunking). Matches
+    are collapsed by `parent_id`, so each snippet is returned once, as its
+    best-matching chunk.
+    """
 
-    def __init__(self, index, embeddings):
+    # Candidates taken from each ranking before fusion, per requested result
+    HYBRID_CANDIDATES_PER_RESULT = 5
+    # Chunk matches queried per requested snippet, before collapsing
+    CHUNK_CANDIDATES_PER_RESULT = 4
+
+    def __init__(self, index, embeddings, lexical=None, mode: str = "vector"):
         self.index = index
         self.embeddings = embeddings
+        self.lexical = lexical
+        self.mode = mode if lexical is not None else "vector"
 
-    def get_relevant_documents(self, query: str, k: int = 3):
+    def get_relevant_documents(
+        self, query: str, k: int = 3, query_embedding=None, filters=None
+    ):
         """Retrieve relevant documents from Pinecone based on semantic similarity.
 
         This method converts the input query to an embedding vector, searches the Pinecone
@@ -60,6 +110,11 @@ class CustomPineconeRetriever:
         Args:
                 query (str): The search query to find relevant documents for
                 k (int, optional): Maximum number of documents to retrieve. Defaults to 3.
+                query_embedding (list[float], optional): Embedding of `query` when the
+                        caller already computed it, saving an embedding request.
+                filters (dict, optional): Metadata filters pushed down into the vector
+                        query, e.g. {"recommended": True} or {"tags": ["form"]}
+                        (see utils.vector_store.build_filter).
 
         Returns:
                 list[Document]: List of LangChain Document objects containing:
@@ -76,16 +131,23 @@ class CustomPineconeRetriever:
                         print(doc.page_content)
         """
         # Generate embedding for query
-        query_embedding = self.embeddings.embed_query(query)
+        if query_embedding is None:
+            with metrics.span("embed_query"):
+                query_embedding = self.embeddings.embed_query(query)
+
+        metadata_filter = build_filter(filters)
+
+        if self.mode == "hybrid":
+            return self._hybrid_search(query, query_embedding, k, metadata_filter)
 
         # Search Pinecone
-        results = self.index.query(
-            vector=query_embedding, top_k=k, include_metadata=True
+        results = self._query(
+            query_embedding, k * self.CHUNK_CANDIDATES_PER_RESULT, metadata_filter
         )
 
         # Convert to LangChain documents
         documents = []
-        for match in results.matches:
+        for match in self._collapse(results.matches)[:k]:
             doc = Document(
                 page_content=match.metadata.get("text", ""), metadata=match.metadata
             )
@@ -93,6 +155,95 @@ class CustomPineconeRetriever:
 
         return documents
 
+    @staticmethod
+    def _collapse(matches):
+        """Keep the best-scoring chunk of each snippet, in score order"""
+        best = {}
+        for match in matches:
+            parent_id = (match.metadata or {}).get("parent_id", match.id)
+            if parent_id not in best or match.score > best[parent_id].score:
+                best[parent_id] = match
+        return sorted(best.values(), key=lambda match: match.score, reverse=True)
+
+    def _query(self, query_embedding, top_k: int, metadata_filter=None):
+        """Vector query, passing the filter only when there is one"""
+        with metrics.span("vector_query"):
+            if metadata_filter:
+                return self.index.query(
+                    vector=query_embedding,
+                    top_k=top_k,
+                    include_metadata=True,
+                    filter=metadata_filter,
+                )
+            return self.index.query(
+                vector=query_embedding, top_k=top_k, include_metadata=True
+            )
+
+    def _hybrid_search(self, query: str, query_embedding, k: int, metadata_filter=None):
+        """Fuse vector and BM25 rankings with Reciprocal Rank Fusion.
+
+        The filter is pushed down into the vector query. BM25 has no metadata,
+        so lexical candidates are checked against the filter after fetching
+        their metadata from the vector store.
+
+        Both rankings are by snippet: vector matches are collapsed to their
+        parent, and the BM25 index holds whole snippets under the parent id
+        (which is also the id of the first chunk).
+        """
+        candidates = max(k * self.HYBRID_CANDIDATES_PER_RESULT, 10)
+
+        results = self._query(
+            query_embedding,
+            candidates * self.CHUNK_CANDIDATES_PER_RESULT,
+            metadata_filter,
+        )
+        matches = self._collapse(results.matches)[:candidates]
+        metadata = {
+            match.metadata.get("parent_id", match.id): match.metadata
+            for match in matches
+        }
+        vector_ranking = list(metadata)
+        with metrics.span("lexical_query"):
+            lexical_ranking = [
+                doc_id for doc_id, _ in self.lexical.search(query, k=candidates)
+            ]
+
+        # Lexical-only hits: read their stored text from the vector store
+        to_fetch = lexical_ranking if metadata_filter else []
+        missing = [doc_id for doc_id in to_fetch if doc_id not in metadata]
+        if missing:
+            self._fetch_metadata(missing, metadata)
+            lexical_ranking = [
+                doc_id
+                for doc_id in lexical_ranking
+                if doc_id in metadata and matches_filter(metadata[doc_id], metadata_filter)
+            ]
+
+        fused = reciprocal_rank_fusion(vector_ranking, lexical_ranking)[:k]
+
+        missing = [doc_id for doc_id, _ in fused if doc_id not in metadata]
+        if missing:
+            self._fetch_metadata(missing, metadata)
+
+        documents = []
+        for doc_id, score in fused:
+            if doc_id not in metadata:
+                continue
+            doc_metadata = dict(metadata[doc_id])
+            doc_metadata["fusion_score"] = score
+            documents.append(
+                Document(
+                    page_content=doc_metadata.get("text", ""), metadata=doc_metadata
+                )
+            )
+
+        return documents
+
+    def _fetch_metadata(self, ids, metadata):
+        fetched = self.index.fetch(ids).vectors
+        for doc_id, vector in fetched.items():
+            metadata[doc_id] = vector.metadata or {}
+
     def get_similar_scores(self, query: str, k: int = 3):
         """Get similarity scores along with documents.
 
@@ -105,11 +256,13 @@ class CustomPineconeRetriever:
         """
         query_embedding = self.embeddings.embed_query(query)
         results = self.index.query(
-            vector=query_embedding, top_k=k, include_metadata=True
+            vector=query_embedding,
+            top_k=k * self.CHUNK_CANDIDATES_PER_RESULT,
+            include_metadata=True,
         )
 
         documents_with_scores = []
-        for match in results.matches:
+        for match in self._collapse(results.matches)[:k]:
             doc = Document(
                 page_content=match.metadata.get("text", ""), metadata=match.metadata
             )
@@ -130,10 +283,11 @@ class ReactCodeAssistant:
     and responsive design patterns.
 
     Attributes:
-        llm (ChatOpenAI): Primary language model for code generation
+        llm (ChatOpenAI): Language model for complex code generation requests
+        fast_llm (ChatOpenAI): Smaller, faster model for simple requests
         vision_llm (ChatOpenAI): Vision-enabled model for image analysis
-        index (Pinecone.Index): Pinecone vector database index for code examples
-        embeddings (OpenAIEmbeddings): OpenAI embeddings model for semantic search
+        index (PineconeVectorStore | LocalVectorStore): Vector store for code examples
+        embeddings (CachedEmbeddings): Cached OpenAI embeddings model for semantic search
         retriever (CustomPineconeRetriever): Custom retriever for relevant code context
         prompt_template (ChatPromptTemplate): Structured prompt template for code generation
 
@@ -170,13 +324,31 @@ class ReactCodeAssistant:
     """
 
     def __init__(self):
-        # Initialize LLMs with timeouts
+        from langchain_openai import (  # pylint: disable=import-outside-toplevel
+            ChatOpenAI,
+            OpenAIEmbeddings,
+        )
+
+        # Every OpenAI call goes through the shared keep-alive pool
+        openai_http = http_clients.httpx_client("openai")
+
+        # Initialize LLMs with timeouts: gpt-4o for complex requests, a
+        # smaller model for simple ones (see utils.model_router)
         self.llm = ChatOpenAI(
-            model="gpt-4o",
+            model=model_router.models["complex"],
             temperature=0.3,
             api_key=OPENAI_API_KEY,
             timeout=45,
             max_retries=1,
+            http_client=openai_http,
+        )
+        self.fast_llm = ChatOpenAI(
+            model=model_router.models["fast"],
+            temperature=0.3,
+            api_key=OPENAI_API_KEY,
+            timeout=MODEL_FAST_TIMEOUT,
+            max_retries=1,
+            http_client=openai_http,
         )
 
         # Initialize vision-enabled LLM
@@ -186,31 +358,27 @@ class ReactCodeAssistant:
             api_key=OPENAI_API_KEY,
             timeout=30,
             max_retries=1,
+            http_client=openai_http,
         )
 
-        # Initialize Pinecone
-        try:
-            pc = Pinecone(api_key=PINECONE_API_KEY)
-            self.index = pc.Index("ironhack-final-project")
-            print("✅ Pinecone initialized")
-        except PineconeException as e:
-            print(f"❌ Pinecone service error: {e}")
-            self.index = None
-        except (ValueError, TypeError) as e:
-            print(f"❌ Pinecone configuration error: {e}")
-            self.index = None
-        except Exception as e:  # pylint: disable=broad-exception-caught
-            print(f"❌ Unexpected Pinecone error: {e}")
-            self.index = None
+        # Shared vector store (Pinecone or local, see utils.pc_index)
+        self.index = vector_index
+        print(f"✅ Vector store attached ({VECTOR_STORE_BACKEND})")
 
-        # Initialize embeddings
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-ada-002", api_key=OPENAI_API_KEY
+        # Initialize embeddings, cached in memory and on disk across workers
+        self.embeddings = CachedEmbeddings(
+            OpenAIEmbeddings(
+                model="text-embedding-ada-002",
+                api_key=OPENAI_API_KEY,
+                http_client=openai_http,
+            )
         )
 
         # Initialize custom retriever
-        if self.index:
-            self.retriever = CustomPineconeRetriever(self.index, self.embeddings)
+        if self.index is not None:
+            self.retriever = CustomPineconeRetriever(
+                self.index, self.embeddings, lexical_index, RETRIEVER_MODE
+            )
         else:
             self.retriever = None
 
@@ -230,46 +398,259 @@ Always provide complete, working code that can be copy-pasted and used immediate
 Here are some related React code examples for reference:
 {context}
 
+Conversation so far (the request may refer to it):
+{history}
+
 User request: {question}"""
 
         self.prompt_template = ChatPromptTemplate.from_template(self.system_prompt)
+
+        # Shared pool for the concurrent image pipeline
+        self.executor = ThreadPoolExecutor(
+            max_workers=PIPELINE_MAX_WORKERS, thread_name_prefix="react-pipeline"
+        )
+
+        # Image analyses started at upload time, by image URL
+        self._pending_images = OrderedDict()
+        self._pending_lock = threading.Lock()
+
+        # Context token usage of the last prompt built by each thread
+        self._local = threading.local()
         print("✅ ReactCodeAssistant initialization complete")
 
+    def _retrieve(self, query: str, k: int = 2, query_embedding=None, filters=None):
+        """Retrieve context documents, returning None when retrieval is unavailable"""
+        if not self.retriever or not query:
+            return None
+        try:
+            with metrics.span("retrieve"):
+                return self.retriever.get_relevant_documents(
+                    query, k=k, query_embedding=query_embedding, filters=filters
+                )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Retriever error (continuing without context): {e}")
+            return None
+
+    @staticmethod
+    def _combine_input(user_input: str, image_description: str = None) -> str:
+        if image_description:
+            return f"{user_input}\n\nUI Analysis: {image_description}"
+        return user_input
+
+    def _check_cache(self, combined_input: str, bypass_cache: bool = False):
+        """Embed the request once and look it up in the semantic cache.
+
+        Returns:
+            tuple: (embedding, cached_reply), both None when the cache is off
+        """
+        if not SEMANTIC_CACHE_ENABLED or bypass_cache:
+            return None, None
+        try:
+            with metrics.span("embed_query"):
+                embedding = self.embeddings.embed_query(combined_input)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Semantic cache error (continuing without cache): {e}")
+            return None, None
+        with metrics.span("cache_lookup"):
+            return embedding, semantic_cache.lookup(embedding)
+
+    @staticmethod
+    def _record_tokens(prompt: str, reply: str, usage=None):
+        """Count LLM tokens, from the API usage when reported, else estimated"""
+        if usage:
+            prompt_tokens = usage.get("input_tokens", 0)
+            completion_tokens = usage.get("output_tokens", 0)
+        else:
+            prompt_tokens = token_counter.count(prompt)
+            completion_tokens = token_counter.count(reply)
+        metrics.inc("llm_tokens_total", prompt_tokens, kind="prompt")
+        metrics.inc("llm_tokens_total", completion_tokens, kind="completion")
+
+    def _route(self, user_input: str, image_description: str = None, history=None):
+        """Pick the model for a request by its complexity (see utils.model_router)"""
+        decision = model_router.route(user_input, image_description, history)
+        return decision, self.fast_llm if decision.route == "fast" else self.llm
+
+    def _build_prompt(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        user_input: str,
+        image_description: str = None,
+        documents=None,
+        query_embedding=None,
+        filters=None,
+        history=None,
+    ) -> str:
+        """Combine the user request with retrieved context into the final prompt.
+
+        The retrieved documents are packed into the context token budget (see
+        utils.context_packer); the usage report is kept for `context_usage`.
+        """
+        combined_input = self._combine_input(user_input, image_description)
+        self._local.context_usage = None
+
+        # Get relevant documents from Pinecone (with fallback), unless the
+        # caller already retrieved them
+        if documents is None:
+            documents = self._retrieve(
+                combined_input,
+                k=CONTEXT_CANDIDATES,
+                query_embedding=query_embedding,
+                filters=filters,
+            )
+
+        context = None
+        if documents:
+            with metrics.span("pack_context"):
+                packed = context_packer.pack(documents)
+            self._local.context_usage = packed.report
+            context = packed.text
+            print(
+                f"Retrieved context: {packed.report['tokens']}/"
+                f"{packed.report['budget']} tokens from "
+                f"{packed.report['blocks']} code blocks"
+            )
+        if not context:
+            context = "No context available"
+
+        # Create the prompt
+        return self.prompt_template.format(
+            context=context,
+            history=history or "No previous messages",
+            question=combined_input,
+        )
+
+    def context_usage(self):
+        """Context token report of the last prompt built on this thread.
+
+        Returns:
+            dict | None: tokens, budget, documents, blocks, duplicates, dropped,
+                truncated, tokenizer; None for cached replies or without context
+        """
+        return getattr(self._local, "context_usage", None)
+
     @traceable(run_type="chain", name="react_code_generation")
-    def generate_code(self, user_input: str, image_description: str = None) -> str:
-        """Generate React code based on user input and optional image description"""
+    def generate_code(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        user_input: str,
+        image_description: str = None,
+        documents=None,
+        bypass_cache: bool = False,
+        filters=None,
+        history=None,
+    ) -> str:
+        """Generate React code based on user input and optional image description.
+
+        `documents` can carry context already retrieved by
+        `analyze_image_with_context`, in which case retrieval is skipped.
+        Near-identical requests are answered from the semantic cache unless
+        `bypass_cache` is set. `filters` restricts retrieval by snippet metadata
+        and `history` is the session memory (see utils.session_memory); requests
+        with either skip the cache, whose entries ignore both.
+        """
+        self._local.context_usage = None
         try:
-            if image_description:
-                combined_input = f"{user_input}\n\nUI Analysis: {image_description}"
-            else:
-                combined_input = user_input
-
-            # Get relevant documents from Pinecone (with fallback)
-            context = ""
-            if self.retriever:
-                try:
-                    docs = self.retriever.get_relevant_documents(combined_input, k=2)
-                    context = "\n\n".join([doc.page_content for doc in docs])
-                    print(f"Retrieved context length: {len(context)} chars")
-                except Exception as e:  # pylint: disable=broad-exception-caught
-                    print(f"Retriever error (continuing without context): {e}")
-                    context = "No context available"
-            else:
-                context = "No context available"
-
-            # Create the prompt
-            prompt = self.prompt_template.format(
-                context=context, question=combined_input
+            query_embedding, cached_reply = self._check_cache(
+                self._combine_input(user_input, image_description),
+                bypass_cache or bool(filters) or bool(history),
+            )
+            if cached_reply is not None:
+                return cached_reply
+
+            prompt = self._build_prompt(
+                user_input,
+                image_description,
+                documents,
+                query_embedding,
+                filters,
+                history,
             )
 
-            # Generate response
-            response = self.llm.invoke([HumanMessage(content=prompt)])
+            # Generate response, with the model the request's complexity calls for
+            decision, llm = self._route(user_input, image_description, history)
+            start = time.perf_counter()
+            with metrics.span("llm"):
+                response = llm.invoke([HumanMessage(content=prompt)])
+            model_router.record(decision, time.perf_counter() - start)
+            self._record_tokens(
+                prompt, response.content, getattr(response, "usage_metadata", None)
+            )
+
+            if query_embedding is not None:
+                semantic_cache.add(query_embedding, response.content)
 
             return response.content
 
         except Exception as e:  # pylint: disable=broad-exception-caught
             return f"I apologize, but I encountered an error generating the code: {str(e)}. Please try with a simpler request."  # pylint: disable=line-too-long
 
+    @traceable(run_type="chain", name="react_code_generation_stream")
+    def stream_code(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        user_input: str,
+        image_description: str = None,
+        documents=None,
+        bypass_cache: bool = False,
+        filters=None,
+        history=None,
+    ):
+        """Stream React code token by token as the model produces it.
+
+        Same prompt and retrieval as `generate_code`, but the LLM is called with
+        `stream` so callers can forward each chunk to the client immediately.
+
+        Args:
+            user_input (str): The user request
+            image_description (str, optional): Vision analysis of a UI mockup
+            documents (list[Document], optional): Context retrieved beforehand
+            bypass_cache (bool, optional): Skip the semantic cache. Defaults to False.
+            filters (dict, optional): Metadata filters for retrieval
+            history (str, optional): Rendered session memory
+
+        Yields:
+            str: Text chunks of the generated answer, in order
+
+        Raises:
+            Exception: If the LLM call fails, also mid-stream, so the caller
+                can report the error instead of saving it as the reply
+        """
+        self._local.context_usage = None
+        query_embedding, cached_reply = self._check_cache(
+            self._combine_input(user_input, image_description),
+            bypass_cache or bool(filters) or bool(history),
+        )
+        if cached_reply is not None:
+            yield cached_reply
+            return
+
+        prompt = self._build_prompt(
+            user_input,
+            image_description,
+            documents,
+            query_embedding,
+            filters,
+            history,
+        )
+
+        decision, llm = self._route(user_input, image_description, history)
+        chunks = []
+        usage = None
+        start = time.perf_counter()
+        with metrics.span("llm"):
+            for chunk in llm.stream([HumanMessage(content=prompt)]):
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                if chunk.content:
+                    if not chunks:
+                        metrics.observe(
+                            "llm_first_token", time.perf_counter() - start
+                        )
+                    chunks.append(chunk.content)
+                    yield chunk.content
+        model_router.record(decision, time.perf_counter() - start)
+        self._record_tokens(prompt, "".join(chunks), usage)
+
+        if query_embedding is not None:
+            semantic_cache.add(query_embedding, "".join(chunks))
+
     @traceable(run_type="llm", name="image_analysis")
     def analyze_image(self, base64_image: str) -> str:
         """Analyze UI mockup image and return description"""
@@ -295,13 +676,181 @@ User request: {question}"""
             print(f"❌ Vision API error: {str(e)}")
             raise e
 
+    @traceable(run_type="chain", name="image_pipeline")
+    def analyze_image_with_context(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        user_input: str,
+        load_image,
+        merge_image_context: bool = True,
+        k: int = CONTEXT_CANDIDATES,
+        filters=None,
+    ):
+        """Run image analysis and text retrieval concurrently.
+
+        The image download and vision call do not depend on the retrieval for the
+        user's text, so both run side by side on the shared executor. Once the
+        vision result is back, documents retrieved from the image description
+        are optionally merged in.
+
+        Args:
+            user_input (str): The user's text request (may be empty)
+            load_image (callable): Returns the raw image bytes when called
+            merge_image_context (bool, optional): Also retrieve on the image
+                description and merge the results. Defaults to True.
+            k (int, optional): Number of context documents to keep, before token
+                packing. Defaults to CONTEXT_CANDIDATES.
+            filters (dict, optional): Metadata filters for retrieval
+
+        Returns:
+            tuple: (image_description, documents) where `documents` is None when
+                nothing could be retrieved, so callers fall back to the default
+                retrieval on the combined input
+        """
+
+        def run_vision():
+            try:
+                image_data = load_image()
+            except Exception as image_error:  # pylint: disable=broad-exception-caught
+                print("Error: " + str(image_error))
+                return "Image processing failed"
+            try:
+                return self.describe_image(image_data)
+            except Exception:  # pylint: disable=broad-exception-caught
+                return "Image analysis failed"
+
+        vision_future = self.executor.submit(run_vision)
+        text_docs = self._retrieve(user_input, k=k, filters=filters)
+        image_description = vision_future.result()
+
+        image_docs = None
+        if merge_image_context and "failed" not in image_description.lower():
+            image_docs = self._retrieve(image_description, k=k, filters=filters)
+
+        if text_docs is None and image_docs is None:
+            return image_description, None
+
+        # Interleave both result lists, dropping duplicates
+        documents, seen = [], set()
+        for pair in zip_longest(text_docs or [], image_docs or []):
+            for doc in pair:
+                if doc is not None and doc.page_content not in seen:
+                    seen.add(doc.page_content)
+                    documents.append(doc)
+
+        return image_description, documents[:k]
+
+    def describe_image(
+        self,
+        image_data: bytes,
+        use_cache: bool = True,
+        image_url: str = None,
+        public_id: str = None,
+    ) -> str:
+        """Describe a UI mockup, reusing the analysis of identical images.
+
+        Looks the image up in the vision cache (exact bytes, then perceptual hash)
+        and only calls `analyze_image` on a miss, storing the new description.
+
+        Args:
+            image_data (bytes): Raw image bytes
+            use_cache (bool, optional): Read and write the vision cache. Defaults to True.
+            image_url (str, optional): Hosted URL of the image, so the description
+                can later be found by URL
+            public_id (str, optional): Cloudinary public identifier of the image
+
+        Returns:
+            str: Description of the UI for code generation
+
+        Raises:
+            Exception: If the vision API call fails
+        """
+        use_cache = use_cache and VISION_CACHE_ENABLED
+        if use_cache:
+            cached = vision_cache.lookup(image_data)
+            if cached is not None:
+                if image_url:
+                    vision_cache.store(image_data, cached, image_url, public_id)
+                return cached
+
+        with metrics.span("image_analysis"):
+            description = self.analyze_image(base64.b64encode(image_data).decode("utf-8"))
+
+        if use_cache:
+            vision_cache.store(image_data, description, image_url, public_id)
+        return description
+
+    def prefetch_image_description(
+        self, image_data: bytes, image_url: str, public_id: str = None
+    ):
+        """Start analyzing an uploaded image in the background.
+
+        The upload route already holds the image bytes, so the vision call can
+        start right away instead of waiting for the chat request to download the
+        image again. The result is picked up by `pending_image_description`.
+
+        Args:
+            image_data (bytes): Raw image bytes
+            image_url (str): URL the image was uploaded to
+            public_id (str, optional): Cloudinary public identifier of the image
+
+        Returns:
+            Future: Resolves to the image description
+        """
+        future = self.executor.submit(
+            self.describe_image, image_data, True, image_url, public_id
+        )
+        with self._pending_lock:
+            self._pending_images[image_url] = future
+            # Bound memory: forget the oldest analyses nobody asked for
+            while len(self._pending_images) > 256:
+                self._pending_images.popitem(last=False)
+        return future
+
+    def pending_image_description(self, image_url: str):
+        """Return the description computed (or computing) since upload, if any.
+
+        Waits for an analysis still in flight in this worker, then falls back to
+        descriptions another worker stored for the same URL.
+
+        Args:
+            image_url (str): URL returned by the upload route
+
+        Returns:
+            str | None: The description, or None if the image was never analyzed
+        """
+        with self._pending_lock:
+            future = self._pending_images.pop(image_url, None)
+
+        if future is not None:
+            try:
+                return future.result(timeout=VISION_PENDING_TIMEOUT)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"Upload-time image analysis unavailable: {e}")
+                return None
+
+        if VISION_CACHE_ENABLED:
+            return vision_cache.lookup_url(image_url)
+        return None
+
     @traceable(run_type="retriever", name="similarity_search")
-    def search_similar_code(self, query: str, k: int = 3):
-        """Search for similar React code snippets"""
+    def search_similar_code(self, query: str, k: int = 3, filters=None):
+        """Search for similar React code snippets.
+
+        Args:
+            query (str): The search query
+            k (int, optional): Maximum number of results. Defaults to 3.
+            filters (dict, optional): Metadata filters pushed down into the vector
+                query, e.g. {"recommended": True, "tags": ["form"]}
+
+        Returns:
+            list[Document]: Matching snippets
+        """
         if self.retriever:
-            return self.retriever.get_relevant_documents(query, k)
+            return self.retriever.get_relevant_documents(query, k, filters=filters)
         return []
 
 
-# Create global instance
-react_assistant = ReactCodeAssistant()
+# Create global instance (built on first use, see utils.services)
+react_assistant = services.register(
+    "react_assistant", ReactCodeAssistant, imports=("langchain_openai",)
+)
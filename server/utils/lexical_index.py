@@ -0,0 +1,314 @@
+"""Lexical (BM25) index over the code snippets collection.
+
+Dense retrieval alone misses exact identifier matches that matter a lot for
+code, like "useReducer" or "Headless UI Dialog". This module keeps an in-memory
+inverted index over `snippets_col` with a code-aware tokenizer, scored with
+Okapi BM25. `CustomPineconeRetriever` fuses its results with the vector results
+when RETRIEVER_MODE is "hybrid".
+
+Tokenizer:
+    - Identifiers are kept whole and split on camelCase / PascalCase / digits:
+      "useReducer" -> ["usereducer", "use", "reducer"]
+    - JSX tags also produce a tag token: "<Dialog.Panel>" -> ["<dialog.panel", ...]
+    - Everything is lowercased; common English words are dropped
+
+Index maintenance:
+    Each worker builds its index in a background thread, started by gunicorn's
+    `post_worker_init` in hybrid mode or by the first search; searches return
+    nothing until it is built, so hybrid retrieval falls back to vectors alone
+    meanwhile. The thread then keeps it up to date every LEXICAL_SYNC_INTERVAL
+    seconds: it pulls snippets written by other workers (by `updated_at`) and
+    replays the deletion log (`snippet_deletions`), so snippets removed by
+    another process (e.g. near-duplicate compaction) stop being returned.
+    Both are read from LEXICAL_SYNC_LOOKBACK seconds before the newest
+    timestamp already seen, so a write that commits after a newer one was
+    synced is still picked up; snippets already indexed at the same
+    `updated_at` are not tokenized again. Timestamps are UTC.
+    `add()` is also called right away by add-snippet and the ingestion
+    pipeline, and `delete()` removes snippets here and logs them for the
+    other workers.
+
+Usage:
+    from utils.lexical_index import lexical_index
+
+    lexical_index.start()               # Build in the background
+    lexical_index.add(snippet_id, text)
+    lexical_index.delete([snippet_id])  # Also in every other worker
+    lexical_index.search("useReducer todo list", k=10)
+    # [("66b1...", 12.7), ("66b2...", 9.3), ...]
+"""
+
+import os
+import re
+import math
+import time
+import heapq
+import datetime
+import threading
+from collections import Counter, defaultdict
+from pymongo.errors import PyMongoError
+from utils.connect_db import snippets_col, snippet_deletions_col
+from utils.consts import LEXICAL_SYNC_INTERVAL, LEXICAL_SYNC_LOOKBACK
+
+_WORD_RE = re.compile(r"[A-Za-z_$][A-Za-z0-9_$]*|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_JSX_TAG_RE = re.compile(r"</?([A-Za-z][\w.]*)")
+
+STOPWORDS = frozenset(
+    """a an and are as at be by for from has have in is it its of on or that the
+    this to was were will with you your we our can use""".split()
+)
+
+
+def tokenize_code(text: str):
+    """Split text into lexical tokens, aware of identifiers and JSX tags.
+
+    Args:
+        text (str): Code or natural language
+
+    Returns:
+        list[str]: Lowercased tokens, repeated as often as they occur
+    """
+    tokens = [f"<{tag.lower()}" for tag in _JSX_TAG_RE.findall(text)]
+
+    for word in _WORD_RE.findall(text):
+        lower = word.lower()
+        if lower not in STOPWORDS:
+            tokens.append(lower)
+
+        parts = _CAMEL_RE.findall(word)
+        if len(parts) > 1:
+            tokens.extend(
+                part.lower() for part in parts if part.lower() not in STOPWORDS
+            )
+
+    return tokens
+
+
+class LexicalIndex:  # pylint: disable=too-many-instance-attributes
+    """Incrementally updatable BM25 inverted index keyed by snippet id"""
+
+    def __init__(
+        self,
+        collection=None,
+        deletions=None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        sync_interval: float = LEXICAL_SYNC_INTERVAL,
+        lookback: float = LEXICAL_SYNC_LOOKBACK,
+    ):
+        self.collection = collection
+        self.deletions = deletions
+        self.k1 = k1
+        self.b = b
+        self.sync_interval = sync_interval
+        self.lookback = datetime.timedelta(seconds=lookback)
+
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)  # term -> {doc_id: term frequency}
+        self._doc_terms = {}  # doc_id -> Counter of terms
+        self._doc_lengths = {}  # doc_id -> number of tokens
+        self._total_length = 0
+
+        self._built = threading.Event()
+        # Sync cursors: newest `updated_at` seen, and the `updated_at` of the
+        # snippets indexed within the lookback window; newest `deleted_at`
+        self._synced_at, self._recent = None, {}
+        self._deletions_at = None
+        self._thread = None
+        self._pid = os.getpid()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def add(self, doc_id: str, text: str):
+        """Index (or re-index) one document"""
+        terms = Counter(tokenize_code(text))
+        with self._lock:
+            self._remove(doc_id)
+            self._doc_terms[doc_id] = terms
+            self._doc_lengths[doc_id] = sum(terms.values())
+            self._total_length += self._doc_lengths[doc_id]
+            for term, freq in terms.items():
+                self._postings[term][doc_id] = freq
+
+    def _remove(self, doc_id):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def remove(self, doc_id: str):
+        """Drop one document from this worker's index"""
+        with self._lock:
+            self._remove(doc_id)
+
+    def delete(self, doc_ids):
+        """Drop documents here and log them, so every worker drops them at its next sync"""
+        doc_ids = [str(doc_id) for doc_id in doc_ids]
+        for doc_id in doc_ids:
+            self.remove(doc_id)
+        if self.deletions is None or not doc_ids:
+            return
+        now = datetime.datetime.utcnow()
+        try:
+            for start in range(0, len(doc_ids), 1000):
+                self.deletions.insert_many(
+                    [
+                        {"snippet_id": doc_id, "deleted_at": now}
+                        for doc_id in doc_ids[start : start + 1000]
+                    ],
+                    ordered=False,
+                )
+        except PyMongoError as e:
+            print(f"Lexical index deletion log error: {e}")
+
+    def start(self):
+        """Build the index and keep it in sync in a background thread (once per process)"""
+        if self.collection is None:
+            return
+        if self._pid != os.getpid():
+            # Forked: the parent's thread, and any lock it held, did not come along
+            self._lock = threading.RLock()
+            self._pid, self._thread = os.getpid(), None
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="lexical-index-sync", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"Lexical index sync error: {e}")
+            time.sleep(self.sync_interval)
+
+    def sync(self):
+        """Load snippets written, and drop snippets deleted, since the last sync.
+
+        The first call builds the whole index. MongoDB is read without the
+        index lock, so searches go on meanwhile.
+        """
+        if self.collection is None:
+            return
+        try:
+            self._pull()
+            if self.deletions is not None:
+                self._pull_deletions()
+        except PyMongoError as e:
+            print(f"Lexical index sync error: {e}")
+            return
+        if not self._built.is_set():
+            print(f"✅ Lexical index built: {len(self)} snippets")
+            self._built.set()
+
+    def _since(self, field, synced_at):
+        # Read back `lookback` before the cursor: later commits of older writes
+        if synced_at is None:
+            return {}
+        return {field: {"$gte": synced_at - self.lookback}}
+
+    def _pull(self):
+        latest, recent = self._synced_at, dict(self._recent)
+        query = self._since("updated_at", self._synced_at)
+        for doc in self.collection.find(query, {"text": 1, "updated_at": 1}):
+            doc_id = str(doc["_id"])
+            updated_at = doc.get("updated_at")
+            if updated_at is not None and recent.get(doc_id) == updated_at:
+                continue  # Already indexed at a previous sync
+            self.add(doc_id, doc.get("text", ""))
+            if updated_at is None:
+                continue
+            recent[doc_id] = updated_at
+            if latest is None or updated_at > latest:
+                latest = updated_at
+        if latest is not None:
+            horizon = latest - self.lookback
+            recent = {
+                doc_id: updated_at
+                for doc_id, updated_at in recent.items()
+                if updated_at >= horizon
+            }
+        self._synced_at, self._recent = latest, recent
+
+    def _pull_deletions(self):
+        # Removing twice is harmless, so entries in the lookback are just replayed
+        latest = self._deletions_at
+        query = self._since("deleted_at", self._deletions_at)
+        for doc in self.deletions.find(query, {"snippet_id": 1, "deleted_at": 1}):
+            self.remove(doc["snippet_id"])
+            if latest is None or doc["deleted_at"] > latest:
+                latest = doc["deleted_at"]
+        self._deletions_at = latest
+
+    def search(self, query: str, k: int = 10):
+        """Return the k best documents for `query` by BM25 score.
+
+        Terms present in more than half of the documents carry almost no
+        signal and are skipped (unless nothing else is left), which keeps
+        queries in the low milliseconds even for frequent words like "react".
+        Returns nothing until the index is built (see `start`).
+
+        Args:
+            query (str): Search text
+            k (int, optional): Number of results. Defaults to 10.
+
+        Returns:
+            list[tuple[str, float]]: (doc_id, score) pairs, best first
+        """
+        self.start()
+        if not self._built.is_set():
+            return []
+
+        with self._lock:
+            total_docs = len(self._doc_terms)
+            if not total_docs:
+                return []
+            avg_length = self._total_length / total_docs
+
+            terms = [t for t in set(tokenize_code(query)) if t in self._postings]
+            selective = [t for t in terms if len(self._postings[t]) <= total_docs / 2]
+            terms = selective or terms
+
+            scores = defaultdict(float)
+            for term in terms:
+                postings = self._postings[term]
+                df = len(postings)
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                for doc_id, freq in postings.items():
+                    length = self._doc_lengths[doc_id]
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] += idf * freq * (self.k1 + 1) / (freq + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(*rankings, k: int = 60):
+    """Fuse ranked id lists with Reciprocal Rank Fusion.
+
+    Args:
+        *rankings (list[str]): Lists of ids, best first
+        k (int, optional): RRF damping constant. Defaults to 60.
+
+    Returns:
+        list[tuple[str, float]]: (id, fused score) pairs, best first
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+# Create global instance
+lexical_index = LexicalIndex(snippets_col, snippet_deletions_col)
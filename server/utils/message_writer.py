@@ -0,0 +1,294 @@
+"""Write-behind persistence of chat messages.
+
+`MessageWriter` persists the messages saved by `chat()` (the user message
+before generation, the reply after it) off the request path, so MongoDB latency
+and errors do not reach the chat response:
+
+    - `save(doc)` gives the message its `_id` (an ObjectId generated locally,
+      so the response is unchanged) and puts it on a bounded in-process queue
+    - One background thread drains the queue with `insert_many`, in order, so
+      the messages of a session are written in the order they were saved
+    - Failed batches are retried with backoff; the pre-generated ids make
+      retries idempotent (a duplicate key means the message is already stored).
+      A batch that still fails is kept and retried before anything newer is
+      written, so the queue fills up and saves fall back to writing inline
+    - When the queue is full, `save` waits for room (backpressure), and after
+      MESSAGE_FLUSH_TIMEOUT writes synchronously instead; nothing is dropped
+
+Reads that must see every message of a session (history, memory, deletion)
+call `wait_for(session_id)` first, which returns as soon as that session has
+nothing left in the queue. The queue is flushed at interpreter exit.
+
+Usage:
+    from utils.message_writer import message_writer
+
+    message_id = message_writer.save({"session_id": sid, "role": "user", ...})
+    message_writer.wait_for(sid)     # Before reading the session back
+    message_writer.stats()
+    # {"mode": "async", "queued": 0, "written": 120, "batches": 31, ...}
+
+Configuration:
+    - MESSAGE_WRITE_MODE: "async" (write-behind) or "sync" (`insert_one`
+      before `save` returns) (default: async)
+    - MESSAGE_QUEUE_SIZE: Messages waiting to be written before saves block
+      (default: 1000)
+    - MESSAGE_BATCH_SIZE: Messages per insert_many (default: 100)
+    - MESSAGE_FLUSH_INTERVAL: Seconds the writer waits to fill a batch
+      (default: 0.05)
+    - MESSAGE_FLUSH_TIMEOUT: Seconds reads and shutdown wait for pending
+      writes (default: 5)
+"""
+
+import os
+import time
+import queue
+import atexit
+import threading
+from collections import defaultdict
+from bson import ObjectId
+from pymongo.errors import PyMongoError, BulkWriteError
+from utils.connect_db import messages_col
+from utils.consts import (
+    MESSAGE_WRITE_MODE,
+    MESSAGE_QUEUE_SIZE,
+    MESSAGE_BATCH_SIZE,
+    MESSAGE_FLUSH_INTERVAL,
+    MESSAGE_FLUSH_TIMEOUT,
+)
+
+DUPLICATE_KEY = 11000
+
+# Retries of a failed batch, and the first backoff delay in seconds
+WRITE_RETRIES = 3
+RETRY_BACKOFF = 0.5
+# Seconds between two rounds of retries of a batch kept after failing
+HELD_RETRY_INTERVAL = 5.0
+
+_STOP = object()
+
+
+class MessageWriter:  # pylint: disable=too-many-instance-attributes
+    """Bounded write-behind queue in front of a MongoDB collection"""
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        collection,
+        mode: str = MESSAGE_WRITE_MODE,
+        max_queue: int = MESSAGE_QUEUE_SIZE,
+        batch_size: int = MESSAGE_BATCH_SIZE,
+        flush_interval: float = MESSAGE_FLUSH_INTERVAL,
+        flush_timeout: float = MESSAGE_FLUSH_TIMEOUT,
+    ):
+        self.collection = collection
+        self.mode = mode
+        self.max_queue = max_queue
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.flush_timeout = flush_timeout
+
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = defaultdict(int)  # session id -> messages not yet written
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed = 0
+        self.sync_writes = 0
+
+    def _start(self):
+        """Queue and writer thread, one per process: threads do not survive a fork"""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue(self.max_queue)
+                self._pending = defaultdict(int)
+                self._thread = threading.Thread(
+                    target=self._run, name="message-writer", daemon=True
+                )
+                self._thread.start()
+                self._pid = os.getpid()
+            return self._queue
+
+    def save(self, doc: dict) -> ObjectId:
+        """Persist a message, in the background unless in sync mode.
+
+        Args:
+            doc (dict): Message document; `_id` is set if missing
+
+        Returns:
+            ObjectId: The message id, usable before the write completes
+
+        Raises:
+            PyMongoError: Only for synchronous writes
+        """
+        doc.setdefault("_id", ObjectId())
+        if self.mode == "sync":
+            self._insert_now(doc)
+            return doc["_id"]
+
+        messages = self._start()
+        session_id = doc.get("session_id")
+        with self._lock:
+            self._pending[session_id] += 1
+        try:
+            # Backpressure: a full queue slows saves down
+            messages.put(doc, timeout=self.flush_timeout)
+        except queue.Full:
+            # Still full: write inline rather than drop, after the session's
+            # queued messages so its order is kept
+            self._done([doc])
+            self.wait_for(session_id)
+            self._insert_now(doc)
+        return doc["_id"]
+
+    def _insert_now(self, doc):
+        self.collection.insert_one(doc)
+        with self._lock:
+            self.sync_writes += 1
+            self.written += 1
+
+    def _run(self):
+        messages = self._queue
+        held = []  # Messages whose batch failed, written before any newer one
+        while True:
+            if held:
+                # New messages wait in the queue (and fill it) meanwhile
+                time.sleep(HELD_RETRY_INTERVAL)
+                held = self._write_and_release(held)
+                continue
+
+            doc = messages.get()
+            if doc is _STOP:
+                return
+
+            # Give concurrent saves a moment to join this batch
+            batch = [doc]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    doc = messages.get(timeout=timeout) if timeout > 0 else messages.get_nowait()
+                except queue.Empty:
+                    break
+                if doc is _STOP:
+                    stop = True
+                    break
+                batch.append(doc)
+
+            held = self._write_and_release(batch)
+            if stop:
+                return
+
+    def _write_and_release(self, batch):
+        """Write a batch and return the messages that could not be written"""
+        remaining = self._write(batch)
+        self._done(batch[: len(batch) - len(remaining)])
+        return remaining
+
+    def _write(self, batch):
+        """insert_many with retries; duplicates are messages already stored.
+
+        Returns:
+            list: The messages still unwritten after the last retry
+        """
+        remaining = batch
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                self.collection.insert_many(remaining, ordered=True)
+                with self._lock:
+                    self.written += len(remaining)
+                    self.batches += 1
+                return []
+            except BulkWriteError as e:
+                inserted = e.details.get("nInserted", 0)
+                errors = e.details.get("writeErrors", [])
+                if errors and errors[0].get("code") == DUPLICATE_KEY:
+                    inserted += 1
+                with self._lock:
+                    self.written += inserted
+                remaining = remaining[inserted:]
+                if not remaining:
+                    return []
+                error = e
+            except PyMongoError as e:
+                error = e
+
+            if attempt < WRITE_RETRIES:
+                with self._lock:
+                    self.retries += 1
+                time.sleep(RETRY_BACKOFF * 2**attempt)
+
+        print(
+            f"❌ Message write failed, keeping {len(remaining)} messages "
+            f"to retry in {HELD_RETRY_INTERVAL:g}s: {error}"
+        )
+        with self._lock:
+            self.failed += 1
+        return remaining
+
+    def _done(self, batch):
+        with self._lock:
+            for doc in batch:
+                session_id = doc.get("session_id")
+                self._pending[session_id] -= 1
+                if self._pending[session_id] <= 0:
+                    del self._pending[session_id]
+            self._idle.notify_all()
+
+    def wait_for(self, session_id=None, timeout: float = None) -> bool:
+        """Wait until the queued messages of a session (or all of them) are written.
+
+        Returns:
+            bool: False if messages were still pending after the timeout
+        """
+        timeout = self.flush_timeout if timeout is None else timeout
+        with self._lock:
+            if self._pid != os.getpid():
+                return True
+            return self._idle.wait_for(
+                lambda: (session_id not in self._pending)
+                if session_id is not None
+                else not self._pending,
+                timeout,
+            )
+
+    def close(self):
+        """Flush the queue and stop the writer thread (called at exit)"""
+        with self._lock:
+            running = self._thread is not None and self._pid == os.getpid()
+        if not running:
+            return
+        if not self.wait_for(timeout=self.flush_timeout):
+            print("❌ Message writer stopped with messages still queued")
+        try:
+            self._queue.put(_STOP, timeout=self.flush_timeout)
+        except queue.Full:
+            return
+        self._thread.join(self.flush_timeout)
+
+    def stats(self):
+        """Return queue and write counters.
+
+        Returns:
+            dict: mode, queued, written, batches, retries, sync_writes and
+                failed (batches kept for later after exhausting their retries)
+        """
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "queued": sum(self._pending.values()),
+                "written": self.written,
+                "batches": self.batches,
+                "retries": self.retries,
+                "failed": self.failed,
+                "sync_writes": self.sync_writes,
+            }
+
+
+# Create global instance
+message_writer = MessageWriter(messages_col)
+atexit.register(message_writer.close)
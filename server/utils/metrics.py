@@ -0,0 +1,255 @@
+"""In-process latency and counter metrics, exported in Prometheus format.
+
+A `new-chat` request goes through several slow stages (image download, vision,
+embedding, vector query, LLM, MongoDB) and the only signals were `print` lines
+and LangSmith traces. `Metrics` records:
+
+    - Spans: `with metrics.span("retrieve"):` times a stage. Durations are kept
+      per stage in a window of the last METRICS_WINDOW samples, exported as a
+      summary (p50, p95, p99, plus sum and count since start); a span left by
+      an exception also counts an error for its stage
+    - Counters: `metrics.inc("http_requests_total", status=200)`
+    - Stats collectors: components that already keep counters (caches, the
+      message writer, HTTP pools) are read at scrape time, not duplicated
+
+`render()` produces the Prometheus text format served at `/api/metrics`.
+
+Stages:
+    chat: image_download, image_analysis, history, save_user_message,
+          generate, save_assistant_message
+    generation: cache_lookup, retrieve, embed_query, vector_query,
+                pack_context, llm, llm_first_token
+    populate: ingest_embed, ingest_store, ingest_upsert
+
+Metrics are kept per process: with several gunicorn workers, each scrape sees
+the worker that served it (label `pid`), so scrape every worker or aggregate
+with a sum in Prometheus.
+
+Usage:
+    from utils.metrics import metrics
+
+    with metrics.span("vector_query"):
+        matches = index.query(...)
+    metrics.inc("llm_tokens_total", 812, kind="completion")
+    metrics.register_stats("semantic_cache", semantic_cache.stats, counters=("hits",))
+    metrics.snapshot()["stages"]["vector_query"]
+    # {"count": 120, "sum": 9.8, "p50": 0.071, "p95": 0.152, "p99": 0.31}
+
+Configuration:
+    - METRICS_ENABLED: Record spans and counters (default: true)
+    - METRICS_PREFIX: Prefix of every metric name (default: react_codegen)
+    - METRICS_WINDOW: Samples per stage the quantiles are computed on
+      (default: 1024)
+"""
+
+import os
+import math
+import time
+import threading
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from utils.consts import METRICS_ENABLED, METRICS_PREFIX, METRICS_WINDOW
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _quantile(ordered, q: float) -> float:
+    """Nearest-rank quantile of a sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(q * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Stage:
+    """Durations of one stage: a sliding window for quantiles, totals since start"""
+
+    __slots__ = ("window", "count", "total")
+
+    def __init__(self, size: int):
+        self.window = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+
+class Metrics:
+    """Stage timings, counters and stats collectors of this process"""
+
+    def __init__(
+        self,
+        enabled: bool = METRICS_ENABLED,
+        prefix: str = METRICS_PREFIX,
+        window: int = METRICS_WINDOW,
+    ):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.window = max(1, window)
+
+        self._stages = {}  # stage -> _Stage
+        self._counters = defaultdict(float)  # (name, sorted label items) -> value
+        self._collectors = {}  # name -> (stats function, counter keys, label)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        # A forked worker starts from zero, with a lock of its own
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._stages = {}
+            self._counters = defaultdict(float)
+            self._pid = os.getpid()
+
+    def reset(self):
+        """Forget every timing and counter (collectors stay registered)"""
+        with self._lock:
+            self._stages = {}
+            self._counters = defaultdict(float)
+
+    def observe(self, stage: str, seconds: float):
+        """Record one duration of `stage`"""
+        if not self.enabled:
+            return
+        self._check_fork()
+        with self._lock:
+            timings = self._stages.get(stage)
+            if timings is None:
+                timings = self._stages[stage] = _Stage(self.window)
+            timings.window.append(seconds)
+            timings.count += 1
+            timings.total += seconds
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time the enclosed block as `stage`; an exception also counts an error"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            if not isinstance(e, GeneratorExit):
+                self.inc("stage_errors_total", stage=stage)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add `value` to the counter `name` with these labels"""
+        if not self.enabled or not value:
+            return
+        self._check_fork()
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def register_stats(self, name: str, stats, counters=(), label: str = None):
+        """Export the numeric fields of `stats()` at scrape time.
+
+        Args:
+            name (str): Metric name prefix, e.g. "semantic_cache"
+            stats (callable): Returns a flat dict (may return {} when not ready)
+            counters (tuple[str], optional): Fields that only go up, exported
+                as `<name>_<field>_total` counters; the others are gauges
+            label (str, optional): `stats()` returns {value: {field: ...}}
+                instead, one series per value with this label (e.g. "upstream")
+        """
+        self._collectors[name] = (stats, set(counters), label)
+
+    def _collect(self):
+        """Copy the stage timings (window sorted) and counters under the lock"""
+        self._check_fork()
+        with self._lock:
+            stages = {
+                stage: (sorted(timings.window), timings.count, timings.total)
+                for stage, timings in self._stages.items()
+            }
+            return stages, dict(self._counters)
+
+    def snapshot(self):
+        """Return the current stage quantiles and counters.
+
+        Returns:
+            dict: {"stages": {stage: {count, sum, p50, p95, p99}},
+                "counters": {name{labels}: value}}
+        """
+        stages, counters = self._collect()
+
+        return {
+            "stages": {
+                stage: {
+                    "count": count,
+                    "sum": round(total, 6),
+                    **{
+                        f"p{int(q * 100)}": round(_quantile(ordered, q), 6)
+                        for q in QUANTILES
+                    },
+                }
+                for stage, (ordered, count, total) in stages.items()
+            },
+            "counters": {
+                f"{name}{_labels(dict(labels))}": value
+                for (name, labels), value in counters.items()
+            },
+        }
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        stages, counters = self._collect()
+        prefix = self.prefix
+        pid = {"pid": self._pid}
+        lines = []
+
+        name = f"{prefix}_stage_duration_seconds"
+        lines.append(f"# HELP {name} Duration of each stage (quantiles of recent samples)")
+        lines.append(f"# TYPE {name} summary")
+        for stage, (ordered, count, total) in sorted(stages.items()):
+            for q in QUANTILES:
+                labels = _labels({**pid, "stage": stage, "quantile": q})
+                lines.append(f"{name}{labels} {_quantile(ordered, q):.6f}")
+            lines.append(f"{name}_sum{_labels({**pid, 'stage': stage})} {total:.6f}")
+            lines.append(f"{name}_count{_labels({**pid, 'stage': stage})} {count}")
+
+        by_name = defaultdict(list)
+        for (counter, labels), value in counters.items():
+            by_name[counter].append((dict(labels), value))
+        for counter, series in sorted(by_name.items()):
+            lines.append(f"# TYPE {prefix}_{counter} counter")
+            for labels, value in series:
+                lines.append(f"{prefix}_{counter}{_labels({**pid, **labels})} {value:g}")
+
+        for collector, (stats, counter_keys, label) in sorted(self._collectors.items()):
+            try:
+                values = stats() or {}
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"Metrics collector {collector} failed: {e}")
+                continue
+            groups = values.items() if label else [(None, values)]
+
+            series = defaultdict(list)  # field -> [(labels, value)]
+            for group, fields in groups:
+                labels = {**pid, label: group} if label else pid
+                for field, value in fields.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        series[field].append((labels, value))
+            for field, points in sorted(series.items()):
+                if field in counter_keys:
+                    metric, kind = f"{prefix}_{collector}_{field}_total", "counter"
+                else:
+                    metric, kind = f"{prefix}_{collector}_{field}", "gauge"
+                lines.append(f"# TYPE {metric} {kind}")
+                for labels, value in points:
+                    lines.append(f"{metric}{_labels(labels)} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Create global instance
+metrics = Metrics()
@@ -0,0 +1,234 @@
+"""Complexity-based routing between a fast model and gpt-4o.
+
+`ModelRouter` scores each request with cheap local features, before any LLM
+call, and sends simple requests ("make a red button") to a smaller, faster
+model, keeping gpt-4o for complex ones:
+
+    - length: tokens of the request, one point per 40 tokens (at most 3)
+    - image: the request comes with a UI mockup description
+    - components: distinct UI components mentioned ("navbar", "modal",
+      `UserProfile`...) beyond the first (at most 4)
+    - follow_up: the session already has messages (the earlier code must be
+      reworked consistently)
+    - functionality: demanding features asked for ("drag and drop",
+      "pagination", "api", "validation"...) (at most 3)
+
+The score is the weighted sum of the features; requests scoring at least
+MODEL_ROUTE_THRESHOLD go to the complex model. A mockup alone reaches the
+default threshold.
+
+Each decision is logged with its features and the latency of the call, and the
+LLM latency is recorded per route (stage `llm:<route>` in utils.metrics).
+
+Usage:
+    from utils.model_router import model_router
+
+    decision = model_router.route("Make a red button")
+    # RouteDecision(route="fast", model="gpt-4o-mini", score=0, features={...})
+    ...call the model of decision.route...
+    model_router.record(decision, seconds)
+    model_router.stats()
+    # {"fast": {"model": "gpt-4o-mini", "requests": 12, "share": 0.6,
+    #           "average_ms": 2310.4}, "complex": {...}}
+
+Configuration:
+    - MODEL_ROUTING_ENABLED: Route by complexity; when off every request goes
+      to the complex model (default: true)
+    - MODEL_ROUTE_FAST: Model for simple requests (default: gpt-4o-mini)
+    - MODEL_ROUTE_COMPLEX: Model for complex requests (default: gpt-4o)
+    - MODEL_ROUTE_THRESHOLD: Score from which a request is complex (default: 3)
+    - MODEL_ROUTE_WEIGHTS: Feature weight overrides, e.g. "image=2,follow_up=0"
+      (defaults: length=1, image=3, components=1, follow_up=1,
+      functionality=1)
+    - MODEL_ROUTE_FORCE: "fast" or "complex" sends every request to that route
+    - MODEL_FAST_TIMEOUT: Seconds before the fast model times out (default: 20)
+"""
+
+import re
+import threading
+from collections import namedtuple
+from utils.context_packer import token_counter
+from utils.metrics import metrics
+from utils.consts import (
+    MODEL_ROUTING_ENABLED,
+    MODEL_ROUTE_FAST,
+    MODEL_ROUTE_COMPLEX,
+    MODEL_ROUTE_THRESHOLD,
+    MODEL_ROUTE_WEIGHTS,
+    MODEL_ROUTE_FORCE,
+)
+
+ROUTES = ("fast", "complex")
+
+DEFAULT_WEIGHTS = {
+    "length": 1.0,
+    "image": 3.0,
+    "components": 1.0,
+    "follow_up": 1.0,
+    "functionality": 1.0,
+}
+
+# Tokens of request per length point, and the caps of the counted features
+TOKENS_PER_POINT = 40
+MAX_LENGTH_POINTS = 3
+MAX_EXTRA_COMPONENTS = 4
+MAX_FUNCTIONALITY = 3
+
+_COMPONENT_RE = re.compile(
+    r"\b(button|form|input|modal|dialog|navbar|nav|sidebar|header|footer|card|"
+    r"table|list|dropdown|menu|tabs?|accordion|carousel|slider|tooltip|toast|"
+    r"badge|avatar|chart|calendar|date ?picker|breadcrumbs?|stepper|search ?(?:bar|box)|"
+    r"select|checkbox|toggle|switch|progress ?bar|spinner|grid|dashboard|layout|"
+    r"page|pricing|hero|gallery|timeline|kanban|editor)s?\b",
+    re.I,
+)
+# Component names written as identifiers: UserProfile, TodoList
+_IDENTIFIER_RE = re.compile(r"\b[A-Z][a-z]+(?:[A-Z][a-z]+)+\b")
+
+_FUNCTIONALITY_RE = re.compile(
+    r"\b(api|fetch\w*|axios|websockets?|real[- ]?time|auth\w*|drag(?: and |&| ?n ?)drop|"
+    r"drag\w*|animat\w*|transitions?|infinite scroll\w*|virtuali[sz]\w*|"
+    r"paginat\w*|sort\w*|filter\w*|validat\w*|multi[- ]?step|wizard|redux|zustand|"
+    r"usecontext|usereducer|context api|router|routing|i18n|internationali[sz]\w*|optimistic|debounc\w*|"
+    r"undo|upload\w*|tests?|testing)\b",
+    re.I,
+)
+
+RouteDecision = namedtuple("RouteDecision", ["route", "model", "score", "features"])
+
+
+def _parse_weights(value: str):
+    """"image=2,follow_up=0" -> {"image": 2.0, "follow_up": 0.0}"""
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip().lower()
+        try:
+            weights[name] = float(weight)
+        except ValueError:
+            continue
+        if name not in DEFAULT_WEIGHTS:
+            print(f"Unknown routing feature ignored: {name}")
+            del weights[name]
+    return weights
+
+
+class _RouteStats:
+    """Requests and cumulative LLM time of one route"""
+
+    __slots__ = ("requests", "seconds")
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+
+
+class ModelRouter:
+    """Score requests and pick the fast or the complex model"""
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        enabled: bool = MODEL_ROUTING_ENABLED,
+        fast_model: str = MODEL_ROUTE_FAST,
+        complex_model: str = MODEL_ROUTE_COMPLEX,
+        threshold: float = MODEL_ROUTE_THRESHOLD,
+        weights: str = MODEL_ROUTE_WEIGHTS,
+        force: str = MODEL_ROUTE_FORCE,
+    ):
+        self.enabled = enabled
+        self.models = {"fast": fast_model, "complex": complex_model}
+        self.threshold = threshold
+        self.weights = {**DEFAULT_WEIGHTS, **_parse_weights(weights)}
+        self.force = force if force in ROUTES else None
+        if force and self.force is None:
+            print(f"Unknown MODEL_ROUTE_FORCE ignored: {force}")
+
+        self._stats = {route: _RouteStats() for route in ROUTES}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def features(user_input: str, image_description: str = None, history=None):
+        """Measure the request.
+
+        Returns:
+            dict: length, image, components, follow_up, functionality (see
+                module doc)
+        """
+        text = user_input or ""
+        if image_description:
+            # The mockup counts as `image`, not as request length
+            text = text.replace(image_description, "")
+
+        components = {match.lower().replace(" ", "") for match in _COMPONENT_RE.findall(text)}
+        components.update(_IDENTIFIER_RE.findall(text))
+        functionality = {match.lower() for match in _FUNCTIONALITY_RE.findall(text)}
+
+        return {
+            "length": min(token_counter.count(text) // TOKENS_PER_POINT, MAX_LENGTH_POINTS),
+            "image": int(bool(image_description)),
+            "components": min(max(len(components) - 1, 0), MAX_EXTRA_COMPONENTS),
+            "follow_up": int(bool(history)),
+            "functionality": min(len(functionality), MAX_FUNCTIONALITY),
+        }
+
+    def route(self, user_input: str, image_description: str = None, history=None):
+        """Pick the route of a request.
+
+        Args:
+            user_input (str): The user request
+            image_description (str, optional): Vision analysis of a UI mockup
+            history (str, optional): Rendered session memory, None for a new session
+
+        Returns:
+            RouteDecision: route ("fast" or "complex"), model, score, features
+        """
+        features = self.features(user_input, image_description, history)
+        score = sum(self.weights[name] * value for name, value in features.items())
+
+        if self.force:
+            route = self.force
+        elif not self.enabled:
+            route = "complex"
+        else:
+            route = "complex" if score >= self.threshold else "fast"
+        return RouteDecision(route, self.models[route], score, features)
+
+    def record(self, decision: RouteDecision, seconds: float):
+        """Log a routed call and record its latency"""
+        with self._lock:
+            stats = self._stats[decision.route]
+            stats.requests += 1
+            stats.seconds += seconds
+        metrics.observe(f"llm:{decision.route}", seconds)
+        print(
+            f"Routed to {decision.route} ({decision.model}), score "
+            f"{decision.score:g}/{self.threshold:g} "
+            f"[{', '.join(f'{name}={value}' for name, value in decision.features.items())}]: "
+            f"{seconds * 1000:.0f} ms"
+        )
+
+    def stats(self):
+        """Return the requests and average LLM latency per route.
+
+        Returns:
+            dict: {route: {model, requests, share, average_ms}}
+        """
+        with self._lock:
+            total = sum(stats.requests for stats in self._stats.values())
+            return {
+                route: {
+                    "model": self.models[route],
+                    "requests": stats.requests,
+                    "share": round(stats.requests / total, 3) if total else 0.0,
+                    "average_ms": (
+                        round(stats.seconds / stats.requests * 1000, 1)
+                        if stats.requests
+                        else 0.0
+                    ),
+                }
+                for route, stats in self._stats.items()
+            }
+
+
+# Create global instance
+model_router = ModelRouter()
@@ -0,0 +1,351 @@
+"""Near-duplicate detection for code snippets with MinHash and LSH.
+
+The HuggingFace dataset holds many near-identical assistant answers (the same
+counter or todo component with renamed variables or different styling). Exact
+content hashing does not catch them, so they are embedded, stored and returned
+together by top-k retrieval. This module estimates the Jaccard similarity of two
+snippets from MinHash signatures and finds candidates with locality-sensitive
+hashing (LSH), without comparing every pair.
+
+    - Shingles: overlapping runs of SHINGLE_SIZE code tokens (identifiers, numbers
+      and punctuation, lowercased, whitespace ignored)
+    - Signature: MINHASH_PERMUTATIONS minimum hash values (NumPy, vectorized)
+    - LSH: the signature is cut into bands; snippets sharing a band are candidates,
+      which are kept only if their estimated Jaccard similarity is at least
+      NEAR_DUP_THRESHOLD. The band layout is picked from the threshold.
+
+Band keys are stored on each snippet (`lsh_bands`, with a multikey index), so
+new snippets are checked against the whole collection with one MongoDB query per
+batch. The ingestion pipeline uses this as a stage before embedding.
+
+Offline compaction:
+    Existing collections can be cleaned with the command below. It signs every
+    snippet, groups near-duplicates, keeps one per group (recommended, then
+    upvoted, then longest, then oldest) and deletes the others from MongoDB and
+    the vector index. It prints a report of what was removed.
+
+        cd server
+        python -m utils.near_duplicates --dry-run            # Report only
+        python -m utils.near_duplicates --threshold 0.9      # Compact
+        python -m utils.near_duplicates --report report.json # Save the report
+
+Usage:
+    from utils.near_duplicates import MinHasher, MinHashLSH
+
+    hasher = MinHasher()
+    lsh = MinHashLSH(threshold=0.85, num_perm=hasher.num_perm)
+    signature = hasher.signature(code)
+    if lsh.near_duplicate_of(signature) is None:
+        lsh.add(snippet_id, signature)
+
+Configuration:
+    - NEAR_DUP_ENABLED: Drop near-duplicates during ingestion (default: true)
+    - NEAR_DUP_THRESHOLD: Minimum estimated Jaccard similarity (default: 0.85)
+    - MINHASH_PERMUTATIONS: Signature length (default: 128)
+    - SHINGLE_SIZE: Tokens per shingle (default: 5)
+"""
+
+import re
+import sys
+import json
+import zlib
+import argparse
+from collections import defaultdict
+import numpy as np
+from bson.binary import Binary
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+from utils.chunking import chunk_ids
+from utils.consts import NEAR_DUP_THRESHOLD, MINHASH_PERMUTATIONS, SHINGLE_SIZE
+
+_TOKEN_RE = re.compile(r"[A-Za-z_$][A-Za-z0-9_$]*|\d+|[^\w\s]")
+
+# Mersenne prime 2^31 - 1: products of 31-bit values fit in int64
+_PRIME = (1 << 31) - 1
+_SEED = 1
+
+
+def code_shingles(text: str, size: int = SHINGLE_SIZE):
+    """Return the set of hashed token shingles of a snippet.
+
+    Args:
+        text (str): Code or prose
+        size (int, optional): Tokens per shingle. Defaults to SHINGLE_SIZE.
+
+    Returns:
+        set[int]: 31-bit shingle hashes
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < size:
+        tokens = tokens or [""]
+        return {zlib.crc32(" ".join(tokens).encode("utf-8")) & _PRIME}
+    return {
+        zlib.crc32(" ".join(tokens[i : i + size]).encode("utf-8")) & _PRIME
+        for i in range(len(tokens) - size + 1)
+    }
+
+
+class MinHasher:
+    """Compute MinHash signatures with a fixed family of hash permutations"""
+
+    def __init__(self, num_perm: int = MINHASH_PERMUTATIONS, shingle_size: int = SHINGLE_SIZE):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(_SEED)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+
+    def signature(self, text: str):
+        """Return the MinHash signature of `text` (uint32 array of num_perm values)"""
+        shingles = np.fromiter(
+            code_shingles(text, self.shingle_size), dtype=np.int64
+        )
+        hashed = (np.outer(self._a, shingles) + self._b[:, None]) % _PRIME
+        return hashed.min(axis=1).astype(np.uint32)
+
+
+def similarity(first, second) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(first == second))
+
+
+def lsh_params(threshold: float, num_perm: int):
+    """Pick (bands, rows) so that the LSH S-curve turns at or just below `threshold`.
+
+    Turning early favours recall: extra candidates are cheap, since each one is
+    verified against the threshold with its full signature anyway.
+    """
+    best, best_turn = (num_perm, 1), 0.0
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        turn = (1 / bands) ** (1 / rows)
+        if best_turn < turn <= threshold:
+            best, best_turn = (bands, rows), turn
+    return best
+
+
+def encode_signature(signature):
+    """Signature -> BSON binary for MongoDB"""
+    return Binary(signature.astype("<u4").tobytes())
+
+
+def decode_signature(data):
+    """BSON binary -> signature"""
+    return np.frombuffer(bytes(data), dtype="<u4").astype(np.uint32)
+
+
+class MinHashLSH:
+    """In-memory LSH index over MinHash signatures"""
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, num_perm: int = MINHASH_PERMUTATIONS):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self._buckets = defaultdict(list)  # band key -> [item key]
+        self._signatures = {}  # item key -> signature
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def band_keys(self, signature):
+        """Return the LSH bucket keys of a signature (also stored in MongoDB).
+
+        The layout is part of the key, so keys computed with another threshold or
+        signature length never collide.
+        """
+        return [
+            f"{self.bands}x{self.rows}:{band}:"
+            + format(
+                zlib.crc32(signature[band * self.rows : (band + 1) * self.rows].tobytes()),
+                "08x",
+            )
+            for band in range(self.bands)
+        ]
+
+    def add(self, key, signature):
+        """Index a signature under `key`"""
+        if key in self._signatures:
+            return
+        self._signatures[key] = signature
+        for band_key in self.band_keys(signature):
+            self._buckets[band_key].append(key)
+
+    def candidates(self, signature):
+        """Keys sharing at least one band with `signature`"""
+        found = {}
+        for band_key in self.band_keys(signature):
+            for key in self._buckets.get(band_key, ()):
+                found[key] = True
+        return list(found)
+
+    def near_duplicate_of(self, signature, exclude=None):
+        """Return the key of the most similar indexed item above the threshold, or None"""
+        best_key, best_score = None, self.threshold
+        for key in self.candidates(signature):
+            if key == exclude:
+                continue
+            score = similarity(signature, self._signatures[key])
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+
+def _keep_rank(doc):
+    """Sort key: the snippet kept in a group of near-duplicates comes first"""
+    return (
+        not doc.get("recommended", False),
+        not doc.get("upvoted", False),
+        -len(doc.get("text", "")),
+        doc.get("created_at") or doc["_id"].generation_time.replace(tzinfo=None),
+    )
+
+
+def compact(  # pylint: disable=too-many-locals
+    collection,
+    vector_index,
+    threshold: float = NEAR_DUP_THRESHOLD,
+    dry_run: bool = False,
+    lexical=None,
+):
+    """Remove near-duplicate snippets from MongoDB and the vector index.
+
+    Signatures and band keys are (re)computed for every snippet and saved, so
+    ingestion can check new snippets against the compacted collection.
+
+    Args:
+        collection: The snippets collection
+        vector_index: Vector store holding the snippets' chunk vectors
+        threshold (float, optional): Minimum estimated Jaccard similarity
+        dry_run (bool, optional): Only report, delete nothing. Defaults to False.
+        lexical (LexicalIndex, optional): BM25 index to drop the removed
+            snippets from, in every worker (see utils.lexical_index)
+
+    Returns:
+        dict: Report with scanned, groups, removed, kept, removed_ratio,
+            removed_chars and up to 20 example groups
+    """
+    hasher = MinHasher()
+    lsh = MinHashLSH(threshold, hasher.num_perm)
+
+    docs = list(
+        collection.find(
+            {},
+            {
+                "text": 1,
+                "recommended": 1,
+                "upvoted": 1,
+                "created_at": 1,
+                "chunk_count": 1,
+            },
+        )
+    )
+    docs.sort(key=_keep_rank)
+
+    groups = defaultdict(list)  # kept id -> removed docs
+    updates = []
+    for doc in docs:
+        signature = hasher.signature(doc.get("text", ""))
+        original = lsh.near_duplicate_of(signature)
+        if original is not None:
+            groups[original].append(doc)
+            continue
+        lsh.add(doc["_id"], signature)
+        updates.append(
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {
+                        "minhash": encode_signature(signature),
+                        "lsh_bands": lsh.band_keys(signature),
+                    }
+                },
+            )
+        )
+
+    removed = [doc for duplicates in groups.values() for doc in duplicates]
+    report = {
+        "threshold": threshold,
+        "bands": lsh.bands,
+        "rows": lsh.rows,
+        "scanned": len(docs),
+        "groups": len(groups),
+        "removed": len(removed),
+        "kept": len(docs) - len(removed),
+        "removed_ratio": round(len(removed) / len(docs), 4) if docs else 0.0,
+        "removed_chars": sum(len(doc.get("text", "")) for doc in removed),
+        "dry_run": dry_run,
+        "examples": [
+            {
+                "kept": str(kept_id),
+                "removed": [str(doc["_id"]) for doc in duplicates[:5]],
+            }
+            for kept_id, duplicates in sorted(
+                groups.items(), key=lambda item: len(item[1]), reverse=True
+            )[:20]
+        ],
+    }
+    if dry_run:
+        return report
+
+    # Every chunk vector of the removed snippets
+    vector_ids = [
+        vector_id
+        for doc in removed
+        for vector_id in chunk_ids(str(doc["_id"]), doc.get("chunk_count", 1))
+    ]
+    for start in range(0, len(vector_ids), 1000):
+        vector_index.delete(ids=vector_ids[start : start + 1000])
+    removed_ids = [doc["_id"] for doc in removed]
+    for start in range(0, len(removed_ids), 1000):
+        collection.delete_many({"_id": {"$in": removed_ids[start : start + 1000]}})
+    if lexical is not None:
+        lexical.delete(removed_ids)
+    for start in range(0, len(updates), 1000):
+        collection.bulk_write(updates[start : start + 1000], ordered=False)
+    return report
+
+
+def main(argv=None):
+    """Command line entry point for offline compaction"""
+    parser = argparse.ArgumentParser(
+        description="Remove near-duplicate snippets from MongoDB and the vector index"
+    )
+    parser.add_argument("--threshold", type=float, default=NEAR_DUP_THRESHOLD)
+    parser.add_argument("--dry-run", action="store_true", help="Report only")
+    parser.add_argument("--report", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    # pylint: disable=import-outside-toplevel
+    from utils.connect_db import snippets_col
+    from utils.pc_index import index
+    from utils.lexical_index import lexical_index
+
+    try:
+        report = compact(
+            snippets_col, index, args.threshold, args.dry_run, lexical=lexical_index
+        )
+    except PyMongoError as e:
+        print(f"❌ Compaction failed: {e}")
+        return 1
+
+    action = "Would remove" if args.dry_run else "Removed"
+    print(
+        f"✅ Scanned {report['scanned']} snippets: {action} {report['removed']} "
+        f"near-duplicates ({report['removed_ratio']:.1%}, "
+        f"{report['removed_chars']} characters) in {report['groups']} groups, "
+        f"kept {report['kept']}"
+    )
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Report written to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,26 @@
-"""Pinecone vector database connection module.
+"""Vector database connection module.
 
-This module establishes a connection to the Pinecone vector database and provides
+This module creates the vector store used for code snippet retrieval and provides
 a globally accessible index instance for the Ironhack Final Project.
 
-The module initializes a Pinecone client using the API key from environment variables
-and connects to the 'ironhack-final-project' index, which stores embedded React code
-examples and UI component patterns for semantic similarity search.
+The backend is selected with VECTOR_STORE_BACKEND:
+    - "pinecone" (default): Connects to the Pinecone index PINECONE_INDEX_NAME
+      ('ironhack-final-project'), which stores embedded React code examples
+      and UI component patterns for semantic similarity search.
+    - "local": In-process index persisted to LOCAL_INDEX_PATH (see
+      utils.vector_store.LocalVectorStore). No network hop per query, and
+      everything can run offline.
 
 Globals:
-    pc (Pinecone): Initialized Pinecone client instance
-    index (Pinecone.Index): Connected Pinecone index for vector operations
+    PC (Pinecone | None): Pinecone client instance (Pinecone backend only)
+    index (PineconeVectorStore | LocalVectorStore): Vector store for vector operations
+
+Both are built lazily, on first use in each process (see utils.services): the
+Pinecone client opens connections and looks the index up over the network, and
+the local store loads its index file, none of which should happen at import
+time or be shared across gunicorn workers. The Pinecone connection pool is sized
+and timed out like the other upstreams (HTTP_POOL_SIZE, HTTP_*_TIMEOUT) and its
+connection reuse is reported by utils.http_client.
 
 Usage:
     from utils.pc_index import index
@@ -30,13 +41,59 @@ Raises:
     KeyError: If the specified index 'ironhack-final-project' doesn't exist
 
 Note:
-    This module is imported at application startup and creates a persistent
-    connection to the Pinecone vector database for use throughout the application.
+    The first query of each process creates a persistent connection to the
+    vector database, used by that process from then on.
 """
 
-from pinecone import Pinecone
-from utils.consts import PINECONE_API_KEY
+from utils.services import services
+from utils.http_client import http_clients
+from utils.vector_store import LocalVectorStore, PineconeVectorStore
+from utils.consts import (
+    PINECONE_API_KEY,
+    PINECONE_INDEX_NAME,
+    VECTOR_STORE_BACKEND,
+    LOCAL_INDEX_PATH,
+    LOCAL_INDEX_HNSW_THRESHOLD,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    LOCAL_INDEX_SYNC_INTERVAL,
+)
+
+
+def _create_pinecone():
+    from pinecone import Pinecone  # pylint: disable=import-outside-toplevel
+
+    return Pinecone(api_key=PINECONE_API_KEY)
+
+
+def _create_local_index():
+    return LocalVectorStore(
+        path=LOCAL_INDEX_PATH,
+        hnsw_threshold=LOCAL_INDEX_HNSW_THRESHOLD,
+        hnsw_m=HNSW_M,
+        hnsw_ef_construction=HNSW_EF_CONSTRUCTION,
+        hnsw_ef_search=HNSW_EF_SEARCH,
+        autosave_interval=LOCAL_INDEX_SYNC_INTERVAL,
+    )
+
+
+def _create_pinecone_index():
+    pinecone = services.get("pinecone")
+    # Connections the index keeps open (the SDK default is 5 per CPU)
+    pinecone.openapi_config.connection_pool_maxsize = http_clients.pool_size("pinecone")
+    pinecone_index = pinecone.Index(PINECONE_INDEX_NAME)
+    try:
+        api_client = pinecone_index._vector_api.api_client  # pylint: disable=protected-access
+        http_clients.track("pinecone", api_client.rest_client.pool_manager)
+    except AttributeError:
+        print("Pinecone connection stats unavailable with this client version")
+    return PineconeVectorStore(pinecone_index, request_timeout=http_clients.timeout)
+
 
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index("ironhack-final-project")
+if VECTOR_STORE_BACKEND == "local":
+    PC = None
+    index = services.register("vector_store", _create_local_index)
+else:
+    PC = services.register("pinecone", _create_pinecone, imports=("pinecone",))
+    index = services.register("vector_store", _create_pinecone_index)
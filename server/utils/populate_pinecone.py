@@ -67,19 +67,19 @@ from pinecone import ServerlessSpec
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 from server.api.app import client  # pylint: disable=wrong-import-position
-from utils.pc_index import pc  # pylint: disable=wrong-import-position
+from utils.pc_index import PC  # pylint: disable=wrong-import-position
 
 PC_INDEX = "ironhack-final-project"
 
-if PC_INDEX not in pc.list_indexes().names():
-    pc.create_index(
+if PC_INDEX not in PC.list_indexes().names():
+    PC.create_index(
         name=PC_INDEX,
         dimension=1536,
         metric="cosine",
         spec=ServerlessSpec(cloud="aws", region="us-east-1"),
     )
 
-index = pc.Index(PC_INDEX)
+index = PC.Index(PC_INDEX)
 
 # Sample React code snippets
 code_snippets = [
@@ -150,7 +150,11 @@ for snippet in code_snippets:
             (
                 snippet["id"],
                 embedding,
-                {"text": snippet["text"], "tags": ",".join(snippet["tags"])},
+                {
+                    "text": snippet["text"],
+                    "tags": ",".join(snippet["tags"]),
+                    "tag_list": snippet["tags"],
+                },
             )
         ]
     )
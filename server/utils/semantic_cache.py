@@ -0,0 +1,176 @@
+"""Semantic response cache for React code generation.
+
+Users often ask for nearly the same thing in different words ("responsive navbar
+with tailwind", "navbar responsive tailwind"). This module keeps the replies of
+previous generations next to the embedding of the request that produced them,
+so a new request whose embedding is close enough can be answered without calling
+the LLM.
+
+Entries live in a fixed-size in-process NumPy matrix. A lookup is a single
+matrix-vector product over the normalized embeddings (cosine similarity).
+
+Eviction:
+    - TTL: entries older than `ttl` seconds are dropped on access
+    - LRU: when the cache is full, the least recently used entry is replaced
+
+Usage:
+    from utils.semantic_cache import semantic_cache
+
+    embedding = embeddings.embed_query(question)
+    reply = semantic_cache.lookup(embedding)
+    if reply is None:
+        reply = llm.invoke(...).content
+        semantic_cache.add(embedding, reply)
+
+    semantic_cache.stats()
+    # {"hits": 3, "misses": 10, "hit_rate": 0.23, "size": 10, ...}
+
+Configuration:
+    - SEMANTIC_CACHE_ENABLED: Turn the cache on or off (default: true)
+    - SEMANTIC_CACHE_THRESHOLD: Minimum cosine similarity for a hit (default: 0.95)
+    - SEMANTIC_CACHE_TTL: Entry lifetime in seconds (default: 86400)
+    - SEMANTIC_CACHE_MAX_ENTRIES: Maximum number of cached replies (default: 1000)
+"""
+
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.consts import (
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+)
+
+
+class SemanticCache:
+    """Embedding-keyed cache of generated replies with TTL and LRU eviction"""
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl: float = 86400,
+        max_entries: int = 1000,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._vectors = None  # (max_entries, dim), allocated on first insert
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._entries = OrderedDict()  # slot -> entry, least recently used first
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _release(self, slot):
+        self._entries.pop(slot, None)
+        self._valid[slot] = False
+        self._free_slots.append(slot)
+
+    def _expire(self, now):
+        expired = [
+            slot
+            for slot, entry in self._entries.items()
+            if now - entry["created_at"] > self.ttl
+        ]
+        for slot in expired:
+            self._release(slot)
+            self.evictions += 1
+
+    def lookup(self, embedding):
+        """Return the cached reply closest to `embedding`, or None on a miss.
+
+        Args:
+            embedding (list[float]): Embedding of the incoming request
+
+        Returns:
+            str | None: The cached reply if its similarity reaches the threshold
+        """
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            self._expire(time.time())
+
+            if not self._entries or self._vectors is None:
+                self.misses += 1
+                return None
+
+            scores = self._vectors @ vector
+            scores[~self._valid] = -np.inf
+            slot = int(np.argmax(scores))
+
+            if scores[slot] < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return self._entries[slot]["reply"]
+
+    def add(self, embedding, reply: str):
+        """Store a generated reply under the embedding of its request.
+
+        Args:
+            embedding (list[float]): Embedding of the request
+            reply (str): The generated reply to cache
+        """
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros(
+                    (self.max_entries, vector.shape[0]), dtype=np.float32
+                )
+
+            if not self._free_slots:
+                # Evict the least recently used entry
+                oldest_slot = next(iter(self._entries))
+                self._release(oldest_slot)
+                self.evictions += 1
+
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._valid[slot] = True
+            self._entries[slot] = {"reply": reply, "created_at": time.time()}
+
+    def clear(self):
+        """Drop every cached entry (counters are kept)"""
+        with self._lock:
+            for slot in list(self._entries):
+                self._release(slot)
+
+    def stats(self):
+        """Return hit/miss counters and current size.
+
+        Returns:
+            dict: hits, misses, hit_rate, evictions, size, max_entries, threshold
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+            }
+
+
+# Create global instance
+semantic_cache = SemanticCache(
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl=SEMANTIC_CACHE_TTL,
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+)
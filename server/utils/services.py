@@ -0,0 +1,236 @@
+"""Lazy, fork-safe container for the app's external clients.
+
+`ServiceContainer` holds the app's external clients: the `ChatOpenAI` models
+and `OpenAIEmbeddings` of ReactCodeAssistant, the vector store, the Cloudinary
+config, the `MongoClient`, the LangSmith `Client` and the `openai.OpenAI`
+client. Their connection pools and background threads must not be shared by
+forked gunicorn workers, and building them is kept out of import time.
+
+Each module registers a factory and exports the returned global, a stand-in for
+the service:
+
+    - The client is built on first use, once per process. A process that
+      finds instances built by its parent (after a fork) drops them and builds
+      its own; gunicorn.conf.py also resets the container in `post_fork`
+    - The modules a service needs can be imported ahead of time (`preload`),
+      so with `--preload` the master imports them once and the workers share
+      them, without building any client
+    - Import and init time are measured per service, for the startup report
+
+Usage:
+    from utils.services import services
+
+    index = services.register("vector_store", _create_index, imports=("pinecone",))
+    index.query(...)                  # Built here, on first use
+    messages_col = services.view("mongodb", lambda db: db["messages"])
+
+    services.preload()                # Import dependencies, build nothing
+    services.warm()                   # Build every service now
+    services.report()
+    # {"vector_store": {"imports": {"pinecone": 412.3}, "import_ms": 412.3,
+    #                   "init_ms": 198.1, "ready": True, "pid": 4242}, ...}
+
+Configuration:
+    - SERVICES_WARM: When services are set up: "none" (all on first use),
+      "imports" (import dependencies at startup, build on first use) or "all"
+      (also build every service when a worker starts) (default: imports)
+"""
+
+import os
+import sys
+import time
+import importlib
+import threading
+from utils.consts import SERVICES_WARM
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+class LazyService:
+    """Stand-in for a service: attribute access builds and uses the real one"""
+
+    __slots__ = ("_container", "_name", "_resolve", "_cached")
+
+    def __init__(self, container, name: str, resolve=None):
+        object.__setattr__(self, "_container", container)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_resolve", resolve)
+        object.__setattr__(self, "_cached", (None, None))
+
+    def _target(self):
+        # After a fork the cached target is the parent's: reset bumps the generation
+        self._container._check_fork()  # pylint: disable=protected-access
+        generation, target = self._cached
+        if generation == self._container.generation and target is not None:
+            return target
+        target = self._container.get(self._name)
+        if self._resolve is not None:
+            target = self._resolve(target)
+        object.__setattr__(self, "_cached", (self._container.generation, target))
+        return target
+
+    def __getattr__(self, attr):
+        return getattr(self._target(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._target(), attr, value)
+
+    def __getitem__(self, key):
+        return self._target()[key]
+
+    def __repr__(self):
+        return f"<lazy {self._name}>"
+
+
+class ServiceContainer:
+    """Factories of the app's clients, built lazily once per process"""
+
+    def __init__(self, warm: str = SERVICES_WARM):
+        self.warm_mode = warm
+        self.generation = 0  # Bumped on reset, invalidates the stand-ins' caches
+
+        self._factories = {}  # name -> (factory, dependency modules)
+        self._instances = {}
+        self._timings = {}
+        self._import_times = {}  # module -> ms, None if it was already imported
+        self._pid = os.getpid()
+        # Reentrant: a factory may use other services
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory, imports=()) -> LazyService:
+        """Declare a service, built by `factory()` on first use.
+
+        Args:
+            name (str): Service name, used in the report
+            factory (callable): Builds the client; imports its own dependencies
+            imports (tuple[str], optional): Modules the factory needs, imported
+                (and timed) before it runs, or earlier by `preload`
+
+        Returns:
+            LazyService: Stand-in to export in place of the client
+        """
+        self._factories[name] = (factory, tuple(imports))
+        return LazyService(self, name)
+
+    def view(self, name: str, resolve) -> LazyService:
+        """Stand-in for a part of a service, e.g. a collection of the database"""
+        return LazyService(self, name, resolve)
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self.reset()
+
+    def reset(self):
+        """Forget every instance (after a fork: the parent's clients are not ours)"""
+        # A lock held by another thread at fork time would never be released
+        self._lock = threading.RLock()
+        self._instances = {}
+        self._timings = {
+            name: {**timing, "init_ms": None, "ready": False, "pid": None}
+            for name, timing in self._timings.items()
+        }
+        self._pid = os.getpid()
+        self.generation += 1
+
+    def _import(self, modules) -> dict:
+        imported = {}
+        for module in modules:
+            if module not in self._import_times:
+                if module in sys.modules:
+                    self._import_times[module] = None
+                else:
+                    start = time.perf_counter()
+                    importlib.import_module(module)
+                    self._import_times[module] = _ms(start)
+            imported[module] = self._import_times[module]
+        return imported
+
+    def get(self, name: str):
+        """Return the service instance of this process, building it if needed"""
+        self._check_fork()
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+            factory, modules = self._factories[name]
+            imported = self._import(modules)
+            start = time.perf_counter()
+            instance = factory()
+            init_ms = _ms(start)
+            self._instances[name] = instance
+            self._timings[name] = {
+                "imports": imported,
+                "import_ms": round(sum((ms or 0.0 for ms in imported.values()), 0.0), 1),
+                "init_ms": init_ms,
+                "ready": True,
+                "pid": self._pid,
+            }
+            print(f"✅ {name} ready in {init_ms} ms")
+            return instance
+
+    def ready(self, name: str) -> bool:
+        """Whether the service is already built in this process"""
+        self._check_fork()
+        return name in self._instances
+
+    def preload(self, names=None):
+        """Import the dependencies of the services (all by default), build nothing"""
+        for name in names or list(self._factories):
+            imported = self._import(self._factories[name][1])
+            timing = self._timings.setdefault(
+                name, {"init_ms": None, "ready": False, "pid": None}
+            )
+            timing["imports"] = imported
+            timing["import_ms"] = round(sum((ms or 0.0 for ms in imported.values()), 0.0), 1)
+
+    def warm(self, names=None):
+        """Build the services (all by default) now rather than on first use"""
+        for name in names or list(self._factories):
+            try:
+                self.get(name)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"❌ {name} failed to start (will retry on first use): {e}")
+
+    def report(self):
+        """Return import and init cost per service.
+
+        Returns:
+            dict: {name: {imports, import_ms, init_ms, ready, pid}}; an import
+                time of None means the module was already imported elsewhere
+        """
+        self._check_fork()
+        return {
+            name: {
+                "imports": {},
+                "import_ms": 0.0,
+                "init_ms": None,
+                "ready": False,
+                "pid": None,
+                **self._timings.get(name, {}),
+            }
+            for name in self._factories
+        }
+
+    def log_report(self):
+        """Print the startup report, one line per service"""
+        print(f"Service startup report (pid {os.getpid()}):")
+        for name, timing in self.report().items():
+            init = f"{timing['init_ms']} ms" if timing["ready"] else "on first use"
+            imports = ", ".join(
+                f"{module} {ms} ms" if ms is not None else f"{module} (already loaded)"
+                for module, ms in timing["imports"].items()
+            )
+            print(
+                f"  {name}: import {timing['import_ms']} ms"
+                + (f" ({imports})" if imports else "")
+                + f", init {init}"
+            )
+
+
+# Create global instance
+services = ServiceContainer()
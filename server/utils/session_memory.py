@@ -0,0 +1,344 @@
+"""Bounded conversation memory for chat sessions.
+
+`SessionMemory` gives the model the earlier turns of a session, so follow-up
+requests can build on the code already generated, at a constant prompt cost:
+
+    - Recent window: the last MEMORY_WINDOW messages of the session, read with
+      one indexed query on (session_id, created_at, _id) (see
+      utils.connect_db.ensure_indexes)
+    - Rolling summary: older messages are folded into a short summary, stored
+      in `session_summaries_col` and cached in-process. It is updated
+      incrementally in the background after a reply is saved: only the
+      messages that left the window since the last update are summarized,
+      together with the previous summary, once MEMORY_SUMMARIZE_AFTER of them
+      have accumulated
+    - Pending messages: those that left the window but are not folded into
+      the summary yet (fewer than MEMORY_SUMMARIZE_AFTER) are kept with the
+      recent window, read by the same query, so no turn is missing in between
+
+Both are rendered into the prompt under a hard cap of MEMORY_TOKEN_CAP tokens:
+the summary first (at most MEMORY_SUMMARY_TOKENS), then as many recent and
+pending messages as fit, newest first, the oldest one kept being clipped if needed. So
+the prompt stays the same size however long the session runs.
+
+Summary document:
+    {
+        "_id": "session-uuid",
+        "summary": "The user is building a dashboard with ...",
+        "summarized_until": datetime,   # created_at of the last folded message
+        "messages": 12,                 # Messages folded in so far
+        "updated_at": datetime
+    }
+
+Usage:
+    from utils.session_memory import session_memory
+
+    history = session_memory.history(session_id)   # Before saving the new message
+    reply = react_assistant.generate_code(user_input, history=history.text)
+    session_memory.refresh(session_id)             # After saving the reply
+    history.report
+    # {"messages": 6, "summary": True, "tokens": 812, "cap": 1500}
+
+Configuration:
+    - MEMORY_ENABLED: Give the model the session history (default: true)
+    - MEMORY_WINDOW: Recent messages included verbatim (default: 6)
+    - MEMORY_TOKEN_CAP: Maximum tokens of history in the prompt (default: 1500)
+    - MEMORY_SUMMARY_TOKENS: Maximum tokens of the rolling summary (default: 300)
+    - MEMORY_SUMMARIZE_AFTER: Messages out of the window before the summary is
+      updated (default: 4)
+    - MEMORY_SUMMARY_MODEL: Model writing the summary (default: gpt-4o-mini)
+    - MEMORY_CACHE_TTL: Seconds a summary stays cached in-process (default: 60)
+"""
+
+import os
+import time
+import datetime
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from langchain.schema import HumanMessage
+from pymongo.errors import PyMongoError
+from utils.connect_db import messages_col, session_summaries_col
+from utils.context_packer import token_counter
+from utils.message_writer import message_writer
+from utils.services import services
+from utils.http_client import http_clients
+from utils.consts import (
+    OPENAI_API_KEY,
+    MEMORY_WINDOW,
+    MEMORY_TOKEN_CAP,
+    MEMORY_SUMMARY_TOKENS,
+    MEMORY_SUMMARIZE_AFTER,
+    MEMORY_SUMMARY_MODEL,
+    MEMORY_CACHE_TTL,
+)
+
+SessionHistory = namedtuple("SessionHistory", ["text", "report"])
+
+# Tokens of each message given to the summarizer (long code replies are clipped)
+SUMMARIZER_MESSAGE_TOKENS = 400
+# A clipped message is only kept if at least this many tokens of it fit
+MIN_MESSAGE_TOKENS = 50
+CACHE_SIZE = 1024
+
+SUMMARY_PROMPT = """You maintain a short summary of a conversation between a user and a React code assistant.
+
+Update the summary with the new messages below. Keep what matters for the next requests: what the user is building, components and names already written, libraries and styling choices, requirements and corrections. Do not include code. Answer with the summary only, in at most {max_words} words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}"""
+
+ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
+
+
+def _create_summary_llm():
+    from langchain_openai import ChatOpenAI  # pylint: disable=import-outside-toplevel
+
+    return ChatOpenAI(
+        model=MEMORY_SUMMARY_MODEL,
+        temperature=0,
+        api_key=OPENAI_API_KEY,
+        timeout=30,
+        max_retries=1,
+        http_client=http_clients.httpx_client("openai"),
+    )
+
+
+# Built on first use (see utils.services)
+summary_llm = services.register(
+    "summary_llm", _create_summary_llm, imports=("langchain_openai",)
+)
+
+
+class SessionMemory:  # pylint: disable=too-many-instance-attributes
+    """Recent window plus rolling summary of each session, under a token cap"""
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        messages,
+        summaries,
+        llm=None,
+        window: int = MEMORY_WINDOW,
+        token_cap: int = MEMORY_TOKEN_CAP,
+        summary_tokens: int = MEMORY_SUMMARY_TOKENS,
+        summarize_after: int = MEMORY_SUMMARIZE_AFTER,
+        cache_ttl: int = MEMORY_CACHE_TTL,
+    ):
+        self.messages = messages
+        self.summaries = summaries
+        self.llm = llm or summary_llm
+        self.window = window
+        self.token_cap = token_cap
+        self.summary_tokens = summary_tokens
+        self.summarize_after = summarize_after
+        self.cache_ttl = cache_ttl
+        self.counter = token_counter
+
+        self._cache = OrderedDict()  # session id -> (expires at, summary doc)
+        self._running = set()  # Sessions being summarized by this process
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _pool(self):
+        """One pool per process: threads do not survive a gunicorn fork"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix="memory")
+                self._pid = os.getpid()
+                self._running = set()
+            return self._executor
+
+    def _clip(self, text: str, tokens: int) -> str:
+        """Keep the beginning of `text` within `tokens` tokens"""
+        if self.counter.count(text) <= tokens:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.counter.count(text[:middle]) + 1 <= tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low].rstrip() + " …"
+
+    def _summary(self, session_id: str):
+        """Summary document of a session, from the in-process cache when fresh"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(session_id)
+            if cached and cached[0] > now:
+                self._cache.move_to_end(session_id)
+                return cached[1]
+
+        doc = self.summaries.find_one({"_id": session_id})
+        self._remember(session_id, doc)
+        return doc
+
+    def _remember(self, session_id: str, doc):
+        with self._lock:
+            self._cache[session_id] = (time.monotonic() + self.cache_ttl, doc)
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def _recent(
+        self, session_id: str, fields=("role", "message", "created_at"), limit=None
+    ):
+        """The last `limit` (default `window`) messages of a session, oldest first"""
+        cursor = (
+            self.messages.find(
+                {"session_id": session_id}, {field: 1 for field in fields}
+            )
+            .sort([("created_at", -1), ("_id", -1)])
+            .limit(limit or self.window)
+        )
+        return list(cursor)[::-1]
+
+    def history(self, session_id: str) -> SessionHistory:
+        """Render the session history for the prompt, within the token cap.
+
+        Call it before the new user message is saved, so the message is not
+        repeated in its own history.
+
+        Returns:
+            SessionHistory: text (None for a new session) and report (messages,
+                summary, tokens, cap)
+        """
+        report = {"messages": 0, "summary": False, "tokens": 0, "cap": self.token_cap}
+        if not session_id:
+            return SessionHistory(None, report)
+
+        try:
+            # The previous reply may still be in the write-behind queue
+            message_writer.wait_for(session_id)
+            # The window plus the messages not folded into the summary yet
+            recent = self._recent(
+                session_id, limit=self.window + self.summarize_after - 1
+            )
+            summary_doc = self._summary(session_id) if recent else None
+        except PyMongoError as e:
+            print(f"Session memory error (continuing without history): {e}")
+            return SessionHistory(None, report)
+
+        summarized_until = (summary_doc or {}).get("summarized_until")
+        if summarized_until is not None:
+            recent = [
+                message
+                for message in recent
+                if message.get("created_at") is None
+                or message["created_at"] > summarized_until
+            ]
+
+        sections = []
+        used = 0
+        if summary_doc and summary_doc.get("summary"):
+            summary = self._clip(
+                summary_doc["summary"], min(self.summary_tokens, self.token_cap // 2)
+            )
+            sections.append(f"Summary of earlier messages:\n{summary}")
+            used += self.counter.count(sections[-1])
+            report["summary"] = True
+
+        # Newest first, so the latest turns are the ones that always fit
+        lines = []
+        for message in reversed(recent):
+            label = ROLE_LABELS.get(message.get("role"), "User")
+            line = f"{label}: {message.get('message') or ''}"
+            cost = self.counter.count(line) + 1
+            if used + cost > self.token_cap:
+                remaining = self.token_cap - used - 1
+                if remaining < MIN_MESSAGE_TOKENS:
+                    break
+                line = self._clip(line, remaining)
+                cost = self.counter.count(line) + 1
+            lines.append(line)
+            used += cost
+        if lines:
+            sections.append("Recent messages:\n" + "\n".join(reversed(lines)))
+
+        report.update(messages=len(lines), tokens=used)
+        return SessionHistory("\n\n".join(sections) or None, report)
+
+    def refresh(self, session_id: str):
+        """Fold messages that left the recent window into the summary, in the background.
+
+        Returns:
+            Future | None: The scheduled update, None if one is already running
+        """
+        if not session_id:
+            return None
+        pool = self._pool()
+        with self._lock:
+            if session_id in self._running:
+                return None
+            self._running.add(session_id)
+        return pool.submit(self._update, session_id)
+
+    def _update(self, session_id: str):
+        try:
+            self._summarize(session_id)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Session summary error for {session_id}: {e}")
+        finally:
+            with self._lock:
+                self._running.discard(session_id)
+
+    def _summarize(self, session_id: str):
+        message_writer.wait_for(session_id)
+        recent = self._recent(session_id, fields=("created_at",))
+        if len(recent) < self.window:
+            return
+        boundary = recent[0]["created_at"]
+
+        doc = self.summaries.find_one({"_id": session_id}) or {}
+        query = {"session_id": session_id, "created_at": {"$lt": boundary}}
+        if doc.get("summarized_until"):
+            query["created_at"]["$gt"] = doc["summarized_until"]
+        older = list(
+            self.messages.find(query, {"role": 1, "message": 1, "created_at": 1}).sort(
+                [("created_at", 1), ("_id", 1)]
+            )
+        )
+        if len(older) < self.summarize_after:
+            return
+
+        transcript = "\n".join(
+            f"{ROLE_LABELS.get(message.get('role'), 'User')}: "
+            + self._clip(message.get("message") or "", SUMMARIZER_MESSAGE_TOKENS)
+            for message in older
+        )
+        response = self.llm.invoke(
+            [
+                HumanMessage(
+                    content=SUMMARY_PROMPT.format(
+                        # Roughly 0.75 words per token
+                        max_words=int(self.summary_tokens * 0.75),
+                        summary=doc.get("summary") or "(empty)",
+                        messages=transcript,
+                    )
+                )
+            ]
+        )
+
+        update = {
+            "summary": self._clip(response.content.strip(), self.summary_tokens),
+            "summarized_until": older[-1]["created_at"],
+            "messages": doc.get("messages", 0) + len(older),
+            "updated_at": datetime.datetime.utcnow(),
+        }
+        self.summaries.update_one({"_id": session_id}, {"$set": update}, upsert=True)
+        self._remember(session_id, {"_id": session_id, **update})
+
+    def forget(self, session_id: str):
+        """Drop the summary of a deleted session"""
+        with self._lock:
+            self._cache.pop(session_id, None)
+        self.summaries.delete_one({"_id": session_id})
+
+
+# Create global instance
+session_memory = SessionMemory(messages_col, session_summaries_col)
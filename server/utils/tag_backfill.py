@@ -0,0 +1,119 @@
+"""Add the `tag_list` metadata field to vectors that only have `tags`.
+
+Retrieval filters on tags (`{"tags": ["form"]}`) match the list-valued
+`tag_list` field (see utils.vector_store.build_filter). Vectors upserted
+before that field existed only carry `tags` as a comma-joined string, so tag
+filters skip them. This command walks the snippets collection, fetches the
+vectors of every snippet chunk and sets `tag_list` from their own `tags`
+string. Vectors that already have it are left alone, so it can be stopped and
+run again.
+
+    cd server
+    python -m utils.tag_backfill --dry-run     # Count the vectors to update
+    python -m utils.tag_backfill               # Update them
+
+Vectors that do not belong to a snippet of the collection (e.g. the samples of
+utils.populate_pinecone) are not visited; upsert them again instead.
+
+Usage:
+    from utils.tag_backfill import backfill_tag_list
+
+    report = backfill_tag_list(snippets_col, index)
+    # {"snippets": 1200, "vectors": 1530, "updated": 1490, "missing": 2}
+"""
+
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import PyMongoError
+from utils.chunking import chunk_ids
+
+# Vectors fetched per request
+FETCH_BATCH_SIZE = 100
+
+
+def tag_list(metadata):
+    """The `tag_list` value for a vector's metadata"""
+    tags = metadata.get("tags") or ""
+    if isinstance(tags, list):
+        return tags
+    return [tag.strip() for tag in tags.split(",") if tag.strip()]
+
+
+def backfill_tag_list(collection, vector_index, dry_run: bool = False, workers: int = 8):
+    """Set `tag_list` on every snippet vector that lacks it.
+
+    Args:
+        collection: The snippets collection
+        vector_index: Vector store holding the snippets' chunk vectors
+        dry_run (bool, optional): Only count, update nothing. Defaults to False.
+        workers (int, optional): Concurrent update requests. Defaults to 8.
+
+    Returns:
+        dict: snippets, vectors (visited), updated (or to update on a dry
+            run), missing (ids not found in the vector store)
+    """
+    report = {"snippets": 0, "vectors": 0, "updated": 0, "missing": 0}
+    vector_ids = []
+
+    def flush(pool):
+        fetched = vector_index.fetch(vector_ids).vectors
+        report["vectors"] += len(vector_ids)
+        report["missing"] += len(vector_ids) - len(fetched)
+        updates = [
+            (vector_id, tag_list(vector.metadata or {}))
+            for vector_id, vector in fetched.items()
+            if "tag_list" not in (vector.metadata or {})
+        ]
+        report["updated"] += len(updates)
+        if not dry_run:
+            list(
+                pool.map(
+                    lambda update: vector_index.update(
+                        id=update[0], set_metadata={"tag_list": update[1]}
+                    ),
+                    updates,
+                )
+            )
+        vector_ids.clear()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for doc in collection.find({}, {"chunk_count": 1}):
+            report["snippets"] += 1
+            vector_ids.extend(chunk_ids(str(doc["_id"]), doc.get("chunk_count", 1)))
+            if len(vector_ids) >= FETCH_BATCH_SIZE:
+                flush(pool)
+        if vector_ids:
+            flush(pool)
+    return report
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description="Add tag_list metadata to snippet vectors that only have tags"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Count only")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent updates")
+    args = parser.parse_args(argv)
+
+    # pylint: disable=import-outside-toplevel
+    from utils.connect_db import snippets_col
+    from utils.pc_index import index
+
+    try:
+        report = backfill_tag_list(snippets_col, index, args.dry_run, args.workers)
+    except PyMongoError as e:
+        print(f"❌ Backfill failed: {e}")
+        return 1
+
+    action = "Would update" if args.dry_run else "Updated"
+    print(
+        f"✅ Visited {report['vectors']} vectors of {report['snippets']} snippets: "
+        f"{action} {report['updated']}, {report['missing']} not in the vector store"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,933 @@
+"""Vector store backends for code snippet retrieval.
+
+Every backend exposes the subset of the Pinecone `Index` API the application
+uses, so `CustomPineconeRetriever` and the routes work with any of them:
+
+    query(vector, top_k, include_metadata=True, filter=None)
+                                                -> result with `.matches`
+    upsert(vectors)                             -> list of (id, values, metadata)
+    update(id, set_metadata)
+    delete(ids)
+    fetch(ids)                                  -> result with `.vectors` dict
+
+Classes:
+    PineconeVectorStore: Thin adapter over a remote Pinecone index
+    LocalVectorStore: In-process index persisted to disk. Brute-force NumPy
+        search for small corpora, switching to an HNSW graph once the number
+        of vectors reaches `hnsw_threshold`
+    HNSWGraph: Hierarchical Navigable Small World graph used by LocalVectorStore
+
+Metadata filters:
+    `filter` uses Pinecone's metadata filter syntax ($eq, $ne, $in, $nin, $gt,
+    $gte, $lt, $lte, $exists, $and, $or) and is pushed down into the search:
+    Pinecone evaluates it server side, LocalVectorStore turns it into a row mask
+    before scoring. For the fields in `filter_fields` (tags, recommended,
+    upvoted, model, ...) the mask comes from pre-built value -> row bitmaps.
+    `build_filter` turns friendly filters like {"tags": ["form"],
+    "recommended": True} into that syntax, and rejects unsupported operators
+    with a ValueError. Vectors upserted before `tag_list` existed only carry
+    the comma-joined `tags` string: run `python -m utils.tag_backfill` once to
+    add `tag_list` to them, or tag filters will not match them.
+
+For the size of our knowledge base (1k-100k snippets) an in-process search
+takes well under a millisecond to a few milliseconds, instead of a network
+round trip per query, and it works offline.
+
+Usage:
+    from utils.vector_store import LocalVectorStore
+
+    store = LocalVectorStore(path=".cache/vector_index")
+    store.upsert([("id-1", embedding, {"text": "..."})])
+    results = store.query(vector=query_embedding, top_k=3, include_metadata=True)
+    for match in results.matches:
+        print(match.id, match.score, match.metadata["text"])
+
+Persistence:
+    LocalVectorStore keeps `vectors.npy` and `index.json` in `path`, written
+    atomically. Upserts and deletes only change memory and are logged; a
+    background thread syncs with the disk every `autosave_interval` seconds
+    (and at exit). Each gunicorn worker holds its own copy, so a sync takes
+    an exclusive `flock` on `path/index.lock`, reloads the files if another
+    worker saved since, replays this worker's logged changes on top, and only
+    then writes: no worker overwrites the upserts of another. Workers that
+    did not write pick up the saves of the others at their next sync.
+
+    The HNSW graph is also built by the background thread, on a copy of the
+    vectors, so crossing `hnsw_threshold` never blocks queries; exact search
+    serves them meanwhile.
+"""
+
+import os
+import json
+import math
+import heapq
+import atexit
+import random
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single writer
+    fcntl = None
+
+
+class Match:
+    """One query result, shaped like a Pinecone match"""
+
+    def __init__(self, id, score, metadata=None, values=None):  # pylint: disable=redefined-builtin
+        self.id = id
+        self.score = score
+        self.metadata = metadata or {}
+        self.values = values or []
+
+    def __repr__(self):
+        return f"Match(id={self.id!r}, score={self.score:.4f})"
+
+
+class QueryResult:
+    """Query response, shaped like a Pinecone QueryResponse"""
+
+    def __init__(self, matches):
+        self.matches = matches
+
+
+class FetchResult:
+    """Fetch response, shaped like a Pinecone FetchResponse"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+
+FILTER_OPERATORS = frozenset(
+    ("$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte", "$exists")
+)
+LOGICAL_OPERATORS = frozenset(("$and", "$or"))
+
+# Friendly field names -> stored metadata field
+FIELD_ALIASES = {"tags": "tag_list"}
+
+
+def _filter_clause(field, value):
+    """One validated clause, with the field renamed to its metadata name.
+
+    Raises:
+        ValueError: On an unsupported operator or a malformed clause
+    """
+    if field in LOGICAL_OPERATORS:
+        if not isinstance(value, (list, tuple)) or not value:
+            raise ValueError(f"{field} takes a non-empty list of filters")
+        subfilters = []
+        for sub in value:
+            if not isinstance(sub, dict) or not sub:
+                raise ValueError(f"{field} takes a list of non-empty filter objects")
+            subfilters.append(build_filter(sub))
+        return {field: subfilters}
+    if field.startswith("$"):
+        raise ValueError(f"Unsupported filter operator: {field}")
+
+    field = FIELD_ALIASES.get(field, field)
+    if isinstance(value, dict):
+        unknown = set(value) - FILTER_OPERATORS
+        if unknown or not value:
+            raise ValueError(
+                f"Unsupported filter operator: {', '.join(sorted(unknown)) or '{}'}"
+            )
+        for op in ("$in", "$nin"):
+            if op in value and not isinstance(value[op], (list, tuple)):
+                raise ValueError(f"{op} takes a list")
+        return {field: dict(value)}
+    if isinstance(value, (list, tuple, set)):
+        return {field: {"$in": list(value)}}
+    return {field: {"$eq": value}}
+
+
+def build_filter(filters):
+    """Translate friendly retrieval filters into Pinecone metadata filter syntax.
+
+    Scalars become `$eq`, lists become `$in` (any of), operator dicts and
+    `$and`/`$or` clauses are validated and passed through. `tags` targets the
+    list-valued `tag_list` metadata field in every form, nested clauses
+    included.
+
+    Args:
+        filters (dict): e.g. {"tags": ["form"], "recommended": True}
+
+    Returns:
+        dict | None: e.g. {"$and": [{"tag_list": {"$in": ["form"]}},
+            {"recommended": {"$eq": True}}]}, or None when there is nothing to filter
+
+    Raises:
+        ValueError: If the filter uses an unsupported operator or is malformed
+    """
+    if not filters:
+        return None
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object")
+
+    clauses = [_filter_clause(field, value) for field, value in filters.items()]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _condition_matches(stored, op, value):  # pylint: disable=too-many-return-statements
+    """Evaluate one operator against a metadata value (lists match any element)"""
+    values = stored if isinstance(stored, list) else [stored]
+    if op == "$exists":
+        return (stored is not None) == bool(value)
+    if stored is None:
+        return op in ("$ne", "$nin")
+    if op == "$eq":
+        return value in values
+    if op == "$ne":
+        return value not in values
+    if op == "$in":
+        return any(v in value for v in values)
+    if op == "$nin":
+        return not any(v in value for v in values)
+    try:
+        if op == "$gt":
+            return any(v > value for v in values)
+        if op == "$gte":
+            return any(v >= value for v in values)
+        if op == "$lt":
+            return any(v < value for v in values)
+        if op == "$lte":
+            return any(v <= value for v in values)
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def matches_filter(metadata, metadata_filter):
+    """Return True if `metadata` satisfies a Pinecone-style metadata filter"""
+    if not metadata_filter:
+        return True
+    for field, condition in metadata_filter.items():
+        if field == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif field == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+        else:
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            stored = metadata.get(field)
+            for op, value in condition.items():
+                if not _condition_matches(stored, op, value):
+                    return False
+    return True
+
+
+def _normalize_upsert(vectors):
+    """Accept (id, values[, metadata]) tuples or Pinecone-style dicts"""
+    for vector in vectors:
+        if isinstance(vector, dict):
+            yield vector["id"], vector["values"], vector.get("metadata") or {}
+        elif len(vector) == 3:
+            yield vector[0], vector[1], vector[2] or {}
+        else:
+            yield vector[0], vector[1], {}
+
+
+class PineconeVectorStore:
+    """Adapter over a Pinecone index implementing the vector store interface"""
+
+    def __init__(self, index, request_timeout=None):
+        self.index = index
+        # (connect, read) seconds; the Pinecone client waits forever by default
+        self.request_timeout = request_timeout
+
+    def __getattr__(self, name):
+        # describe_index_stats, etc. go straight to Pinecone
+        if name in ("index", "request_timeout"):
+            raise AttributeError(name)
+        return getattr(self.index, name)
+
+    def _options(self, kwargs):
+        if self.request_timeout is not None:
+            kwargs.setdefault("_request_timeout", self.request_timeout)
+        return kwargs
+
+    def query(self, vector, top_k=3, include_metadata=True, **kwargs):
+        """Search the remote index"""
+        return self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=include_metadata,
+            **self._options(kwargs),
+        )
+
+    def upsert(self, vectors, **kwargs):
+        """Insert or replace vectors in the remote index"""
+        return self.index.upsert(vectors=vectors, **self._options(kwargs))
+
+    def delete(self, ids, **kwargs):
+        """Delete vectors by id"""
+        return self.index.delete(ids=list(ids), **self._options(kwargs))
+
+    def update(self, id, set_metadata=None, **kwargs):  # pylint: disable=redefined-builtin
+        """Merge `set_metadata` into the metadata of one vector"""
+        return self.index.update(id=id, set_metadata=set_metadata, **self._options(kwargs))
+
+    def fetch(self, ids, **kwargs):
+        """Fetch vectors and metadata by id"""
+        return self.index.fetch(ids=list(ids), **self._options(kwargs))
+
+
+class HNSWGraph:
+    """Hierarchical Navigable Small World graph over rows of a vector matrix.
+
+    Vectors are expected to be L2-normalized, so similarity is a dot product.
+    Nodes are row numbers of the matrix owned by the caller.
+    """
+
+    def __init__(self, m=16, ef_construction=100, seed=42):
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.level_mult = 1 / math.log(m)
+        self.links = []  # row -> [neighbors at level 0, level 1, ...]
+        self.entry = None
+        self.max_level = -1
+        self._rng = random.Random(seed)
+
+    def _search_layer(self, vectors, query, entry_points, ef, level):
+        """Greedy best-first search on one layer. Returns [(similarity, row)]"""
+        visited = set(entry_points)
+        sims = (vectors[entry_points] @ query).tolist()
+        candidates = [(-sim, row) for sim, row in zip(sims, entry_points)]
+        results = list(zip(sims, entry_points))
+        heapq.heapify(candidates)
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_sim, row = heapq.heappop(candidates)
+            if -neg_sim < results[0][0] and len(results) >= ef:
+                break
+
+            neighbors = [n for n in self.links[row][level] if n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+
+            for sim, neighbor in zip((vectors[neighbors] @ query).tolist(), neighbors):
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, neighbor))
+                    heapq.heappush(results, (sim, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return results
+
+    def _descend(self, vectors, query, down_to):
+        """Walk the upper layers greedily, returning entry points for `down_to`"""
+        entry_points = [self.entry]
+        for level in range(self.max_level, down_to, -1):
+            best = max(self._search_layer(vectors, query, entry_points, 1, level))
+            entry_points = [best[1]]
+        return entry_points
+
+    def add(self, vectors, row):
+        """Link `row` (the next row of `vectors`) into the graph"""
+        level = int(-math.log(1.0 - self._rng.random()) * self.level_mult)
+        self.links.append([[] for _ in range(level + 1)])
+
+        if self.entry is None:
+            self.entry, self.max_level = row, level
+            return
+
+        query = vectors[row]
+        entry_points = self._descend(vectors, query, level)
+
+        for lc in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(
+                vectors, query, entry_points, self.ef_construction, lc
+            )
+            neighbors = [r for _, r in heapq.nlargest(self.m, found)]
+            self.links[row][lc] = neighbors
+
+            max_links = self.m0 if lc == 0 else self.m
+            for neighbor in neighbors:
+                neighbor_links = self.links[neighbor][lc]
+                neighbor_links.append(row)
+                if len(neighbor_links) > max_links:
+                    sims = vectors[neighbor_links] @ vectors[neighbor]
+                    keep = np.argsort(-sims)[:max_links]
+                    self.links[neighbor][lc] = [neighbor_links[i] for i in keep]
+
+            entry_points = [r for _, r in found]
+
+        if level > self.max_level:
+            self.entry, self.max_level = row, level
+
+    def search(self, vectors, query, k, ef, alive):
+        """Return up to k [(similarity, row)] among rows marked alive"""
+        if self.entry is None:
+            return []
+        entry_points = self._descend(vectors, query, 0)
+        found = self._search_layer(vectors, query, entry_points, max(ef, k), 0)
+        return heapq.nlargest(k, [(sim, row) for sim, row in found if alive[row]])
+
+    def to_dict(self):
+        """Serializable form of the graph (a copy, safe to dump while it grows)"""
+        return {
+            "m": self.m,
+            "ef_construction": self.ef_construction,
+            "entry": self.entry,
+            "max_level": self.max_level,
+            "links": [[list(level) for level in node] for node in self.links],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a graph saved with `to_dict`"""
+        graph = cls(m=data["m"], ef_construction=data["ef_construction"])
+        graph.entry = data["entry"]
+        graph.max_level = data["max_level"]
+        graph.links = data["links"]
+        return graph
+
+
+class LocalVectorStore:  # pylint: disable=too-many-instance-attributes
+    """In-process cosine vector index persisted to disk.
+
+    Rows are appended to a NumPy matrix of normalized vectors. Deleted or
+    replaced rows are tombstoned and reclaimed by `compact()`, which runs
+    automatically once a quarter of the rows are dead.
+
+    Saving, reloading and building the HNSW graph happen in `sync()`, called
+    every `autosave_interval` seconds by a background thread (see the module
+    docstring), never inside `upsert` or `query`.
+
+    For each field in `filter_fields`, a boolean row bitmap is kept per
+    metadata value, so equality and membership filters cost a few vectorized
+    ORs/ANDs instead of a scan over the metadata.
+
+    Args:
+        path (str, optional): Directory to persist to. In-memory only when None.
+        hnsw_threshold (int, optional): Build and use an HNSW graph once the
+            store holds this many rows. Defaults to 20000.
+        hnsw_m (int, optional): Graph links per node. Defaults to 16.
+        hnsw_ef_construction (int, optional): Build-time beam width. Defaults to 100.
+        hnsw_ef_search (int, optional): Query-time beam width. Defaults to 64.
+        autosave_interval (float, optional): Seconds between background
+            syncs with the disk (save, reload, graph build). Defaults to 5.
+        filter_fields (tuple, optional): Metadata fields with bitmap indexes.
+    """
+
+    # Below this many candidate rows, exact search beats walking the graph
+    FILTERED_BRUTE_FORCE_LIMIT = 5000
+
+    DEFAULT_FILTER_FIELDS = (
+        "tag_list",
+        "recommended",
+        "upvoted",
+        "model",
+        "dataset",
+    )
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        path=None,
+        hnsw_threshold=20000,
+        hnsw_m=16,
+        hnsw_ef_construction=100,
+        hnsw_ef_search=64,
+        autosave_interval=5.0,
+        filter_fields=DEFAULT_FILTER_FIELDS,
+    ):
+        self.path = path
+        self.filter_fields = frozenset(filter_fields)
+        self.hnsw_threshold = hnsw_threshold
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef_search = hnsw_ef_search
+        self.autosave_interval = autosave_interval
+
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()  # One sync at a time in this process
+        self._generation = 0
+        # Set by _reset
+        self.dim = None
+        self._vectors = None
+        self._ids = []  # row -> id
+        self._metadata = []  # row -> metadata
+        self._alive = None
+        self._rows = {}  # id -> row
+        self._graph = None
+        self._bitmaps = {}  # field -> {value: bool array over rows}
+        self._reset()
+        self._dirty = False
+        self._pending = []  # Changes not saved yet, replayed over newer saves
+        self._loaded_signature = None
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+            with self._file_lock(shared=True):
+                self._load()
+            atexit.register(self.close)
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._sync_loop, name="vector-store-sync", daemon=True
+        )
+        self._thread.start()
+
+    def _reset(self, dim=None):
+        # Row numbers change: graph builds started before are discarded
+        self._generation += 1
+        self.dim = dim
+        self._vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self._ids = []
+        self._metadata = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._rows = {}
+        self._graph = None
+        self._bitmaps = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    # Persistence
+
+    def _files(self):
+        return (
+            os.path.join(self.path, "vectors.npy"),
+            os.path.join(self.path, "index.json"),
+        )
+
+    @contextmanager
+    def _file_lock(self, shared=False):
+        """Hold the cross-process lock of the index files"""
+        with open(os.path.join(self.path, "index.lock"), "a", encoding="utf-8") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _disk_signature(self):
+        """Identify the save on disk: every save replaces index.json (new inode)"""
+        try:
+            stat = os.stat(self._files()[1])
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _read(self):
+        """Read the saved index (under the file lock). None if there is none"""
+        vectors_file, index_file = self._files()
+        signature = self._disk_signature()
+        if signature is None:
+            return None
+        with open(index_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data["vectors"] = np.load(vectors_file)[: len(data["ids"])]
+        data["signature"] = signature
+        return data
+
+    def _install(self, data):
+        """Replace the in-memory index with a saved one (under the store lock)"""
+        self._reset(data["dim"])
+        self._vectors = data["vectors"]
+        self._ids = data["ids"]
+        self._metadata = data["metadata"]
+        self._alive = np.array(data["alive"], dtype=bool)
+        self._rows = {
+            id_: row for row, id_ in enumerate(self._ids) if self._alive[row]
+        }
+        for row, metadata in enumerate(self._metadata):
+            self._index_metadata(row, metadata)
+        if data.get("graph"):
+            self._graph = HNSWGraph.from_dict(data["graph"])
+        self._loaded_signature = data["signature"]
+
+    def _load(self):
+        data = self._read()
+        if data is None:
+            return
+        with self._lock:
+            self._install(data)
+        print(f"✅ Local vector index loaded: {len(self._rows)} vectors")
+
+    def _merge_saved(self):
+        """Reload a save made by another worker and replay our unsaved changes"""
+        data = self._read()
+        if data is None:
+            return
+        with self._lock:
+            pending = self._pending
+            self._install(data)
+            for operation in pending:
+                if operation[0] == "upsert":
+                    self._upsert_row(*operation[1:])
+                else:
+                    self._delete_row(operation[1])
+            self._pending = pending
+
+    def _write(self):
+        """Write a snapshot of the index; the store lock is only held to copy it"""
+        with self._lock:
+            count = len(self._ids)
+            vectors = self._vectors[:count].copy()
+            data = {
+                "dim": self.dim,
+                "ids": list(self._ids),
+                "metadata": list(self._metadata),
+                "alive": self._alive[:count].tolist(),
+                "graph": self._graph.to_dict() if self._graph else None,
+            }
+            pending, self._pending = self._pending, []
+            self._dirty = False
+
+        vectors_file, index_file = self._files()
+        try:
+            with open(f"{vectors_file}.tmp", "wb") as f:
+                np.save(f, vectors)
+            with open(f"{index_file}.tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(f"{vectors_file}.tmp", vectors_file)
+            os.replace(f"{index_file}.tmp", index_file)
+        except OSError:
+            # Keep the changes for the next sync
+            with self._lock:
+                self._pending = pending + self._pending
+                self._dirty = True
+            raise
+        self._loaded_signature = self._disk_signature()
+
+    def sync(self):
+        """Bring memory and disk in line; called by the background thread.
+
+        Builds the HNSW graph when due, then, under the cross-process file
+        lock, reloads a newer save of another worker (replaying this worker's
+        unsaved changes over it) and writes the result if anything changed.
+        """
+        with self._sync_lock:
+            self._build_graph_if_due()
+            if not self.path:
+                return
+            with self._file_lock():
+                signature = self._disk_signature()
+                if signature is not None and signature != self._loaded_signature:
+                    self._merge_saved()
+                if self._dirty:
+                    self._write()
+
+    def save(self):
+        """Write pending changes to disk now (no-op when nothing changed)"""
+        self.sync()
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.autosave_interval):
+            try:
+                self.sync()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"❌ Local vector index sync failed: {e}")
+
+    def close(self):
+        """Stop the background thread and save pending changes"""
+        self._stop.set()
+        self.sync()
+
+    def _changed(self):
+        # Saved by the next background sync, off the request path
+        self._dirty = True
+
+    # Index maintenance
+
+    @staticmethod
+    def _grow(array, capacity):
+        grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[: array.shape[0]] = array
+        return grown
+
+    def _index_metadata(self, row, metadata):
+        """Set this row's bit in the bitmap of each filterable metadata value"""
+        capacity = self._alive.shape[0]
+        for field in self.filter_fields & metadata.keys():
+            value = metadata[field]
+            values = value if isinstance(value, list) else [value]
+            bitmaps = self._bitmaps.setdefault(field, {})
+            for item in values:
+                try:
+                    bitmap = bitmaps.get(item)
+                except TypeError:  # Unhashable value, left to the scan fallback
+                    continue
+                if bitmap is None:
+                    bitmap = bitmaps[item] = np.zeros(capacity, dtype=bool)
+                bitmap[row] = True
+
+    def _append(self, id_, vector, metadata):
+        row = len(self._ids)
+        if row >= self._vectors.shape[0]:
+            # Grow capacity geometrically to keep appends amortized O(1)
+            capacity = max(1024, self._vectors.shape[0] * 2)
+            self._vectors = self._grow(self._vectors, capacity)
+            self._alive = self._grow(self._alive, capacity)
+            for bitmaps in self._bitmaps.values():
+                for value, bitmap in bitmaps.items():
+                    bitmaps[value] = self._grow(bitmap, capacity)
+
+        self._vectors[row] = vector
+        self._alive[row] = True
+        self._ids.append(id_)
+        self._metadata.append(metadata)
+        self._rows[id_] = row
+        self._index_metadata(row, metadata)
+
+        if self._graph is not None:
+            self._graph.add(self._vectors, row)
+
+    def _build_graph_if_due(self):
+        """Build the HNSW graph on a copy of the vectors, without the store lock.
+
+        Rows appended during the build are linked in afterwards; the build is
+        dropped if the rows were renumbered meanwhile (compaction, reload).
+        """
+        with self._lock:
+            if self._graph is not None or len(self._rows) < self.hnsw_threshold:
+                return
+            generation = self._generation
+            count = len(self._ids)
+            vectors = self._vectors[:count].copy()
+
+        print(f"Building HNSW graph over {count} vectors...")
+        graph = HNSWGraph(m=self.hnsw_m, ef_construction=self.hnsw_ef_construction)
+        for row in range(count):
+            graph.add(vectors, row)
+
+        with self._lock:
+            if self._generation != generation or self._graph is not None:
+                return
+            for row in range(count, len(self._ids)):
+                graph.add(self._vectors, row)
+            self._graph = graph
+            # Saved with the index, so other workers load it instead of building
+            self._dirty = True
+
+    def compact(self):
+        """Drop tombstoned rows and rebuild the graph if there is one"""
+        with self._lock:
+            live_rows = [row for row in range(len(self._ids)) if self._alive[row]]
+            vectors = self._vectors[live_rows]
+            ids = [self._ids[row] for row in live_rows]
+            metadata = [self._metadata[row] for row in live_rows]
+
+            self._reset(self.dim)
+            self._vectors = vectors
+            self._alive = np.ones(len(ids), dtype=bool)
+            self._ids = ids
+            self._metadata = metadata
+            self._rows = {id_: row for row, id_ in enumerate(ids)}
+            for row, row_metadata in enumerate(metadata):
+                self._index_metadata(row, row_metadata)
+            # The graph is rebuilt by the next sync
+            self._changed()
+
+    def _maybe_compact(self):
+        dead = len(self._ids) - len(self._rows)
+        if dead > 1000 and dead > len(self._ids) // 4:
+            self.compact()
+
+    # Vector store interface
+
+    def upsert(self, vectors, **_kwargs):
+        """Insert or replace vectors.
+
+        Args:
+            vectors (list): (id, values, metadata) tuples or Pinecone-style dicts
+
+        Returns:
+            dict: {"upserted_count": int}
+        """
+        count = 0
+        with self._lock:
+            for id_, values, metadata in _normalize_upsert(vectors):
+                vector = np.asarray(values, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                if norm:
+                    vector = vector / norm
+                metadata = dict(metadata)
+                self._upsert_row(id_, vector, metadata)
+                if self.path:
+                    self._pending.append(("upsert", id_, vector, metadata))
+                count += 1
+
+            self._maybe_compact()
+            self._changed()
+        return {"upserted_count": count}
+
+    def _upsert_row(self, id_, vector, metadata):
+        if self.dim is None:
+            self._reset(vector.shape[0])
+        old_row = self._rows.pop(id_, None)
+        if old_row is not None:
+            self._alive[old_row] = False
+        self._append(id_, vector, metadata)
+
+    def _delete_row(self, id_):
+        row = self._rows.pop(id_, None)
+        if row is not None:
+            self._alive[row] = False
+
+    def delete(self, ids, **_kwargs):
+        """Delete vectors by id (unknown ids are ignored)"""
+        with self._lock:
+            for id_ in ids:
+                self._delete_row(id_)
+                if self.path:
+                    self._pending.append(("delete", id_))
+            self._maybe_compact()
+            self._changed()
+        return {}
+
+    def update(self, id, set_metadata=None, **_kwargs):  # pylint: disable=redefined-builtin
+        """Merge `set_metadata` into the metadata of one vector (unknown ids are ignored)"""
+        with self._lock:
+            row = self._rows.get(id)
+            if row is None or not set_metadata:
+                return {}
+            metadata = {**self._metadata[row], **set_metadata}
+            vector = self._vectors[row].copy()
+            self._upsert_row(id, vector, metadata)
+            if self.path:
+                self._pending.append(("upsert", id, vector, metadata))
+            self._maybe_compact()
+            self._changed()
+        return {}
+
+    def fetch(self, ids, **_kwargs):
+        """Return stored vectors and metadata for the given ids"""
+        with self._lock:
+            vectors = {}
+            for id_ in ids:
+                row = self._rows.get(id_)
+                if row is not None:
+                    vectors[id_] = Match(
+                        id_, 1.0, self._metadata[row], self._vectors[row].tolist()
+                    )
+        return FetchResult(vectors)
+
+    def _filter_mask(self, metadata_filter, count):
+        """Evaluate a metadata filter into a boolean mask over the first `count` rows"""
+        mask = np.ones(count, dtype=bool)
+        for field, condition in metadata_filter.items():
+            if field == "$and":
+                for sub in condition:
+                    mask &= self._filter_mask(sub, count)
+                continue
+            if field == "$or":
+                any_mask = np.zeros(count, dtype=bool)
+                for sub in condition:
+                    any_mask |= self._filter_mask(sub, count)
+                mask &= any_mask
+                continue
+
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                if field in self.filter_fields and op in ("$eq", "$ne", "$in", "$nin"):
+                    # Bitmap path: OR the bitmaps of the requested values
+                    bitmaps = self._bitmaps.get(field, {})
+                    wanted = value if op in ("$in", "$nin") else [value]
+                    field_mask = np.zeros(count, dtype=bool)
+                    for item in wanted:
+                        bitmap = bitmaps.get(item)
+                        if bitmap is not None:
+                            field_mask |= bitmap[:count]
+                    mask &= ~field_mask if op in ("$ne", "$nin") else field_mask
+                else:
+                    # Scan fallback for ranges and non-indexed fields
+                    mask &= np.fromiter(
+                        (
+                            _condition_matches(metadata.get(field), op, value)
+                            for metadata in self._metadata[:count]
+                        ),
+                        dtype=bool,
+                        count=count,
+                    )
+        return mask
+
+    def query(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+        self,
+        vector,
+        top_k=3,
+        include_metadata=True,
+        include_values=False,
+        filter=None,  # pylint: disable=redefined-builtin
+        **_kwargs,
+    ):
+        """Return the `top_k` most similar vectors by cosine similarity.
+
+        Args:
+            vector (list[float]): Query embedding
+            top_k (int, optional): Number of matches. Defaults to 3.
+            include_metadata (bool, optional): Return metadata. Defaults to True.
+            include_values (bool, optional): Return vectors. Defaults to False.
+            filter (dict, optional): Pinecone-style metadata filter, applied
+                before scoring
+
+        Returns:
+            QueryResult: Matches sorted by decreasing similarity
+        """
+        with self._lock:
+            if not self._rows:
+                return QueryResult([])
+
+            query = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+
+            count = len(self._ids)
+            candidates = self._alive[:count]
+            if filter:
+                candidates = candidates & self._filter_mask(filter, count)
+            allowed = int(candidates.sum())
+            if not allowed:
+                return QueryResult([])
+
+            if self._graph is not None and allowed > self.FILTERED_BRUTE_FORCE_LIMIT:
+                # Widen the beam when the filter leaves a small share of rows
+                ef = self.hnsw_ef_search
+                if filter:
+                    ef = min(int(ef * count / allowed), self.FILTERED_BRUTE_FORCE_LIMIT)
+                hits = self._graph.search(
+                    self._vectors, query, top_k, ef, candidates
+                )
+            else:
+                rows = np.flatnonzero(candidates)
+                scores = self._vectors[rows] @ query
+                k = min(top_k, len(rows))
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+                hits = [(float(scores[i]), int(rows[i])) for i in top]
+
+            return QueryResult(
+                [
+                    Match(
+                        self._ids[row],
+                        float(score),
+                        self._metadata[row] if include_metadata else None,
+                        self._vectors[row].tolist() if include_values else None,
+                    )
+                    for score, row in hits
+                ]
+            )
+
+    def describe_index_stats(self):
+        """Return vector counts, like Pinecone's describe_index_stats"""
+        with self._lock:
+            return {
+                "dimension": self.dim,
+                "total_vector_count": len(self._rows),
+                "tombstoned_rows": len(self._ids) - len(self._rows),
+                "hnsw": self._graph is not None,
+            }
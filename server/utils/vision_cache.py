@@ -0,0 +1,290 @@
+"""Content-hash cache for UI mockup analysis.
+
+Users often send the same mockup several times in a session, and every time
+`analyze_image` pays for a slow gpt-4o vision call. This module stores previous
+image descriptions in MongoDB keyed by the image content, so they can be reused:
+
+    - Exact match: SHA-256 of the raw image bytes
+    - Visual match: 64-bit difference hash (dHash, computed with Pillow), which
+      survives re-encoding, resizing and small compression artifacts. Two images
+      match when the Hamming distance between their hashes is at most
+      VISION_CACHE_MAX_DISTANCE bits. Near-blank or low-contrast images get
+      no perceptual hash: their dHash bits come from noise and would collide,
+      so they only match exactly.
+
+The perceptual hashes are mirrored in memory so a visual lookup never scans the
+collection; entries written by other workers are picked up incrementally.
+
+Usage:
+    from utils.vision_cache import vision_cache
+
+    description = vision_cache.lookup(image_bytes)
+    if description is None:
+        description = analyze(image_bytes)
+        vision_cache.store(image_bytes, description)
+
+    # Descriptions computed at upload time are also found by image URL
+    vision_cache.store(image_bytes, description, url=image_url)
+    description = vision_cache.lookup_url(image_url)
+
+    vision_cache.invalidate(sha256)  # Forget one image
+    vision_cache.clear()             # Forget everything
+    vision_cache.stats()             # Hit rate and counters
+
+Configuration:
+    - VISION_CACHE_ENABLED: Turn the cache on or off (default: true)
+    - VISION_CACHE_MAX_DISTANCE: Max differing dHash bits for a visual match (default: 4)
+    - VISION_CACHE_MIN_CONTRAST: Min standard deviation of the grayscale
+      thumbnail (0-255) for an image to get a perceptual hash (default: 12)
+    - VISION_CACHE_TTL: Entry lifetime in seconds (default: 30 days)
+"""
+
+import io
+import datetime
+import hashlib
+import threading
+from PIL import Image, ImageStat, UnidentifiedImageError
+from pymongo.errors import PyMongoError
+from utils.connect_db import image_analyses_col
+from utils.consts import (
+    VISION_CACHE_MAX_DISTANCE,
+    VISION_CACHE_MIN_CONTRAST,
+    VISION_CACHE_TTL,
+)
+
+
+def content_hash(image_data: bytes) -> str:
+    """Return the SHA-256 hex digest of the raw image bytes"""
+    return hashlib.sha256(image_data).hexdigest()
+
+
+def perceptual_hash(image_data: bytes, min_contrast: float = VISION_CACHE_MIN_CONTRAST):
+    """Return the 64-bit difference hash of an image, or None if unusable.
+
+    The image is reduced to a 9x8 grayscale thumbnail and each bit records
+    whether a pixel is brighter than its right neighbour. Images that cannot
+    be read, or whose thumbnail has a standard deviation below `min_contrast`
+    (blank or washed-out mockups, where the bits are noise), return None.
+    """
+    try:
+        with Image.open(io.BytesIO(image_data)) as image:
+            thumbnail = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+
+    if ImageStat.Stat(thumbnail).stddev[0] < min_contrast:
+        return None
+    pixels = list(thumbnail.getdata())
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | int(left > right)
+    return value
+
+
+class VisionCache:
+    """MongoDB-backed cache of image descriptions with exact and perceptual lookup"""
+
+    def __init__(self, collection, max_distance: int = 4, ttl: int = 30 * 24 * 3600):
+        self.collection = collection
+        self.max_distance = max_distance
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._phashes = {}  # sha256 -> perceptual hash, mirrored from Mongo
+        self._synced_at = None
+
+        self.exact_hits = 0
+        self.perceptual_hits = 0
+        self.url_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _cutoff(self):
+        return datetime.datetime.utcnow() - datetime.timedelta(seconds=self.ttl)
+
+    def _sync(self):
+        """Pull perceptual hashes written since the last sync (by any worker).
+
+        The query runs without the lock, so lookups in other threads never
+        wait on MongoDB; its results are merged under the lock.
+        """
+        with self._lock:
+            since = self._synced_at
+        query = {"phash": {"$ne": None}, "created_at": {"$gte": self._cutoff()}}
+        if since is not None:
+            query["created_at"] = {"$gt": since}
+
+        synced_at = datetime.datetime.utcnow()
+        pulled = {
+            doc["sha256"]: int(doc["phash"], 16)
+            for doc in self.collection.find(query, {"sha256": 1, "phash": 1})
+        }
+        with self._lock:
+            self._phashes.update(pulled)
+            if self._synced_at == since:
+                self._synced_at = synced_at
+
+    def _closest(self, phash):
+        """Return the sha256 of the closest known image within max_distance"""
+        best_sha, best_distance = None, self.max_distance + 1
+        for sha, other in self._phashes.items():
+            distance = bin(phash ^ other).count("1")
+            if distance < best_distance:
+                best_sha, best_distance = sha, distance
+        return best_sha
+
+    def lookup(self, image_data: bytes):
+        """Return a cached description for this image or a visually identical one.
+
+        Args:
+            image_data (bytes): Raw image bytes
+
+        Returns:
+            str | None: The stored description, or None on a miss
+        """
+        sha = content_hash(image_data)
+        try:
+            doc = self.collection.find_one(
+                {"sha256": sha, "created_at": {"$gte": self._cutoff()}}
+            )
+            if doc:
+                with self._lock:
+                    self.exact_hits += 1
+                return doc["description"]
+
+            phash = perceptual_hash(image_data)
+            if phash is not None:
+                self._sync()
+                with self._lock:
+                    match = self._closest(phash)
+                if match:
+                    doc = self.collection.find_one(
+                        {"sha256": match, "created_at": {"$gte": self._cutoff()}}
+                    )
+                    if doc:
+                        with self._lock:
+                            self.perceptual_hits += 1
+                        return doc["description"]
+                    # Expired or invalidated elsewhere
+                    with self._lock:
+                        self._phashes.pop(match, None)
+
+        except PyMongoError as e:
+            print(f"Vision cache lookup error: {e}")
+            with self._lock:
+                self.errors += 1
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def lookup_url(self, url: str):
+        """Return the description stored for an uploaded image URL, if any.
+
+        Args:
+            url (str): Image URL the description was stored with
+
+        Returns:
+            str | None: The stored description, or None on a miss
+        """
+        try:
+            doc = self.collection.find_one(
+                {"urls": url, "created_at": {"$gte": self._cutoff()}},
+                {"description": 1},
+            )
+        except PyMongoError as e:
+            print(f"Vision cache lookup error: {e}")
+            with self._lock:
+                self.errors += 1
+            return None
+
+        if not doc:
+            return None
+        with self._lock:
+            self.url_hits += 1
+        return doc["description"]
+
+    def store(
+        self, image_data: bytes, description: str, url: str = None, public_id: str = None
+    ):
+        """Save the description of an image.
+
+        Args:
+            image_data (bytes): Raw image bytes
+            description (str): Vision analysis of the image
+            url (str, optional): Hosted URL of the image, for `lookup_url`
+            public_id (str, optional): Cloudinary public identifier of the image
+        """
+        sha = content_hash(image_data)
+        phash = perceptual_hash(image_data)
+        update = {
+            "$set": {
+                "phash": f"{phash:016x}" if phash is not None else None,
+                "description": description,
+                "created_at": datetime.datetime.utcnow(),
+            }
+        }
+        aliases = {}
+        if url:
+            aliases["urls"] = url
+        if public_id:
+            aliases["public_ids"] = public_id
+        if aliases:
+            update["$addToSet"] = aliases
+
+        try:
+            self.collection.update_one({"sha256": sha}, update, upsert=True)
+        except PyMongoError as e:
+            print(f"Vision cache store error: {e}")
+            with self._lock:
+                self.errors += 1
+            return
+
+        if phash is not None:
+            with self._lock:
+                self._phashes[sha] = phash
+
+    def invalidate(self, sha256: str) -> int:
+        """Forget the description of one image. Returns the number removed"""
+        with self._lock:
+            self._phashes.pop(sha256, None)
+        return self.collection.delete_many({"sha256": sha256}).deleted_count
+
+    def clear(self) -> int:
+        """Forget every cached description. Returns the number removed"""
+        with self._lock:
+            self._phashes.clear()
+            self._synced_at = None
+        return self.collection.delete_many({}).deleted_count
+
+    def stats(self):
+        """Return hit/miss counters.
+
+        Returns:
+            dict: exact_hits, perceptual_hits, url_hits, misses, errors,
+                hit_rate, known_hashes
+        """
+        with self._lock:
+            hits = self.exact_hits + self.perceptual_hits + self.url_hits
+            lookups = hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "perceptual_hits": self.perceptual_hits,
+                "url_hits": self.url_hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "known_hashes": len(self._phashes),
+            }
+
+
+# Create global instance
+vision_cache = VisionCache(
+    image_analyses_col,
+    max_distance=VISION_CACHE_MAX_DISTANCE,
+    ttl=VISION_CACHE_TTL,
+)